@@ -0,0 +1,109 @@
+"""Spread brawl api requests over several API keys"""
+import asyncio
+import os
+import time
+from poll_scheduler import TokenBucket
+
+
+def tokens_from_env() -> list[str | None]:
+    """BRAWL_API_TOKENS (comma separated), falling back to the single BRAWL_API_TOKEN"""
+    tokens = [token.strip() for token in os.environ.get("BRAWL_API_TOKENS", "").split(",") if token.strip()]
+    return tokens or [os.environ.get("BRAWL_API_TOKEN")]
+
+
+class ApiKey:
+    """One API key with its own request budget"""
+    __slots__ = ("index", "token", "bucket", "in_flight", "failures", "available_at")
+
+    def __init__(self, index: int, token: str | None, rate: float, clock):
+        self.index = index  # Used in logs and metrics instead of the secret token
+        self.token = token
+        self.bucket = TokenBucket(rate, clock=clock)
+        self.in_flight = 0
+        self.failures = 0  # Consecutive 403/429 responses
+        self.available_at = 0.0  # Benched or told to Retry-After until then
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+class ApiKeyPool:
+    """
+    Hand out the least loaded key that has budget left:
+    - Each key has a token bucket of requests_per_second
+    - A 429 blocks its key for Retry-After seconds (1 if missing)
+    - bench_after consecutive 403/429s bench the key, for bench_seconds doubling
+      on every further failure up to max_bench_seconds
+    """
+    def __init__(
+        self,
+        tokens: list[str | None],
+        requests_per_second: float = 10,
+        bench_after: int = 3,
+        bench_seconds: float = 60,
+        max_bench_seconds: float = 3600,
+        clock=time.monotonic,
+    ):
+        self.clock = clock
+        self.keys = [ApiKey(index, token, requests_per_second, clock) for index, token in enumerate(tokens)]
+        self.bench_after = bench_after
+        self.bench_seconds = bench_seconds
+        self.max_bench_seconds = max_bench_seconds
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def benched(self) -> int:
+        """Keys that cannot be used right now"""
+        now = self.clock()
+        return sum(key.available_at > now for key in self.keys)
+
+    def _pick(self) -> ApiKey | None:
+        now = self.clock()
+        usable = [key for key in self.keys if key.available_at <= now]
+        for key in sorted(usable, key=lambda key: (key.in_flight, -key.bucket.tokens)):
+            if key.bucket.take(1):
+                key.in_flight += 1
+                return key
+        return None
+
+    def _seconds_until_any(self) -> float:
+        now = self.clock()
+        return min(
+            max(key.available_at - now, key.bucket.seconds_until_available())
+            for key in self.keys
+        )
+
+    async def acquire(self, max_wait: float) -> ApiKey | None:
+        """Wait up to max_wait seconds for a key with budget, None if every key stays unavailable"""
+        deadline = self.clock() + max_wait
+        while True:
+            key = self._pick()
+            if key is not None:
+                return key
+            wait = self._seconds_until_any()
+            if self.clock() + wait > deadline:
+                return None
+            await asyncio.sleep(wait)
+
+    def release(self, key: ApiKey, status: int | str, retry_after: float | None = None) -> None:
+        """Record the outcome of a request made with key"""
+        key.in_flight -= 1
+        now = self.clock()
+        if status in (403, 429):
+            if status == 429 and key.available_at > now:
+                return  # Sent before an earlier 429 blocked the key, not a new failure
+            key.failures += 1
+            if status == 429:
+                key.available_at = max(key.available_at, now + (retry_after if retry_after is not None else 1.0))
+            if key.failures >= self.bench_after:
+                doublings = key.failures - self.bench_after
+                bench_seconds = min(self.bench_seconds * 2 ** doublings, self.max_bench_seconds)
+                key.available_at = max(key.available_at, now + bench_seconds)
+                print(f"Benched API key {key.index} for {bench_seconds:.0f}s after {key.failures} {status}s in a row")
+        elif isinstance(status, int):
+            key.failures = 0
+
+    def __str__(self) -> str:
+        return f"ApiKeyPool(keys={len(self.keys)}, benched={self.benched()})"
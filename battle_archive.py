@@ -0,0 +1,179 @@
+"""Append-only columnar archive of every battle seen"""
+import datetime
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from battle_record import BattleRecord
+
+# Column name -> array typecode
+COLUMNS = {
+    "battle_time": "q",  # epoch seconds, sorted ascending
+    "trophy_change": "h",
+    "duration": "H",
+    "result": "b",
+    "star_player": "b",
+    "mode": "I",  # code into the archive's string table
+    "map": "I",  # code into the archive's string table
+    "brawler_id": "I",
+}
+RESULT_CODES = {"": 0, "victory": 1, "defeat": 2, "draw": 3}
+# Columns that make up BattleRecord.key, telling apart battles in the same second
+KEY_COLUMNS = ("battle_time", "mode", "map", "brawler_id", "result", "trophy_change", "duration")
+
+
+class BattleColumns:
+    """One typed array per column, for one player"""
+    def __init__(self, columns: dict[str, array] | None = None):
+        self.columns = columns or {name: array(typecode) for name, typecode in COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return len(self.columns["battle_time"])
+
+    def __getitem__(self, column: str) -> array:
+        return self.columns[column]
+
+    def slice(self, start: int, stop: int) -> "BattleColumns":
+        return BattleColumns({name: values[start:stop] for name, values in self.columns.items()})
+
+
+class BattleArchive:
+    """
+    Battles keyed by player tag and battle time, stored column by column.
+    With a path, each player's columns are appended to
+    <path>/<tag>/<column>.bin and strings are kept in <path>/strings.txt.
+    Without a path the archive only lives in memory.
+    """
+    def __init__(self, path: str | None = "battle_archive"):
+        self.path = path
+        self._players: dict[str, BattleColumns] = {}
+        self._pending: dict[str, BattleColumns] = {}
+        self._strings: list[str] = []
+        self._string_codes: dict[str, int] = {}
+        self._pending_strings: list[str] = []
+        if path is not None:
+            strings_path = os.path.join(path, "strings.txt")
+            if os.path.exists(strings_path):
+                with open(strings_path, encoding="utf-8") as file:
+                    for line in file:
+                        self._add_string(line.rstrip("\n"))
+
+    def _add_string(self, value: str) -> int:
+        self._string_codes[value] = len(self._strings)
+        self._strings.append(value)
+        return self._string_codes[value]
+
+    def _string_code(self, value: str | None) -> int:
+        value = (value or "").replace("\n", " ")
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._add_string(value)
+            self._pending_strings.append(value)
+        return code
+
+    def string(self, code: int) -> str:
+        return self._strings[code]
+
+    def _player_dir(self, player_tag: str) -> str:
+        return os.path.join(self.path, player_tag.lstrip("#"))
+
+    def _columns(self, player_tag: str) -> BattleColumns:
+        """Columns of a player, loaded from disk on first use"""
+        columns = self._players.get(player_tag)
+        if columns is not None:
+            return columns
+        columns = BattleColumns()
+        if self.path is not None and os.path.isdir(self._player_dir(player_tag)):
+            for name, values in columns.columns.items():
+                column_path = os.path.join(self._player_dir(player_tag), f"{name}.bin")
+                if os.path.exists(column_path):
+                    with open(column_path, "rb") as file:
+                        values.frombytes(file.read())
+            # A crash mid-flush can leave columns of different lengths
+            length = min(len(values) for values in columns.columns.values())
+            for values in columns.columns.values():
+                del values[length:]
+        self._players[player_tag] = columns
+        return columns
+
+    def last_battle_time(self, player_tag: str) -> int:
+        """Battle time of the newest archived battle of a player, 0 if none"""
+        times = self._columns(player_tag)["battle_time"]
+        return times[-1] if times else 0
+
+    @staticmethod
+    def _archived_at_end(columns: BattleColumns, row: dict) -> bool:
+        """Whether a battle in the archive's last second is already archived"""
+        times = columns["battle_time"]
+        index = len(times) - 1
+        while index >= 0 and times[index] == row["battle_time"]:
+            if all(columns[name][index] == row[name] for name in KEY_COLUMNS):
+                return True
+            index -= 1
+        return False
+
+    def append(self, player_tag: str, record: BattleRecord) -> bool:
+        """Archive one battle, return False if it is already archived"""
+        columns = self._columns(player_tag)
+        times = columns["battle_time"]
+        if times and record.battle_time < times[-1]:
+            return False  # Append-only: already archived, or older than the archive's end
+        row = {
+            "battle_time": record.battle_time,
+            "trophy_change": record.trophy_change,
+            "duration": record.duration,
+            "result": RESULT_CODES.get(record.result, 0),
+            "star_player": int(record.star_player),
+            "mode": self._string_code(record.mode),
+            "map": self._string_code(record.map),
+            "brawler_id": record.brawler_id,
+        }
+        if times and record.battle_time == times[-1] and self._archived_at_end(columns, row):
+            return False
+        pending = self._pending.setdefault(player_tag, BattleColumns())
+        for name, value in row.items():
+            columns[name].append(value)
+            pending[name].append(value)
+        return True
+
+    def scan(self, player_tag: str, start: datetime.datetime | None = None,
+             end: datetime.datetime | None = None) -> BattleColumns:
+        """Battles of a player with start <= battle time <= end, oldest first"""
+        columns = self._columns(player_tag)
+        times = columns["battle_time"]
+        low = bisect_left(times, int(start.timestamp())) if start else 0
+        high = bisect_right(times, int(end.timestamp())) if end else len(times)
+        return columns.slice(low, high)
+
+    def summarize(self, player_tag: str, start: datetime.datetime | None = None) -> dict:
+        """Battle stats of a player since start"""
+        battles = self.scan(player_tag, start)
+        results = battles["result"]
+        return {
+            "games": len(battles),
+            "victories": results.count(RESULT_CODES["victory"]),
+            "defeats": results.count(RESULT_CODES["defeat"]),
+            "star_players": battles["star_player"].count(1),
+            "game_durations_s": sum(
+                duration
+                for duration, trophy_change in zip(battles["duration"], battles["trophy_change"])
+                if trophy_change != 0
+            ),
+        }
+
+    def flush(self) -> None:
+        """Append pending battles to disk"""
+        if self.path is None:
+            self._pending = {}
+            self._pending_strings = []
+            return
+        os.makedirs(self.path, exist_ok=True)
+        if self._pending_strings:
+            with open(os.path.join(self.path, "strings.txt"), "a", encoding="utf-8") as file:
+                file.writelines(f"{value}\n" for value in self._pending_strings)
+            self._pending_strings = []
+        for player_tag, pending in self._pending.items():
+            os.makedirs(self._player_dir(player_tag), exist_ok=True)
+            for name, values in pending.columns.items():
+                with open(os.path.join(self._player_dir(player_tag), f"{name}.bin"), "ab") as file:
+                    values.tofile(file)
+        self._pending = {}
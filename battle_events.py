@@ -0,0 +1,88 @@
+"""Publish new battles to independent consumers"""
+import asyncio
+import inspect
+import weakref
+from battle_record import BattleRecord
+from metrics import BATTLE_EVENT_ERRORS, BATTLE_EVENTS, QUEUE_DEPTH
+
+_BUSES: "weakref.WeakSet[EventBus]" = weakref.WeakSet()
+
+
+class BattleEvent:
+    """New battles from one match, one record per tracked player in it"""
+    __slots__ = ("battle_time", "players")
+
+    def __init__(self, battle_time: int, players: list[tuple[str, BattleRecord]]):
+        self.battle_time = battle_time
+        self.players = players
+
+    def __repr__(self) -> str:
+        return f"BattleEvent(battle_time={self.battle_time}, players={[name for name, _ in self.players]})"
+
+
+class Subscriber:
+    """One consumer stage with its own bounded queue, handled by a worker task while it has events"""
+    __slots__ = ("stage", "handle", "queue", "worker")
+
+    def __init__(self, stage: str, handle, max_queue: int):
+        self.stage = stage
+        self.handle = handle  # Takes a list of events, may be a coroutine function
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.worker: asyncio.Task | None = None
+
+
+class EventBus:
+    """
+    Fan battle events out to subscriber stages:
+    - Each stage has its own queue of at most max_queue events, so a slow stage only
+      holds up publish() once its own queue is full
+    - A stage gets every event queued so far as one batch
+    - Stages see an event in subscription order unless one falls behind
+    - A failing batch is logged and counted, the stage carries on with the next one
+    """
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self.subscribers: list[Subscriber] = []
+        _BUSES.add(self)
+
+    def subscribe(self, stage: str, handle, max_queue: int | None = None) -> None:
+        self.subscribers.append(Subscriber(stage, handle, max_queue or self.max_queue))
+        QUEUE_DEPTH.set_function(
+            f"battle_events_{stage}",
+            function=lambda: sum(bus.depth(stage) for bus in _BUSES),
+        )
+
+    def depth(self, stage: str) -> int:
+        return sum(subscriber.queue.qsize() for subscriber in self.subscribers if subscriber.stage == stage)
+
+    async def publish(self, event: BattleEvent) -> None:
+        """Queue an event for every stage, waiting only while a stage's queue is full"""
+        BATTLE_EVENTS.inc("published")
+        for subscriber in self.subscribers:
+            await subscriber.queue.put(event)
+            if subscriber.worker is None or subscriber.worker.done():
+                subscriber.worker = asyncio.ensure_future(self._work(subscriber))
+
+    async def _work(self, subscriber: Subscriber) -> None:
+        while not subscriber.queue.empty():
+            batch = [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+            try:
+                result = subscriber.handle(batch)
+                if inspect.isawaitable(result):
+                    await result
+                BATTLE_EVENTS.inc(subscriber.stage, amount=len(batch))
+            except Exception as e:
+                BATTLE_EVENT_ERRORS.inc(subscriber.stage)
+                print(f"Error handling {len(batch)} battle events in {subscriber.stage}: {e!r}")
+            finally:
+                for _ in batch:
+                    subscriber.queue.task_done()
+            await asyncio.sleep(0)  # Let the poller and other stages run between batches
+
+    async def drain(self) -> None:
+        """Wait until every stage has handled every event published so far"""
+        for subscriber in self.subscribers:
+            await subscriber.queue.join()
+
+    def __str__(self) -> str:
+        return "EventBus(" + ", ".join(f"{s.stage}={s.queue.qsize()}" for s in self.subscribers) + ")"
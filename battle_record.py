@@ -0,0 +1,98 @@
+"""Compact parsed battles"""
+import calendar
+import sys
+
+
+def battle_time_to_epoch(battle_time: str) -> int:
+    """
+    Convert API battleTime (e.g. 20250330T161628.000Z) to epoch seconds.
+    Slices the fixed-width string instead of going through strptime.
+    """
+    return calendar.timegm((
+        int(battle_time[0:4]),
+        int(battle_time[4:6]),
+        int(battle_time[6:8]),
+        int(battle_time[9:11]),
+        int(battle_time[11:13]),
+        int(battle_time[13:15]),
+    ))
+
+
+def _intern(value: str | None) -> str:
+    return sys.intern(value) if value else ""
+
+
+class BattleRecord:
+    """One battle from the point of view of one player"""
+    __slots__ = (
+        "battle_time",
+        "result",
+        "trophy_change",
+        "duration",
+        "star_player",
+        "mode",
+        "map",
+        "brawler_id",
+        "brawler_name",
+    )
+
+    def __init__(
+        self,
+        battle_time: int,
+        result: str,
+        trophy_change: int,
+        duration: int,
+        star_player: bool,
+        mode: str,
+        map: str,
+        brawler_id: int,
+        brawler_name: str,
+    ):
+        self.battle_time = battle_time
+        self.result = result
+        self.trophy_change = trophy_change
+        self.duration = duration
+        self.star_player = star_player
+        self.mode = mode
+        self.map = map
+        self.brawler_id = brawler_id
+        self.brawler_name = brawler_name
+
+    @property
+    def key(self) -> str:
+        """Tell apart a player's battles that share the same battle_time"""
+        return (
+            f"{self.battle_time}:{self.mode}:{self.map}:{self.brawler_id}:"
+            f"{self.result}:{self.trophy_change}:{self.duration}"
+        )
+
+    @classmethod
+    def from_api(cls, game_info: dict, player_tag: str, battle_time: int | None = None) -> "BattleRecord":
+        """Parse one battle log item, seen by the player with player_tag"""
+        battle = game_info["battle"]
+        event = game_info.get("event") or {}
+        brawler = {}
+        participants = [player for team in battle.get("teams") or [] for player in team]
+        participants += battle.get("players") or []
+        for player in participants:
+            if player.get("tag") == player_tag:
+                brawler = player.get("brawler") or (player.get("brawlers") or [{}])[0]
+                break
+        return cls(
+            battle_time=battle_time if battle_time is not None else battle_time_to_epoch(game_info["battleTime"]),
+            result=_intern(battle.get("result")),
+            trophy_change=battle.get("trophyChange", 0),
+            duration=battle.get("duration", 0),
+            star_player=(battle.get("starPlayer") or {}).get("tag") == player_tag,
+            mode=_intern(event.get("mode") or battle.get("mode")),
+            map=_intern(event.get("map")),
+            brawler_id=brawler.get("id", 0),
+            brawler_name=_intern(brawler.get("name")),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"BattleRecord(battle_time={self.battle_time}, result={self.result!r}, "
+            f"trophy_change={self.trophy_change}, mode={self.mode!r}, map={self.map!r}, "
+            f"brawler={self.brawler_name!r})"
+        )
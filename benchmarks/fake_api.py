@@ -0,0 +1,265 @@
+"""
+Local stand-in for the Brawl Stars API, for load testing the bot offline.
+
+    python3 -m benchmarks.fake_api --players 300 --latency lognormal:0.08,0.5 --error-rate 0.01
+    BRAWL_API_BASE_URL=http://127.0.0.1:8765/v1 python3 main.py
+
+Serves GET /v1/players/{tag}, /v1/players/{tag}/battlelog and /v1/clubs/{tag}/members,
+with players in clubs of 30 (#CLUB0000, #CLUB0001, ...). The player recorded in
+data_references/ starts with the recorded battle log, every player keeps playing over
+simulated time. Latency, rate limiting (429 with Retry-After) and 5xx/timeout failures
+are injected on request.
+"""
+import argparse
+import ast
+import asyncio
+import collections
+import datetime
+import math
+import os
+import random
+import re
+import time
+from aiohttp import web
+from poll_scheduler import TokenBucket
+from benchmarks.synthetic import SyntheticPlayer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_references")
+
+
+def load_fixture(name: str):
+    """
+    Load a recorded response from data_references/. The files are Python literal dumps
+    that were pasted with hard line wraps, so wrapped lines and split numbers are rejoined.
+    """
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as file:
+        text = file.read()
+    text = re.sub(r"\n(?=[^\s\[\]{}])", "", text)
+    text = re.sub(r"(\d) +(\d)", r"\1\2", text)
+    return ast.literal_eval(text)
+
+
+class LatencyModel:
+    """
+    Response delay in seconds, parsed from "<kind>:<params>":
+    - fixed:0.05
+    - uniform:0.01,0.2
+    - lognormal:<median>,<sigma> (long tail, like real API latency)
+    """
+    def __init__(self, spec: str = "fixed:0", rng: random.Random | None = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(param) for param in params.split(",") if param]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        median, sigma = self.params
+        return self.rng.lognormvariate(math.log(median), sigma)
+
+
+class FakeBrawlApi:
+    """
+    Players whose battles advance over simulated time, served over HTTP.
+    Simulated time runs time_scale times faster than the clock, and every player
+    plays a battle about every battle_interval_s simulated seconds.
+    """
+    def __init__(
+        self,
+        players: int = 100,
+        seed: int = 0,
+        battle_interval_s: float = 180,
+        time_scale: float = 1.0,
+        latency: str = "fixed:0",
+        requests_per_second: float | None = None,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_s: float = 30,
+        clock=time.monotonic,
+    ):
+        self.rng = random.Random(seed)
+        self.battle_interval_s = battle_interval_s
+        self.time_scale = time_scale
+        self.latency = LatencyModel(latency, self.rng)
+        self.requests_per_second = requests_per_second  # Per API token, None disables rate limiting
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_s = timeout_s  # How long a "timed out" request hangs before answering
+        self.clock = clock
+        self.started_at = clock()
+        self.simulated_start = datetime.datetime.now(datetime.timezone.utc)
+
+        self.players: dict[str, SyntheticPlayer] = {}
+        self._next_battle: dict[str, datetime.datetime] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self.responses: dict[int, int] = collections.Counter()
+
+        recorded = load_fixture("battlelog.yaml")
+        recorded_tag, recorded_name = self._recorded_player(recorded)
+        player = SyntheticPlayer(self.rng, 0, tag=recorded_tag, name=recorded_name)
+        player.battles = recorded[::-1]  # Stored oldest first
+        self._add(player)
+        for index in range(1, players):
+            self._add(SyntheticPlayer(self.rng, index))
+
+    @staticmethod
+    def _recorded_player(battle_log: list[dict]) -> tuple[str, str]:
+        """The player whose log was recorded is the one in every battle"""
+        counts = collections.Counter(
+            (player["tag"], player["name"])
+            for battle in battle_log
+            for team in battle["battle"]["teams"]
+            for player in team
+        )
+        return counts.most_common(1)[0][0]
+
+    def _add(self, player: SyntheticPlayer) -> None:
+        self.players[player.tag] = player
+        # Stagger players so battles do not all land on the same second
+        offset = self.rng.uniform(0, self.battle_interval_s)
+        self._next_battle[player.tag] = self.simulated_start + datetime.timedelta(seconds=offset)
+
+    def now(self) -> datetime.datetime:
+        """Current simulated time"""
+        elapsed_s = (self.clock() - self.started_at) * self.time_scale
+        return self.simulated_start + datetime.timedelta(seconds=elapsed_s)
+
+    def _catch_up(self, player: SyntheticPlayer) -> None:
+        """Play every battle the player would have finished by now"""
+        now = self.now()
+        next_battle = self._next_battle[player.tag]
+        while next_battle <= now:
+            player.play(next_battle)
+            interval_s = self.battle_interval_s * self.rng.uniform(0.5, 1.5)
+            next_battle += datetime.timedelta(seconds=interval_s)
+        self._next_battle[player.tag] = next_battle
+
+    def _error(self, status: int, reason: str, message: str, headers=None) -> web.Response:
+        self.responses[status] += 1
+        return web.json_response({"reason": reason, "message": message}, status=status, headers=headers)
+
+    async def _inject(self, request: web.Request) -> web.Response | None:
+        """Delay the request and return an injected failure, if any"""
+        await asyncio.sleep(self.latency.sample())
+        if self.requests_per_second is not None:
+            token = request.headers.get("Authorization", "")
+            bucket = self._buckets.get(token)
+            if bucket is None:
+                bucket = self._buckets[token] = TokenBucket(self.requests_per_second, clock=self.clock)
+            if bucket.take(1) == 0:
+                retry_after = max(math.ceil(bucket.seconds_until_available()), 1)
+                return self._error(429, "requestThrottled", "Request was throttled", {"Retry-After": str(retry_after)})
+        if self.rng.random() < self.timeout_rate:
+            await asyncio.sleep(self.timeout_s)
+            return self._error(504, "gatewayTimeout", "Upstream timed out")
+        if self.rng.random() < self.error_rate:
+            status = self.rng.choice((500, 502, 503))
+            return self._error(status, "unknownException", "Injected failure")
+        return None
+
+    def _player(self, request: web.Request) -> SyntheticPlayer | None:
+        player = self.players.get(request.match_info["tag"].upper())
+        if player is not None:
+            self._catch_up(player)
+        return player
+
+    async def handle_player(self, request: web.Request) -> web.Response:
+        failure = await self._inject(request)
+        if failure is not None:
+            return failure
+        player = self._player(request)
+        if player is None:
+            return self._error(404, "notFound", "Not found with tag")
+        self.responses[200] += 1
+        return web.json_response(player.profile())
+
+    async def handle_battle_log(self, request: web.Request) -> web.Response:
+        failure = await self._inject(request)
+        if failure is not None:
+            return failure
+        player = self._player(request)
+        if player is None:
+            return self._error(404, "notFound", "Not found with tag")
+        self.responses[200] += 1
+        return web.json_response({"items": player.battle_log(), "paging": {"cursors": {}}})
+
+    async def handle_club_members(self, request: web.Request) -> web.Response:
+        failure = await self._inject(request)
+        if failure is not None:
+            return failure
+        club_tag = request.match_info["tag"].upper()
+        members = [player.member() for player in self.players.values() if player.club_tag == club_tag]
+        if not members:
+            return self._error(404, "notFound", "Not found with tag")
+        self.responses[200] += 1
+        return web.json_response({"items": members, "paging": {"cursors": {}}})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/players/{tag}", self.handle_player)
+        app.router.add_get("/v1/players/{tag}/battlelog", self.handle_battle_log)
+        app.router.add_get("/v1/clubs/{tag}/members", self.handle_club_members)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> web.AppRunner:
+        """Serve in the running event loop, port 0 picks a free port"""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        self.port = runner.addresses[0][1]
+        self.base_url = f"http://{host}:{self.port}/v1"
+        return runner
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared with the load test"""
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--battle-interval", type=float, default=180, help="simulated seconds between battles")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="simulated seconds per real second")
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--rate-limit", type=float, help="requests per second per token before 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 5xx")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds a hanging request takes")
+
+
+def from_arguments(args) -> FakeBrawlApi:
+    return FakeBrawlApi(
+        players=args.players,
+        seed=args.seed,
+        battle_interval_s=args.battle_interval,
+        time_scale=args.time_scale,
+        latency=args.latency,
+        requests_per_second=args.rate_limit,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_s=args.timeout,
+    )
+
+
+async def serve(args) -> None:
+    api = from_arguments(args)
+    await api.start(args.host, args.port)
+    print(f"Serving {len(api.players)} players on {api.base_url}")
+    print(f"Recorded player: {next(iter(api.players))}")
+    while True:
+        await asyncio.sleep(60)
+        print(f"Responses: {dict(api.responses)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,109 @@
+"""
+Run the bot end to end against a local fake API under load.
+
+    python3 -m benchmarks.load_test --players 300 --channels 10 --duration 60 --time-scale 60 \
+        --latency lognormal:0.08,0.5 --rate-limit 20 --error-rate 0.02
+
+Everything but Discord is real: BrawlClient over HTTP, the response cache, the poll
+scheduler and one MessageController per channel, each tracking a slice of the players.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+import metrics
+from brawl_client import BrawlClient
+from chart_renderer import ChartRenderer
+from discord_bot import poll_channels, tracked_tags
+from message_controller import MessageController
+from poll_scheduler import PollScheduler
+from response_cache import CachedBrawlClient
+from benchmarks.fake_api import add_arguments, from_arguments
+from benchmarks.synthetic import FakeChannel
+
+
+async def run(args) -> None:
+    api = from_arguments(args)
+    runner = await api.start(port=0)
+    # Shorter than the poll interval, so a due player is fetched rather than served the last poll
+    ttl = args.min_interval / 2
+    brawl_client = CachedBrawlClient(BrawlClient(
+        base_url=api.base_url,
+        timeout=args.client_timeout,
+        api_tokens=[f"load-test-key-{index}" for index in range(args.api_keys)],
+        requests_per_second_per_key=args.key_rate,
+    ), ttls={"player_info": ttl, "battle_logs": ttl})
+    chart_renderer = ChartRenderer()
+    scheduler = PollScheduler(
+        min_interval=args.min_interval,
+        max_interval=args.min_interval * 8,
+        requests_per_second=args.requests_per_second,
+        idle_check_interval=1,
+    )
+    tags = list(api.players)
+    # Start every session before injecting faults, a failed start would leave players untracked
+    faults = api.requests_per_second, api.error_rate, api.timeout_rate
+    api.requests_per_second, api.error_rate, api.timeout_rate = None, 0.0, 0.0
+    controllers = []
+    for channel_index in range(args.channels):
+        message_controller = MessageController(
+            FakeChannel(channel_index),
+            state_path=":memory:",
+            archive_path=None,
+            brawl_client=brawl_client,
+            chart_renderer=chart_renderer,
+        )
+        channel_tags = tags[channel_index::args.channels]
+        for tag in channel_tags:
+            message_controller.player_map[tag] = tag  # Names are the tags, so polls map back directly
+        if channel_tags:
+            await message_controller.process_message(f"!{message_controller.name} start {' '.join(channel_tags)}")
+        controllers.append(message_controller)
+    api.requests_per_second, api.error_rate, api.timeout_rate = faults
+
+    lag_task = asyncio.create_task(metrics.monitor_event_loop_lag())
+    poll_task = asyncio.create_task(scheduler.run(
+        get_names=lambda: tracked_tags(controllers),
+        poll=lambda player_tags: poll_channels(controllers, player_tags),
+    ))
+    start = time.perf_counter()
+    try:
+        await asyncio.sleep(args.duration)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for message_controller in controllers:
+                if message_controller.players_to_track:
+                    await message_controller._show_progress()
+    finally:
+        poll_task.cancel()
+        lag_task.cancel()
+        elapsed_s = time.perf_counter() - start
+        metrics_summary = metrics.summary()  # Closing the cache takes it out of the gauges
+        await brawl_client.close()
+        chart_renderer.close()
+        await runner.cleanup()
+
+    battles = sum(
+        summary["games"] for message_controller in controllers
+        for summary in message_controller._session_summaries().values()
+    )
+    messages = sum(message_controller.target_channel.messages for message_controller in controllers)
+    print(f"{len(tags)} players in {args.channels} channels for {elapsed_s:.0f}s "
+          f"({elapsed_s * args.time_scale / 60:.0f} simulated minutes)")
+    print(f"Fake API responses: {dict(sorted(api.responses.items()))}")
+    print(f"Battles ingested: {battles}, messages sent: {messages}")
+    print(metrics_summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30, help="real seconds to run")
+    parser.add_argument("--min-interval", type=float, default=2, help="scheduler poll interval after new battles")
+    parser.add_argument("--requests-per-second", type=float, default=50, help="scheduler request budget")
+    parser.add_argument("--client-timeout", type=float, default=10)
+    parser.add_argument("--api-keys", type=int, default=1, help="keys in the client's pool, rate limited separately")
+    parser.add_argument("--key-rate", type=float, default=10, help="client side requests per second per key")
+    parser.set_defaults(time_scale=60.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,218 @@
+"""
+Time the hot paths of MessageController against synthetic players.
+
+    python3 -m benchmarks.run_benchmarks --players 1 10 100 --cycles 20
+    python3 -m benchmarks.run_benchmarks --compare benchmarks/baselines/baseline.json
+
+Results are written as JSON so a later run can be compared against them.
+benchmarks/baselines/baseline.json is the committed reference run, refresh it
+with --output benchmarks/baselines/baseline.json.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from brawler_snapshot import PlayerProfile
+from chart_renderer import ChartRenderer
+from message_controller import MessageController
+from poll_scheduler import TokenBucket
+from response_cache import CachedBrawlClient
+from benchmarks.synthetic import FakeBrawlClient, FakeChannel, SyntheticWorld
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+class Timings:
+    """Wall clock samples per benchmark name"""
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+
+    @contextlib.contextmanager
+    def time(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(name, []).append(time.perf_counter() - start)
+
+    def results(self) -> dict[str, dict]:
+        return {
+            name: {
+                "runs": len(samples),
+                "mean_s": statistics.fmean(samples),
+                "min_s": min(samples),
+                "max_s": max(samples),
+            }
+            for name, samples in self.samples.items()
+        }
+
+
+def retained_bytes(build) -> int:
+    """Memory still allocated by what build() returns"""
+    tracemalloc.start()
+    try:
+        kept = build()  # noqa: F841
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_profiles(world: SyntheticWorld, timings: "Timings") -> dict[str, int]:
+    """Parse time and retained memory of full vs projected player profiles"""
+    payloads = [json.dumps(player.profile()) for player in world.players]
+    with timings.time("parse_player_info_full"):
+        [json.loads(payload) for payload in payloads]
+    with timings.time("parse_player_info_projected"):
+        [PlayerProfile.from_api(json.loads(payload)) for payload in payloads]
+    players = len(payloads)
+    return {
+        "player_info_full_bytes_per_player": retained_bytes(
+            lambda: [json.loads(payload) for payload in payloads]) // players,
+        "player_info_projected_bytes_per_player": retained_bytes(
+            lambda: [PlayerProfile.from_api(json.loads(payload)) for payload in payloads]) // players,
+    }
+
+
+async def run_scale(players: int, cycles: int, battles_per_cycle: int, messages: int,
+                    chart_renderer: ChartRenderer, latency_s: float = 0.0,
+                    seed: int = 0) -> tuple[dict[str, dict], dict[str, int]]:
+    """Run one tracking session with `players` players, return timings of every stage and memory use"""
+    world = SyntheticWorld(players, seed=seed, start=datetime.datetime.now(datetime.timezone.utc))
+    channel = FakeChannel()
+    # TTLs of zero so every cycle really goes through the (fake) API
+    brawl_client = CachedBrawlClient(FakeBrawlClient(world, latency_s), ttls={"player_info": 0, "battle_logs": 0})
+    message_controller = MessageController(
+        channel,
+        state_path=":memory:",
+        archive_path=None,
+        brawl_client=brawl_client,
+        chart_renderer=chart_renderer,
+    )
+    # Measure the bot, not Discord's per-channel rate limit
+    message_controller.outbox.bucket = TokenBucket(1e9)
+    timings = Timings()
+    memory = measure_profiles(world, timings)
+    for player in world.players:
+        message_controller.player_map[player.name] = player.tag
+    names = " ".join(player.name for player in world.players)
+
+    with timings.time("start_tracking"):
+        await message_controller.process_message(f"!{message_controller.name} start {names}")
+
+    for _ in range(cycles):
+        world.advance(battles_per_cycle)
+        with timings.time("update_battle_logs"):
+            await message_controller.update_battle_logs()
+        with timings.time("battle_events_drain"):
+            await message_controller.battle_events.drain()
+
+    with timings.time("show_progress"):
+        await message_controller._show_progress()
+    with timings.time("send_progress_graph"):
+        await message_controller._send_progress_graph()
+    with timings.time("send_trophy_delta_graph"):
+        await message_controller._send_trophy_delta_graph()
+
+    with timings.time(f"process_message_x{messages}"):
+        for index in range(messages):
+            await message_controller.process_message("!status" if index % 2 else "!help")
+
+    # Ends the session, so it goes last
+    with timings.time("end_tracking"):
+        await message_controller._end_tracking()
+
+    message_controller.state_store.close()
+    return timings.results(), memory
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Benchmarks whose mean got slower than baseline by more than threshold (0.2 = 20%)"""
+    regressions = []
+    for scale, results in current["scales"].items():
+        for name, result in results.items():
+            previous = baseline.get("scales", {}).get(scale, {}).get(name)
+            if previous is None or previous["mean_s"] == 0:
+                continue
+            ratio = result["mean_s"] / previous["mean_s"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{scale} players {name}: {previous['mean_s'] * 1000:.2f}ms -> "
+                    f"{result['mean_s'] * 1000:.2f}ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+async def main(args) -> int:
+    # Read the baseline before anything is written, --output may point at the same file
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    chart_renderer = ChartRenderer()
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cycles": args.cycles,
+        "battles_per_cycle": args.battles_per_cycle,
+        "scales": {},
+        "memory": {},
+    }
+    try:
+        # Spawn the render workers up front so the first chart is not charged for it
+        await chart_renderer.render_trophy_chart("warmup", [])
+        for players in args.players:
+            # Controllers print every message they send, which would dominate the timings
+            with contextlib.redirect_stdout(io.StringIO()):
+                results, memory = await run_scale(
+                    players, args.cycles, args.battles_per_cycle, args.messages,
+                    chart_renderer, latency_s=args.latency,
+                )
+            report["scales"][str(players)] = results
+            report["memory"][str(players)] = memory
+            for name, result in results.items():
+                print(f"{players:>5} players {name:<28} mean {result['mean_s'] * 1000:9.2f}ms "
+                      f"min {result['min_s'] * 1000:9.2f}ms max {result['max_s'] * 1000:9.2f}ms")
+            for name, value in memory.items():
+                print(f"{players:>5} players {name:<40} {value} bytes")
+    finally:
+        chart_renderer.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {args.output}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--cycles", type=int, default=20, help="poll cycles per session")
+    parser.add_argument("--battles-per-cycle", type=int, default=1)
+    parser.add_argument("--messages", type=int, default=200, help="commands for the throughput benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated API latency in seconds")
+    parser.add_argument("--output", default=os.path.join(BASELINE_DIR, "latest.json"))
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
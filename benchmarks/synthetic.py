@@ -0,0 +1,192 @@
+"""Synthetic players and battle logs shaped like data_references/battlelog.yaml"""
+import asyncio
+import datetime
+import random
+from brawler_snapshot import PlayerProfile
+
+BRAWLER_ID_BASE = 16000000
+CLUB_SIZE = 30  # Players are put in clubs of this size by index
+BRAWLER_NAMES = [
+    "SHELLY", "COLT", "BULL", "BROCK", "RICO", "SPIKE", "BARLEY", "JESSIE", "NITA", "DYNAMIKE",
+    "EL PRIMO", "MORTIS", "CROW", "POCO", "BO", "PIPER", "PAM", "TARA", "DARRYL", "PENNY",
+    "FRANK", "GENE", "TICK", "LEON", "ROSA", "CARL", "BIBI", "8-BIT", "SANDY", "BEA",
+    "EMZ", "MR. P", "MAX", "JACKY", "GALE", "NANI", "SPROUT", "SURGE", "COLETTE", "AMBER",
+    "LOU", "BYRON", "EDGAR", "RUFFS", "STU", "BELLE", "SQUEAK", "GROM", "BUZZ", "GRIFF",
+]
+EVENTS = [
+    (15000144, "brawlBall", "Sunny Soccer"),
+    (15000007, "gemGrab", "Hard Rock Mine"),
+    (15000025, "heist", "Safe Zone"),
+    (15000050, "knockout", "Belle's Rock"),
+    (15000082, "hotZone", "Ring of Fire"),
+    (15000132, "wipeout", "Layer Cake"),
+]
+BATTLE_TIME_FORMAT = "%Y%m%dT%H%M%S.000Z"
+
+
+def _brawler(rng: random.Random, brawler_id: int, trophies: int) -> dict:
+    return {
+        "id": brawler_id,
+        "name": BRAWLER_NAMES[brawler_id - BRAWLER_ID_BASE],
+        "power": rng.randint(7, 11),
+        "trophies": trophies,
+    }
+
+
+class SyntheticPlayer:
+    """A player with a full profile and a growing battle history"""
+    def __init__(self, rng: random.Random, index: int, tag: str | None = None, name: str | None = None):
+        self.rng = rng
+        self.tag = tag or f"#SYN{index:06d}"
+        self.name = name or f"player{index}"
+        self.club_tag = f"#CLUB{index // CLUB_SIZE:04d}"
+        self.brawlers = {
+            BRAWLER_ID_BASE + i: rng.randint(0, 1000)
+            for i in range(len(BRAWLER_NAMES))
+            if i < 10 or rng.random() < 0.8
+        }
+        self.battles: list[dict] = []
+
+    @property
+    def trophies(self) -> int:
+        return sum(self.brawlers.values())
+
+    def profile(self) -> dict:
+        """Full player profile, including the gadgets/star powers/gears we never read"""
+        return {
+            "tag": self.tag,
+            "name": self.name,
+            "nameColor": "0xffffffff",
+            "icon": {"id": 28000000},
+            "trophies": self.trophies,
+            "highestTrophies": self.trophies + 250,
+            "expLevel": 150,
+            "expPoints": 150000,
+            "isQualifiedFromChampionshipChallenge": False,
+            "3vs3Victories": 5000,
+            "soloVictories": 300,
+            "duoVictories": 400,
+            "bestRoboRumbleTime": 10,
+            "bestTimeAsBigBrawler": 0,
+            "club": {"tag": "#SYNCLUB", "name": "Synthetic Club"},
+            "brawlers": [
+                {
+                    **_brawler(self.rng, brawler_id, trophies),
+                    "rank": min(trophies // 50 + 1, 35),
+                    "highestTrophies": trophies + 50,
+                    "gears": [{"id": 62000000 + i, "name": f"GEAR {i}", "level": 3} for i in range(2)],
+                    "starPowers": [{"id": 23000000 + i, "name": f"STAR POWER {i}"} for i in range(2)],
+                    "gadgets": [{"id": 23100000 + i, "name": f"GADGET {i}"} for i in range(2)],
+                }
+                for brawler_id, trophies in self.brawlers.items()
+            ],
+        }
+
+    def play(self, battle_time: datetime.datetime) -> dict:
+        """Play one ranked 3v3 battle"""
+        rng = self.rng
+        brawler_id = rng.choice(list(self.brawlers))
+        result = rng.choices(["victory", "defeat", "draw"], weights=[50, 45, 5])[0]
+        trophy_change = {"victory": rng.randint(6, 12), "defeat": -rng.randint(3, 8), "draw": 0}[result]
+        self.brawlers[brawler_id] = max(self.brawlers[brawler_id] + trophy_change, 0)
+        me = {"tag": self.tag, "name": self.name, "brawler": _brawler(rng, brawler_id, self.brawlers[brawler_id])}
+        teams = [[me], []]
+        for team in teams:
+            while len(team) < 3:
+                other_id = BRAWLER_ID_BASE + rng.randrange(len(BRAWLER_NAMES))
+                team.append({
+                    "tag": f"#RND{rng.randrange(10 ** 8):08d}",
+                    "name": f"random{rng.randrange(1000)}",
+                    "brawler": _brawler(rng, other_id, rng.randint(0, 1000)),
+                })
+        star_player = rng.choice(teams[0] + teams[1]) if result != "draw" else None
+        event_id, mode, event_map = rng.choice(EVENTS)
+        battle = {
+            "battleTime": battle_time.strftime(BATTLE_TIME_FORMAT),
+            "event": {"id": event_id, "mode": mode, "map": event_map},
+            "battle": {
+                "mode": mode,
+                "type": "ranked",
+                "result": result,
+                "duration": rng.randint(30, 200),
+                "trophyChange": trophy_change,
+                "starPlayer": star_player,
+                "teams": teams,
+            },
+        }
+        self.battles.append(battle)
+        return battle
+
+    def member(self) -> dict:
+        """Entry in the club members list"""
+        return {"tag": self.tag, "name": self.name, "role": "member", "trophies": self.trophies, "icon": {"id": 28000000}}
+
+    def battle_log(self) -> list[dict]:
+        """Most recent 25 battles, newest first, like the API"""
+        return self.battles[:-26:-1]
+
+
+class SyntheticWorld:
+    """Players whose battles advance over simulated time"""
+    def __init__(self, players: int, seed: int = 0, start: datetime.datetime | None = None):
+        self.rng = random.Random(seed)
+        self.now = start or datetime.datetime.now(datetime.timezone.utc)
+        self.players = [SyntheticPlayer(self.rng, index) for index in range(players)]
+        self.by_tag = {player.tag: player for player in self.players}
+
+    def club_members(self, club_tag: str) -> list[dict]:
+        return [player.member() for player in self.players if player.club_tag == club_tag]
+
+    def advance(self, battles: int = 1, minutes_per_battle: int = 3) -> None:
+        """Every player plays `battles` more battles"""
+        for _ in range(battles):
+            self.now += datetime.timedelta(minutes=minutes_per_battle)
+            for player in self.players:
+                player.play(self.now + datetime.timedelta(seconds=self.rng.randint(0, 59)))
+
+
+class FakeBrawlClient:
+    """BrawlClient stand-in serving a SyntheticWorld, with optional simulated latency"""
+    def __init__(self, world: SyntheticWorld, latency_s: float = 0.0):
+        self.world = world
+        self.latency_s = latency_s
+        self.requests = 0
+
+    async def _respond(self, value):
+        self.requests += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return value
+
+    async def lookup_player(self, player_tag: str):
+        player = self.world.by_tag.get(player_tag)
+        return await self._respond((200, PlayerProfile.from_api(player.profile())) if player else (404, None))
+
+    async def get_player_info(self, player_tag: str):
+        _, profile = await self.lookup_player(player_tag)
+        return profile
+
+    async def get_player_battle_logs(self, player_tag: str):
+        player = self.world.by_tag.get(player_tag)
+        return await self._respond(player.battle_log() if player else 404)
+
+    async def get_club_members(self, club_tag: str):
+        members = self.world.club_members(club_tag)
+        return await self._respond([{"tag": m["tag"], "name": m["name"]} for m in members] if members else None)
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeChannel:
+    """TextChannel stand-in that only counts what is sent"""
+    def __init__(self, channel_id: int = 1):
+        self.id = channel_id
+        self.messages = 0
+        self.files = 0
+
+    async def send(self, content=None, file=None):
+        if file is not None:
+            self.files += 1
+        else:
+            self.messages += 1
@@ -1,39 +1,148 @@
 """Client for connecting to brawl stars server"""
+import asyncio
 import os
-import requests
+import random
+import time
+import aiohttp
+from api_key_pool import ApiKeyPool, tokens_from_env
+from brawler_snapshot import PlayerProfile
+from metrics import API_KEYS_BENCHED, API_REQUEST_SECONDS, API_RETRIES
+
+# Worth retrying, possibly with another key. "error" is a timeout or connection failure
+RETRY_STATUSES = (403, 429, 500, 502, 503, 504, "error")
+# Status when no request was sent because every key is benched or out of budget
+THROTTLED = "throttled"
 
 
 class BrawlClient:
-    API_TOKEN = os.environ.get("BRAWL_API_TOKEN")
+    BASE_URL = os.environ.get("BRAWL_API_BASE_URL", "https://api.brawlstars.com/v1")
 
-    def get_player_info(self, player_tag: str):
-        """Get player info from brawl api"""
-        player_tag = player_tag.replace("#", "%23")
-        response = requests.get(
-            url=f"https://api.brawlstars.com/v1/players/{player_tag}",
-            headers={
-                "Authorization": f"Bearer {self.API_TOKEN}"
-            },
-            timeout=10
-        )
-        if response.status_code == 200:
-            data = response.json()  # Parse the JSON response
-            return data
-        else:
+    def __init__(self, limit_per_host: int = 10, timeout: float = 10, keepalive_timeout: float = 60,
+                 base_url: str | None = None, api_tokens: list[str] | None = None,
+                 requests_per_second_per_key: float = 10, max_retries: int = 3,
+                 backoff_base: float = 0.5, rng: random.Random | None = None):
+        """
+        One pooled keep-alive session is shared by every call. It is created lazily
+        because aiohttp sessions have to be opened inside the running event loop.
+        base_url defaults to BRAWL_API_BASE_URL, e.g. a local benchmarks.fake_api server.
+        api_tokens default to BRAWL_API_TOKENS or BRAWL_API_TOKEN, see api_key_pool.
+        Failed requests are retried up to max_retries times, 429s on another key and
+        errors after an exponential backoff with jitter.
+        """
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.api_keys = ApiKeyPool(api_tokens or tokens_from_env(), requests_per_second_per_key)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rng = rng or random.Random()
+        self._session: aiohttp.ClientSession | None = None
+        API_KEYS_BENCHED.set_function(function=self.api_keys.benched)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, opening it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        """Exponential backoff with jitter, never shorter than Retry-After"""
+        delay = self.backoff_base * 2 ** attempt * self.rng.uniform(0.5, 1.5)
+        return max(delay, retry_after or 0.0)
+
+    @staticmethod
+    def _retry_after(response) -> float | None:
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
             return None
 
-    def get_player_battle_logs(self, player_tag: str):
-        """Get battle log for player"""
+    async def _get_once(self, endpoint: str, path: str, key) -> tuple[int | str, dict | None, float | None]:
+        """One GET with one key, return status, parsed JSON on success and Retry-After"""
+        session = self._get_session()
+        start = time.perf_counter()
+        status = "error"
+        retry_after = None
+        try:
+            async with session.get(f"{self.base_url}{path}", headers=key.headers) as response:
+                status = response.status
+                if response.status == 200:
+                    return response.status, await response.json(), None  # Parse the JSON response
+                retry_after = self._retry_after(response)
+                return response.status, None, retry_after
+        finally:
+            API_REQUEST_SECONDS.observe(endpoint, str(status), value=time.perf_counter() - start)
+            self.api_keys.release(key, status, retry_after)
+
+    async def _get(self, endpoint: str, path: str) -> tuple[int | str, dict | None]:
+        """
+        GET a path of the brawl api with retries, return status code and parsed JSON on success.
+        The status is the last one the server sent, THROTTLED if no request could be sent.
+        """
+        status, data, retry_after, error = THROTTLED, None, None, None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                API_RETRIES.inc(endpoint, str(status))
+                if status not in (403, 429):
+                    # 403/429 are per key, the pool already steers the retry to another key
+                    await asyncio.sleep(self._backoff(attempt - 1, retry_after))
+            key = await self.api_keys.acquire(max_wait=self.timeout)
+            if key is None:
+                break  # Every key is benched or out of budget
+            try:
+                status, data, retry_after = await self._get_once(endpoint, path, key)
+                error = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, data, retry_after, error = "error", None, None, e
+            if status not in RETRY_STATUSES:
+                break
+        if error is not None:
+            raise error
+        return status, data
+
+    async def lookup_player(self, player_tag: str) -> tuple[int | str, PlayerProfile | None]:
+        """Get the status code and player info, telling a missing player (404) apart from errors"""
+        encoded_tag = player_tag.replace("#", "%23")
+        status, data = await self._get("player_info", f"/players/{encoded_tag}")
+        if status == 200:
+            return status, PlayerProfile.from_api(data)
+        else:
+            return status, None
+
+    async def get_player_info(self, player_tag: str) -> PlayerProfile | None:
+        """Get player info from brawl api, projected to the fields the bot uses"""
+        _, profile = await self.lookup_player(player_tag)
+        return profile
+
+    async def get_player_battle_logs(self, player_tag: str):
+        """Get battle log for player, or the status code if it could not be fetched"""
         player_tag = player_tag.replace("#", "%23")
-        response = requests.get(
-            url=f"https://api.brawlstars.com/v1/players/{player_tag}/battlelog",
-            headers={
-                "Authorization": f"Bearer {self.API_TOKEN}"
-            },
-            timeout=10
-        )
-        if response.status_code == 200:
-            data = response.json()  # Parse the JSON response
+        status, data = await self._get("battle_logs", f"/players/{player_tag}/battlelog")
+        if status == 200:
             return data.get("items", 0)
         else:
-            return response.status_code
+            return status
+
+    async def get_club_members(self, club_tag: str) -> list[dict] | None:
+        """Get the members of a club as {"tag", "name"} dicts, None if the club is not found"""
+        club_tag = club_tag.replace("#", "%23")
+        status, data = await self._get("club_members", f"/clubs/{club_tag}/members")
+        if status == 200:
+            return [{"tag": member["tag"], "name": member.get("name", "")} for member in data.get("items", [])]
+        else:
+            return None
+
+    async def close(self) -> None:
+        """Close the shared session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,92 @@
+"""Compact per-player brawler trophy snapshots"""
+import sys
+from array import array
+
+BRAWLER_ID_BASE = 16000000
+MAX_BRAWLERS = 1000
+
+# Brawler id -> name, filled in from every profile snapshotted
+BRAWLER_NAMES: dict[int, str] = {}
+
+
+class BrawlerSnapshot:
+    """
+    Total trophies and per-brawler trophies of a player at one point in time.
+    brawler_trophies[i] holds the trophies of brawler id BRAWLER_ID_BASE + i,
+    0 for brawlers the player has not unlocked.
+    """
+    __slots__ = ("trophies", "brawler_trophies")
+
+    def __init__(self, trophies: int, brawler_trophies: array):
+        self.trophies = trophies
+        self.brawler_trophies = brawler_trophies
+
+    @classmethod
+    def from_brawlers(cls, trophies: int, brawlers: list[tuple[int, int]]) -> "BrawlerSnapshot":
+        """Build from (brawler id, trophies) pairs"""
+        indexes = [brawler_id - BRAWLER_ID_BASE for brawler_id, _ in brawlers]
+        valid = [i for i, index in enumerate(indexes) if 0 <= index < MAX_BRAWLERS]
+        brawler_trophies = array("i", bytes(4 * (max((indexes[i] for i in valid), default=-1) + 1)))
+        for i in valid:
+            brawler_trophies[indexes[i]] = brawlers[i][1]
+        return cls(trophies, brawler_trophies)
+
+    @classmethod
+    def from_player_info(cls, player_info: dict) -> "BrawlerSnapshot":
+        """Snapshot a player profile from the brawl api"""
+        for brawler in player_info.get("brawlers", []):
+            BRAWLER_NAMES.setdefault(brawler["id"], sys.intern(brawler["name"]))
+        return cls.from_brawlers(
+            player_info["trophies"],
+            [(brawler["id"], brawler["trophies"]) for brawler in player_info.get("brawlers", [])],
+        )
+
+    def diff(self, end: "BrawlerSnapshot") -> list[tuple[int, int]]:
+        """(brawler id, trophy change) of every brawler whose trophies changed since this snapshot"""
+        start, end = self.brawler_trophies, end.brawler_trophies
+        deltas = []
+        for index in range(max(len(start), len(end))):
+            delta = (end[index] if index < len(end) else 0) - (start[index] if index < len(start) else 0)
+            if delta:
+                deltas.append((index + BRAWLER_ID_BASE, delta))
+        return deltas
+
+    def to_json(self) -> dict:
+        return {"trophies": self.trophies, "brawler_trophies": self.brawler_trophies.tolist()}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "BrawlerSnapshot":
+        return cls(data["trophies"], array("i", data["brawler_trophies"]))
+
+
+class PlayerProfile:
+    """
+    The fields of a player profile the bot reads. The api profile is projected into
+    this right after parsing, so gadgets, star powers, gears and the rest of the
+    document are never cached or kept while tracking.
+    """
+    __slots__ = ("tag", "name", "snapshot")
+
+    def __init__(self, tag: str, name: str, snapshot: BrawlerSnapshot):
+        self.tag = tag
+        self.name = name
+        self.snapshot = snapshot
+
+    @property
+    def trophies(self) -> int:
+        return self.snapshot.trophies
+
+    @classmethod
+    def from_api(cls, player_info: dict) -> "PlayerProfile":
+        return cls(
+            sys.intern(player_info.get("tag", "")),
+            player_info.get("name", ""),
+            BrawlerSnapshot.from_player_info(player_info),
+        )
+
+    def __repr__(self) -> str:
+        return f"PlayerProfile(tag={self.tag!r}, name={self.name!r}, trophies={self.trophies})"
+
+
+def brawler_name(brawler_id: int) -> str:
+    return BRAWLER_NAMES.get(brawler_id, str(brawler_id))
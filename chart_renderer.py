@@ -0,0 +1,77 @@
+"""Render charts off the event loop"""
+import asyncio
+import datetime
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+MAX_LEGEND_ENTRIES = 20  # A whole club's legend would cover the chart
+
+
+def render_trophy_chart(title: str, series: list[tuple]) -> bytes:
+    """
+    Render trophies over time as PNG bytes.
+    series is a list of (label, times, trophies, star_players) tuples, times in
+    epoch seconds and star_players marking which points get a star marker.
+    Uses the object-oriented Agg API so no global pyplot state is touched.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    try:
+        axes = figure.add_subplot()
+        axes.set_title(title)
+        axes.set_xlabel("Time")
+        axes.set_ylabel("Trophies")
+        for label, times, trophies, star_players in series:
+            times = [datetime.datetime.fromtimestamp(time, tz=datetime.timezone.utc) for time in times]
+            axes.plot(times, trophies, marker="*", markevery=star_players, label=label)
+        for tick in axes.get_xticklabels():
+            tick.set_rotation(45)
+            tick.set_horizontalalignment("right")
+        if 0 < len(series) <= MAX_LEGEND_ENTRIES:
+            axes.legend()
+        figure.subplots_adjust(bottom=0.2)
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        figure.clear()
+
+
+class ChartRenderer:
+    """Run chart rendering in a pool of worker processes"""
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn so workers do not inherit the event loop or aiohttp threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def render_trophy_chart(self, title: str, series: list[tuple]) -> bytes:
+        """Render a trophy chart in a worker process, return PNG bytes"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), render_trophy_chart, title, series)
+
+    async def prewarm(self) -> None:
+        """Start every worker and load matplotlib in it, so the first real chart is fast"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, render_trophy_chart, "", [])
+            for _ in range(self.max_workers)
+        ))
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,132 @@
+"""Parse and dispatch chat commands"""
+import asyncio
+import time
+from metrics import COMMAND_ERRORS, COMMAND_SECONDS
+
+
+class ParsedCommand:
+    """A chat message split into its command word and arguments"""
+    __slots__ = ("name", "argument", "args")
+
+    def __init__(self, name: str, argument: str):
+        self.name = name  # Registered command name, aliases resolved
+        self.argument = argument  # Everything after the command word
+        self.args = argument.split()
+
+    def __repr__(self) -> str:
+        return f"ParsedCommand(name={self.name!r}, args={self.args!r})"
+
+
+class CommandSpec:
+    """A registered command"""
+    __slots__ = ("name", "handler", "usage", "description", "aliases", "min_args", "exclusive", "admin_only")
+
+    def __init__(self, name, handler, usage, description, aliases=(), min_args=0, exclusive=True, admin_only=False):
+        self.name = name
+        self.handler = handler  # Coroutine function taking a ParsedCommand
+        self.usage = usage  # {prefix} is replaced with !<bot name>
+        self.description = description
+        self.aliases = tuple(aliases)
+        self.min_args = min_args
+        self.exclusive = exclusive  # Changes state, so runs one at a time
+        self.admin_only = admin_only  # Only for members who can manage the server
+
+
+class CommandStats:
+    """Latency and error counts of one command"""
+    __slots__ = ("calls", "errors", "total_s", "max_s")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def record(self, elapsed_s: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += int(failed)
+        self.total_s += elapsed_s
+        self.max_s = max(self.max_s, elapsed_s)
+
+    def __repr__(self) -> str:
+        mean_ms = self.total_s * 1000 / self.calls if self.calls else 0
+        return f"calls={self.calls} errors={self.errors} mean={mean_ms:.1f}ms max={self.max_s * 1000:.1f}ms"
+
+
+class CommandRegistry:
+    """
+    Lookup table of commands.
+    Top-level commands are keyed with their "!" (e.g. "!help"), bot commands
+    (!<bot name> <command>) by the bare word (e.g. "add").
+    Exclusive commands run one at a time, the others run concurrently with them.
+    """
+    def __init__(self, reply):
+        self.reply = reply  # Coroutine function used for usage errors
+        self._specs: dict[str, CommandSpec] = {}
+        self._lookup: dict[str, CommandSpec] = {}
+        self._lock = asyncio.Lock()
+        self.stats: dict[str, CommandStats] = {}
+
+    def register(self, name: str, handler, usage: str, description: str,
+                 aliases=(), min_args: int = 0, exclusive: bool = True, admin_only: bool = False) -> None:
+        spec = CommandSpec(name, handler, usage, description, aliases, min_args, exclusive, admin_only)
+        for key in (name, *spec.aliases):
+            if key in self._lookup:
+                raise ValueError(f"Command {key} is already registered")
+            self._lookup[key] = spec
+        self._specs[name] = spec
+        self.stats[name] = CommandStats()
+
+    @property
+    def command_words(self) -> list[str]:
+        """Every word that selects a command, aliases included"""
+        return list(self._lookup)
+
+    def parse(self, msg: str, bot_name: str) -> ParsedCommand | None:
+        """Parse a message once, None if it is not a registered command"""
+        word, _, rest = msg.strip().partition(" ")
+        if word == f"!{bot_name}":
+            word, _, rest = rest.strip().partition(" ")
+            if word.startswith("!"):
+                return None
+        elif not word.startswith("!"):
+            return None
+        spec = self._lookup.get(word)
+        if spec is None:
+            return None
+        return ParsedCommand(spec.name, rest.strip())
+
+    async def dispatch(self, command: ParsedCommand, bot_name: str, is_admin: bool = False) -> None:
+        """Run a parsed command, recording its latency and whether it failed"""
+        spec = self._specs[command.name]
+        if spec.admin_only and not is_admin:
+            await self.reply(f"Only server admins can use {spec.usage.format(prefix=f'!{bot_name}')}")
+            return
+        if len(command.args) < spec.min_args:
+            await self.reply(f"Usage: {spec.usage.format(prefix=f'!{bot_name}')}")
+            return
+        start = time.perf_counter()
+        failed = True
+        try:
+            if spec.exclusive:
+                async with self._lock:
+                    await spec.handler(command)
+            else:
+                await spec.handler(command)
+            failed = False
+        finally:
+            elapsed_s = time.perf_counter() - start
+            self.stats[spec.name].record(elapsed_s, failed)
+            COMMAND_SECONDS.observe(spec.name, value=elapsed_s)
+            if failed:
+                COMMAND_ERRORS.inc(spec.name)
+
+    def help_lines(self, bot_name: str) -> list[str]:
+        """One "usage - description" line per command"""
+        return [
+            f"{spec.usage.format(prefix=f'!{bot_name}')} - {spec.description}"
+            for spec in self._specs.values()
+        ]
+
+    def __str__(self) -> str:
+        return ", ".join(f"{name}({stats})" for name, stats in self.stats.items() if stats.calls)
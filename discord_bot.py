@@ -1,66 +1,219 @@
 import asyncio
+import glob
+import re
+import time
 import discord
+from battle_archive import BattleArchive
+from brawl_client import BrawlClient
+from chart_renderer import ChartRenderer
 from message_controller import MessageController
+from metrics import STARTUP_SECONDS, monitor_event_loop_lag, start_metrics_server, startup_text
+from poll_scheduler import PollScheduler
+from response_cache import CachedBrawlClient
 
 
 class DiscordBot:
     """Handle making discord bot"""
-    def __init__(self, token: str, channel_id: int):
-        # Store bot token and target channel ID
+    STATE_PATH_PATTERN = "message_controller_state_{channel_id}.db"
+    LEGACY_PICKLE_PATH = "message_controller_state.pkl"  # State of single-channel deployments
+
+    def __init__(self, token: str, channel_id: int | None = None, metrics_port: int | None = 9108,
+                 prewarm: bool = True, club_sync_interval: float = 3600):
+        # Store bot token and the channel that gets redeploy announcements
         self.token = token
         self.channel_id = channel_id
+        self.metrics_port = metrics_port  # None disables the local /metrics endpoint
+        self.prewarm = prewarm  # Start chart workers in the background once connected
+        self.club_sync_interval = club_sync_interval  # Seconds between club membership syncs
+        self._run_started_at: float | None = None
 
         intents = discord.Intents.default()
         intents.message_content = True  # Enable message content intent
 
         self.client = discord.Client(intents=intents)  # Pass intents to the client
-        self.message_controller = None
+
+        # Shared by every channel so a player tracked in several guilds is fetched once
+        brawl_client = BrawlClient()
+        self.brawl_client = CachedBrawlClient(brawl_client)
+        self.chart_renderer = ChartRenderer()
+        self.battle_archive = BattleArchive()
+        # Every API key adds to the poll budget
+        self.poll_scheduler = PollScheduler(requests_per_second=2.0 * len(brawl_client.api_keys))
+        self.message_controllers: dict[int, MessageController] = {}
+        self._poll_task: asyncio.Task | None = None
+        self._club_sync_task: asyncio.Task | None = None
+        self._metrics_runner = None
 
         # Set up events
         self.client.event(self.on_ready)
         self.client.event(self.on_message)
 
+    def _state_path(self, channel_id: int) -> str:
+        # The announcement channel keeps the state file from single-channel deployments
+        if channel_id == self.channel_id:
+            return "message_controller_state.db"
+        return self.STATE_PATH_PATTERN.format(channel_id=channel_id)
+
+    def _new_message_controller(self, channel: discord.TextChannel) -> MessageController:
+        """A controller for a channel, its state file is only opened by load_state"""
+        return MessageController(
+            target_channel=channel,
+            state_path=self._state_path(channel.id),
+            brawl_client=self.brawl_client,
+            chart_renderer=self.chart_renderer,
+            battle_archive=self.battle_archive,
+        )
+
+    def _load_message_controller(self, message_controller: MessageController) -> None:
+        channel_id = message_controller.target_channel.id
+        # Only the announcement channel inherits the old single-channel state
+        message_controller.load_state(self.LEGACY_PICKLE_PATH if channel_id == self.channel_id else None)
+        self.message_controllers[channel_id] = message_controller
+        print(f"MessageController for channel {channel_id} is ready")
+
+    def get_message_controller(self, channel: discord.TextChannel) -> MessageController:
+        """Return the controller of a channel, creating and loading it on first use"""
+        message_controller = self.message_controllers.get(channel.id)
+        if message_controller is None:
+            message_controller = self._new_message_controller(channel)
+            self._load_message_controller(message_controller)
+        return message_controller
+
+    def _saved_channel_ids(self) -> list[int]:
+        """Channels with saved state, so their running sessions resume at startup"""
+        channel_ids = [] if self.channel_id is None else [self.channel_id]
+        for path in glob.glob(self.STATE_PATH_PATTERN.format(channel_id="*")):
+            match = re.search(r"_(\d+)\.db$", path)
+            if match:
+                channel_ids.append(int(match.group(1)))
+        return channel_ids
+
+    def record_startup(self, phase: str, seconds: float) -> None:
+        """Record how long a startup phase took, shown at boot and in !metrics"""
+        STARTUP_SECONDS.set(phase, value=seconds)
+
+    async def _prewarm(self) -> None:
+        start = time.perf_counter()
+        try:
+            await self.chart_renderer.prewarm()
+        except Exception as e:
+            print(f"Error prewarming chart renderer: {e}")
+            return
+        self.record_startup("prewarm", time.perf_counter() - start)
+        print(f"Startup timing: {startup_text()}")
+
     async def on_ready(self):
         """Called when the bot has successfully connected to Discord."""
         print(f"Logged in as {self.client.user}")
+        first_ready = self._poll_task is None
+        if first_ready and self._run_started_at is not None:
+            self.record_startup("connect", time.perf_counter() - self._run_started_at)
 
-        # Get the target channel
-        target_channel = self.client.get_channel(self.channel_id)
+        start = time.perf_counter()
+        for channel_id in self._saved_channel_ids():
+            channel = self.client.get_channel(channel_id)
+            if isinstance(channel, discord.TextChannel):
+                self.get_message_controller(channel)
+            else:
+                print(f"Could not find channel with ID {channel_id}")
+        if first_ready:
+            self.record_startup("state_load", time.perf_counter() - start)
+            print(f"Startup timing: {startup_text()}")
 
-        if isinstance(target_channel, discord.TextChannel):
-            # Initialize the MessageController with the Discord client and target channel
-            self.message_controller = MessageController(
-                target_channel=target_channel
+        announcement_controller = self.message_controllers.get(self.channel_id)
+        if announcement_controller is not None:
+            await announcement_controller.send_message(
+                f"Brawl bot redeployed, version {announcement_controller.version}"
             )
-            self.message_controller.load_state()
-            print("MessageController is ready")
 
-            await self.message_controller.send_message(
-                f"Brawl bot redeployed, version {self.message_controller.version}"
-            )
+        if first_ready:
+            self._poll_task = self.client.loop.create_task(self.update_battle_logs_periodically())
+            self._club_sync_task = self.client.loop.create_task(self.sync_clubs_periodically())
+            self.client.loop.create_task(monitor_event_loop_lag())
+            if self.prewarm:
+                self.client.loop.create_task(self._prewarm())
+            if self.metrics_port is not None:
+                self._metrics_runner = await start_metrics_server(port=self.metrics_port)
+                print(f"Serving metrics on http://127.0.0.1:{self.metrics_port}/metrics")
+
+    def _tracked_tags(self) -> set[str]:
+        """Tags of every player tracked in any channel"""
+        return tracked_tags(self.message_controllers.values())
 
-            self.client.loop.create_task(self.update_battle_logs_periodically())
-        else:
-            print(f"Could not find channel with ID {self.channel_id}")
+    async def poll_players(self, player_tags: list[str]) -> dict[str, int]:
+        """Ingest new battles for the given tags in every channel tracking them."""
+        return await poll_channels(self.message_controllers.values(), player_tags)
 
     async def update_battle_logs_periodically(self):
-        """Call update_battle_logs every 5 minutes."""
+        """Poll each tracked player whenever the scheduler says they are due."""
+        await self.poll_scheduler.run(get_names=self._tracked_tags, poll=self.poll_players)
+
+    async def sync_clubs_periodically(self):
+        """Pick up club membership changes in every channel every club_sync_interval seconds."""
         while True:
-            try:
-                if self.message_controller:
-                    await self.message_controller.update_battle_logs()
-            except Exception as e:
-                print(f"Error updating battle logs: {e}")
-            await asyncio.sleep(120)  # 2 minutes
+            await asyncio.sleep(self.club_sync_interval)
+            for message_controller in list(self.message_controllers.values()):
+                try:
+                    await message_controller.sync_clubs()
+                except Exception as e:
+                    print(f"Error syncing clubs for channel {message_controller.target_channel.id}: {e}")
 
     async def on_message(self, message: discord.Message):
         """Called when a message is sent in a channel the bot has access to."""
         if message.author == self.client.user:
             return  # Ignore the bot's own messages
 
-        if message.content.startswith("!"):
-            await self.message_controller.process_message(message.content)
+        if message.content.startswith("!") and isinstance(message.channel, discord.TextChannel):
+            message_controller = self.message_controllers.get(message.channel.id)
+            if message_controller is None:
+                message_controller = self._new_message_controller(message.channel)
+                if message_controller.command_registry.parse(message.content, message_controller.name) is None:
+                    return  # Not a command, so the channel gets no controller or state file
+                self._load_message_controller(message_controller)
+            permissions = getattr(message.author, "guild_permissions", None)  # Only server members have them
+            await message_controller.process_message(message.content, is_admin=bool(permissions and permissions.manage_guild))
 
     def run(self):
         """Start the bot."""
+        self._run_started_at = time.perf_counter()
         self.client.run(self.token)
+
+
+def tracked_tags(message_controllers) -> set[str]:
+    """Tags of every player tracked in any of the channels"""
+    return {
+        message_controller.player_map[name]
+        for message_controller in message_controllers
+        for name in message_controller.player_battle_map
+        if name in message_controller.player_map
+    }
+
+
+async def poll_channels(message_controllers, player_tags: list[str]) -> dict[str, int]:
+    """
+    Ingest new battles for the given tags in every channel tracking them.
+    Channels run concurrently through the shared cached client, so each tag is
+    fetched once per cycle however many channels track it.
+    """
+    player_tags = set(player_tags)
+    jobs = []
+    for message_controller in message_controllers:
+        names = [
+            name for name in message_controller.player_battle_map
+            if message_controller.player_map.get(name) in player_tags
+        ]
+        if names:
+            jobs.append((message_controller, message_controller.update_battle_logs(names)))
+    results = await asyncio.gather(*(job for _, job in jobs), return_exceptions=True)
+
+    new_battles: dict[str, int] = {}
+    for (message_controller, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"Error updating battle logs for channel {message_controller.target_channel.id}: {result}")
+            continue
+        for name, count in result.items():
+            player_tag = message_controller.player_map.get(name)
+            if player_tag is None:
+                continue  # Removed while polling
+            new_battles[player_tag] = max(new_battles.get(player_tag, 0), count)
+    return new_battles
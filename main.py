@@ -1,11 +1,25 @@
 """Handle I/O of messages to discord bot"""
-import os
-from discord_bot import DiscordBot
+import time
+IMPORT_STARTED_AT = time.perf_counter()
+import os  # noqa: E402
+from discord_bot import DiscordBot  # noqa: E402
 
 if __name__ == "__main__":
+    import_seconds = time.perf_counter() - IMPORT_STARTED_AT
     bot_token = os.environ["BRAWL_DISCORD_BOT_TOKEN"]  # Replace with your bot's token
-    channel_id = os.environ["BRAWL_DISCORD_BOT_CHANNEL_ID"]  # Replace with your target channel's ID
+    # Optional: channel that gets redeploy announcements, every other channel is served on first message
+    channel_id = os.environ.get("BRAWL_DISCORD_BOT_CHANNEL_ID")
+    # Optional: port of the local Prometheus /metrics endpoint, 0 disables it
+    metrics_port = int(os.environ.get("BRAWL_METRICS_PORT", "9108"))
+    # Optional: 0 skips starting the chart workers in the background after connecting
+    prewarm = os.environ.get("BRAWL_PREWARM", "1") != "0"
 
     # Create and run the bot
-    bot = DiscordBot(token=bot_token, channel_id=channel_id)
+    bot = DiscordBot(
+        token=bot_token,
+        channel_id=int(channel_id) if channel_id else None,
+        metrics_port=metrics_port or None,
+        prewarm=prewarm,
+    )
+    bot.record_startup("import", import_seconds)
     bot.run()
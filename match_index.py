@@ -0,0 +1,91 @@
+"""Recognize a match once when several tracked players were in it"""
+from battle_record import BattleRecord, battle_time_to_epoch
+
+# Most idle time between two squad matches that leaves no room for a match in between
+SQUAD_GAP_S = 60
+
+
+def roster(game_info: dict) -> frozenset[str]:
+    """Tags of everyone in a battle log item"""
+    battle = game_info["battle"]
+    participants = [player for team in battle.get("teams") or [] for player in team]
+    participants += battle.get("players") or []
+    return frozenset(player["tag"] for player in participants if player.get("tag"))
+
+
+class Match:
+    """
+    One battle log item with the tags of everyone in it. Battles without a roster
+    also carry their BattleRecord.key, as their roster cannot tell them apart.
+    """
+    __slots__ = ("battle_time", "duration", "roster", "game_info", "record_key")
+
+    def __init__(self, battle_time: int, roster: frozenset[str], game_info: dict, record_key: str = ""):
+        self.battle_time = battle_time
+        self.duration = game_info["battle"].get("duration", 0)
+        self.roster = roster
+        self.game_info = game_info
+        self.record_key = record_key
+
+    @property
+    def key(self) -> tuple[int, frozenset[str], str]:
+        return self.battle_time, self.roster, self.record_key
+
+
+class MatchIndex:
+    """
+    Battles from the logs fetched in one poll cycle, keyed by battle time and roster.
+    A match in several tracked players' logs is stored once. Battles without a
+    roster are keyed by the player whose log they came from and the battle itself.
+    """
+    def __init__(self):
+        self._matches: dict[tuple[int, frozenset[str], str], Match] = {}
+        self._by_tag: dict[str, list[Match]] = {}
+
+    def __len__(self) -> int:
+        return len(self._matches)
+
+    def add_log(self, game_log: list[dict], player_tag: str, since: int = 0) -> int:
+        """Index battles at or after `since` (epoch seconds), return how many were new"""
+        added = 0
+        for game_info in game_log:
+            battle_time = battle_time_to_epoch(game_info["battleTime"])
+            if battle_time < since:
+                continue
+            tags = roster(game_info)
+            if player_tag in tags:
+                match = Match(battle_time, tags, game_info)
+            else:
+                record_key = BattleRecord.from_api(game_info, player_tag, battle_time).key
+                match = Match(battle_time, frozenset((player_tag,)), game_info, record_key)
+            if match.key not in self._matches:
+                self._matches[match.key] = match
+                for tag in match.roster:
+                    self._by_tag.setdefault(tag, []).append(match)
+                added += 1
+        return added
+
+    def matches(self) -> list[Match]:
+        """Every indexed match, oldest first"""
+        return sorted(
+            self._matches.values(), key=lambda match: (match.battle_time, sorted(match.roster), match.record_key),
+        )
+
+    def covers(self, player_tag: str, last_battle_time: int) -> bool:
+        """
+        Whether the indexed logs hold every battle of a player after their last
+        ingested one: that battle is indexed and is followed by at least one more
+        match with the player, with no gap long enough for a match without them.
+        """
+        if not last_battle_time:
+            return False
+        chain = sorted(
+            (match for match in self._by_tag.get(player_tag, ()) if match.battle_time >= last_battle_time),
+            key=lambda match: match.battle_time,
+        )
+        if len(chain) < 2 or chain[0].battle_time != last_battle_time:
+            return False
+        return all(
+            later.battle_time - earlier.battle_time - min(earlier.duration, later.duration) <= SQUAD_GAP_S
+            for earlier, later in zip(chain, chain[1:])
+        )
@@ -1,68 +1,108 @@
 """Translate message to actions"""
+import asyncio
 import datetime
-import os
-import pickle
+import io
 import random
 from discord import File, TextChannel
-from brawl_client import BrawlClient
-from matplotlib import pyplot as plt
+from battle_archive import BattleArchive
+from battle_events import BattleEvent, EventBus
+from battle_record import BattleRecord
+from brawl_client import THROTTLED, BrawlClient
+from brawler_snapshot import BrawlerSnapshot, brawler_name
+from chart_renderer import ChartRenderer
+from command_registry import CommandRegistry, ParsedCommand
+import metrics
+from message_queue import MessageQueue
+from profiler import Profiler
+from match_index import MatchIndex
+from metrics import BATTLE_LOGS_SKIPPED, DISCORD_SEND_SECONDS, POLL_CYCLE_SECONDS
+from response_cache import CachedBrawlClient
+from state_store import StateStore
+from trophy_series import TrophySeries
+
+CLUB_STATS = ("games", "victories", "defeats", "star_players")  # Battle stats added up per club
 
 
 class MessageController:
     """Process messages and perform actions"""
-    def __init__(self, target_channel: TextChannel):
-        self.message_char_len_limit = 100
+    def __init__(
+        self,
+        target_channel: TextChannel,
+        state_path: str = "message_controller_state.db",
+        archive_path: str | None = "battle_archive",
+        brawl_client: CachedBrawlClient | None = None,
+        chart_renderer: ChartRenderer | None = None,
+        battle_archive: BattleArchive | None = None,
+    ):
+        """
+        brawl_client, chart_renderer and battle_archive can be shared between
+        controllers of different channels, otherwise each controller makes its own.
+        """
         self.name = "brawlbot"
-        self.available_commands = [
-            "!help", "!setname", "!status", "!debug", "start", "add", "end"
-        ]
-        self.players_to_track: dict[str, dict] = {}
+        self.command_registry = self._register_commands()
+        self.players_to_track: dict[str, BrawlerSnapshot] = {}
         self.player_map: dict[str, str] = {}
+        self.clubs: dict[str, str] = {}  # Club name -> club tag
+        self.player_clubs: dict[str, str] = {}  # Player name -> club name
         self.player_battle_map: dict[str, dict] = {}
-        self.brawl_client = BrawlClient()
+        self.trophy_series: dict[str, TrophySeries] = {}
+        self.squads: dict[str, frozenset[str]] = {}  # Tracked players in each player's last match, if several
+        self.brawl_client = brawl_client or CachedBrawlClient(BrawlClient())
+        self.max_concurrent_requests = 10
+        self.chart_renderer = chart_renderer or ChartRenderer()
+        self.state_store = StateStore(state_path)
+        self.battle_archive = battle_archive or BattleArchive(archive_path)
         self.target_channel = target_channel
+        self.outbox = MessageQueue(self._post_message)
+        self.battle_events = self._subscribe_stages(EventBus())
+        self.profiler = Profiler()
         self.start_time = None
         self.version = "1.1.2"
 
+    async def _post_message(self, msg: str) -> None:
+        with DISCORD_SEND_SECONDS.time("message"):
+            await self.target_channel.send(msg)
+
     async def send_message(self, msg: str) -> None:
-        """Send message to Discord server"""
+        """Send message to Discord server, split if it is over the length limit"""
+        if not self.target_channel:
+            raise ValueError("Target channel is not set.")
+        print(msg)
+        await self.outbox.send(msg)
+
+    def notify(self, msg: str) -> None:
+        """Queue a message without waiting, queued messages go out merged at the end of the poll cycle"""
         if not self.target_channel:
             raise ValueError("Target channel is not set.")
         print(msg)
-        await self.target_channel.send(msg)
+        self.outbox.post(msg)
 
-    async def send_file(self, file_path: str) -> None:
-        """Send a file to Discord server"""
+    async def send_file(self, data: bytes, filename: str) -> None:
+        """Send an in-memory file to Discord server"""
         if not self.target_channel:
             raise ValueError("Target channel is not set.")
-        print(file_path)
-        with open(file_path, 'rb') as f:
-            await self.target_channel.send(file=File(f))
+        print(filename)
+
+        async def post():
+            with DISCORD_SEND_SECONDS.time("file"):
+                await self.target_channel.send(file=File(io.BytesIO(data), filename=filename))
+
+        await self.outbox.send_with(post)
 
     async def _send_help_message(self) -> None:
         """Send help message"""
-        command_descriptions = {
-            "!help": "print out all commands",
-            "!setname <bot_name>": "set activation <bot_name> of bot",
-            f"!{self.name} status": "show status of bot",
-            f"!{self.name} add <player_name> <brawlstars_tag>": "add a player to storage",
-            f"!{self.name} remove <player_name>": "remove a player from storage",
-            f"!{self.name} grind": "start tracking all added players",
-            f"!{self.name} start <player names separated by spaces>": "start tracking all added players",
-            f"!{self.name} progress / edge": "show temporary progress of players",
-            f"!{self.name} end / cum": "end tracking and show stats",
-            f"!{self.name} reset": "empty all currently tracked players",
-            "!debug": "show full status of bot",
-        }
         help_msg = "List of available commands: \n"
-        for cmd, desc in command_descriptions.items():
-            help_msg += f"\t{cmd} - {desc}\n"
+        for line in self.command_registry.help_lines(self.name):
+            help_msg += f"\t{line}\n"
         await self.send_message(help_msg)
 
     async def _send_status_message(self) -> None:
         """Send status message of bot"""
         status_msg = f"Bot name: {self.name}\n"
         status_msg += f"Version: {self.version}\n"
+        for club, tag in self.clubs.items():
+            members = sum(player_club == club for player_club in self.player_clubs.values())
+            status_msg += f"Club {club} ({tag}): {members} members\n"
         status_msg += "Tracked players:\n"
         for player in self.players_to_track:
             status_msg += f"\t{player}\n"
@@ -75,6 +115,7 @@ class MessageController:
             return
         name_change_msg = f"Changed bot name from {self.name}"
         self.name = name
+        self.state_store.set_setting("name", name)
         await self.send_message(f"{name_change_msg} to {self.name}")
 
     async def _show_registered_players(self) -> None:
@@ -84,21 +125,120 @@ class MessageController:
         await self.send_message(registered_players_msg)
 
     async def _add_player(self, player_name: str, player_tag: str):
-        if self.brawl_client.get_player_info(player_tag) is None:
-            await self.send_message(f"Unable to find player tag {player_tag}")
+        await self._add_players([player_name, player_tag])
+
+    async def _add_players(self, args: list[str]) -> None:
+        """Register <name> <tag> pairs, looking up every tag concurrently"""
+        if len(args) % 2:
+            await self.send_message(f"Missing a player tag for {args[-1]}")
             return
-        self.player_map[player_name] = player_tag
-        await self.send_message(f"Added player {player_name} with player tag {player_tag}")
+        pairs = list(zip(args[::2], args[1::2]))
+        lookups = await self._gather_limited(
+            self.brawl_client.lookup_player, [player_tag for _, player_tag in pairs], return_exceptions=True,
+        )
+        lines = []
+        for (player_name, player_tag), lookup in zip(pairs, lookups):
+            status, profile = (None, None) if isinstance(lookup, Exception) else lookup
+            if profile is not None:
+                self.player_map[player_name] = player_tag
+                self.state_store.put_player(player_name, player_tag)
+                lines.append(f"Added player {player_name} with player tag {player_tag}")
+            elif status == 404:
+                lines.append(f"Unable to find player tag {player_tag}")
+            else:
+                lines.append(f"Error looking up player tag {player_tag}, try again later")
+        await self.send_message("\n".join(lines))
 
     async def _remove_player(self, player_name: str):
         if player_name in self.player_map:
             del self.player_map[player_name]
-            if player_name in self.players_to_track:
-                del self.players_to_track[player_name]
+            self.players_to_track.pop(player_name, None)
+            self.player_battle_map.pop(player_name, None)
+            self.trophy_series.pop(player_name, None)
+            self.squads.pop(player_name, None)
+            self.player_clubs.pop(player_name, None)
+            self.state_store.delete_player(player_name)
             await self.send_message(f"Player {player_name} removed")
         else:
             await self.send_message(f"Could not find player {player_name} to remove")
 
+    def _member_name(self, member: dict) -> str:
+        """Player name for a club member: their in-game name without spaces, made unique with the tag"""
+        name = "_".join(member["name"].split()) or member["tag"].lstrip("#")
+        if name in self.player_map:
+            name = f"{name}_{member['tag'].lstrip('#')}"
+        return name
+
+    def _apply_club_members(self, club_name: str, members: list[dict]) -> tuple[list[str], list[str]]:
+        """
+        Register club members not registered yet and move everyone to the club.
+        Return the newly registered players and the members who left the club.
+        """
+        names_by_tag = {tag: name for name, tag in self.player_map.items()}
+        member_names = set()
+        registered = []
+        for member in members:
+            name = names_by_tag.get(member["tag"])
+            if name is None:
+                name = self._member_name(member)
+                self.player_map[name] = member["tag"]
+                names_by_tag[member["tag"]] = name
+                self.state_store.put_player(name, member["tag"])
+                registered.append(name)
+            if self.player_clubs.get(name) != club_name:
+                self.player_clubs[name] = club_name
+                self.state_store.put_club_member(name, club_name)
+            member_names.add(name)
+        left = [name for name, club in self.player_clubs.items() if club == club_name and name not in member_names]
+        for name in left:
+            del self.player_clubs[name]  # Stays registered, only leaves the club's stats
+            self.state_store.delete_club_member(name)
+        return registered, left
+
+    async def _add_club(self, club_name: str, club_tag: str) -> None:
+        """Register every member of a club with one API call"""
+        members = await self.brawl_client.get_club_members(club_tag)
+        if members is None:
+            await self.send_message(f"Unable to find club tag {club_tag}")
+            return
+        self.clubs[club_name] = club_tag
+        self.state_store.put_club(club_name, club_tag)
+        registered, _ = self._apply_club_members(club_name, members)
+        await self.send_message(
+            f"Added club {club_name} with club tag {club_tag}: {len(members)} members, "
+            f"{len(registered)} newly registered"
+        )
+
+    async def _remove_club(self, club_name: str) -> None:
+        if club_name not in self.clubs:
+            await self.send_message(f"Could not find club {club_name} to remove")
+            return
+        del self.clubs[club_name]
+        self.player_clubs = {name: club for name, club in self.player_clubs.items() if club != club_name}
+        self.state_store.delete_club(club_name)
+        await self.send_message(f"Club {club_name} removed, its members stay registered")
+
+    async def sync_clubs(self) -> None:
+        """Register members who joined each club and drop the ones who left from its stats"""
+        club_names = list(self.clubs)
+        member_lists = await asyncio.gather(
+            *(self.brawl_client.get_club_members(self.clubs[club_name]) for club_name in club_names),
+            return_exceptions=True,
+        )
+        for club_name, members in zip(club_names, member_lists):
+            if club_name not in self.clubs or members is None or isinstance(members, Exception):
+                continue  # Removed while fetching, or try again next sync
+            registered, left = self._apply_club_members(club_name, members)
+            if registered:
+                self.notify(f"Club {club_name}: registered {', '.join(registered)}")
+            if left:
+                self.notify(f"Club {club_name}: {', '.join(left)} left")
+        self.outbox.flush()
+        self.save_state()
+
+    def _club_members(self, club_name: str) -> list[str]:
+        return [name for name, club in self.player_clubs.items() if club == club_name]
+
     async def _start_tracking(self, names_to_track: str):
         """
         Start tracking a game. Log:
@@ -107,30 +247,32 @@ class MessageController:
         - Star players
         """
         start_tracking_msg = "Started tracking players:\n"
-        names = names_to_track.split(" ")
+        names = names_to_track.split()
         for name in names:
             if name not in self.player_map:
                 await self.send_message(f"Player {name} is not registered")
                 return
-            player_info = self.brawl_client.get_player_info(self.player_map[name])
-            if player_info is None:
-                await self.send_message("Error connecting to brawl API, might need to reset IP address")
-                return
-            self.players_to_track[name] = player_info
-            self.player_battle_map[name] = {
-                "battle_start_times": set(),
-                "star_players": 0,
-                "game_durations_s": 0,
-                "victories": 0,
-                "defeats": 0,
-                "consecutive_victories": 0,
-                "consecutive_losses": 0,
-            }
-            start_tracking_msg += f"\tName: {name}, Start Trophies: {player_info['trophies']}\n"
+        profiles = await self._fetch_concurrently(self.brawl_client.get_player_info, names, return_exceptions=True)
+        failed = [name for name, profile in zip(names, profiles) if profile is None or isinstance(profile, Exception)]
+        if failed:
+            await self.send_message(
+                f"Error connecting to brawl API for {', '.join(failed)}, might need to reset IP address"
+            )
+            return
+        for name, profile in zip(names, profiles):
+            self.players_to_track[name] = profile.snapshot
+            self.player_battle_map[name] = self._new_battle_map()
+            self.trophy_series[name] = TrophySeries(profile.trophies)
+            start_tracking_msg += f"\tName: {name}, Start Trophies: {profile.trophies}\n"
         await self.send_message(start_tracking_msg)
         self.start_time = datetime.datetime.now(tz=datetime.timezone.utc)
+        self.state_store.start_session(
+            self.start_time,
+            self.players_to_track,
+            self.player_battle_map,
+        )
 
-    async def berate_player(self, player_name, consecutive_victories, consecutive_losses):
+    def berate_player(self, player_name, consecutive_victories, consecutive_losses):
         if consecutive_victories >= 5:
             congratulations_messages = [
                 f"{player_name} is popping off, {consecutive_victories} wins in a row!",
@@ -153,7 +295,7 @@ class MessageController:
                 f"{player_name} has been bending teams over {consecutive_victories} times in a row. At this point it’s a kink",
                 f"{player_name} made {consecutive_victories} matches look like casting couch auditions.",
             ]
-            await self.send_message(random.choice(congratulations_messages))
+            self.notify(random.choice(congratulations_messages))
             return
         if consecutive_losses >= 3:
             roast_messages = [
@@ -242,156 +384,354 @@ class MessageController:
                 f"{player_name} lost {consecutive_losses} games in a row—at this point it’s not matchmaking, it’s a gangbang.",
                 f"{player_name} just got run through {consecutive_losses} times like a Tinder hookup in a Wi-Fi dead zone.",
             ]
-            await self.send_message(random.choice(roast_messages))
+            self.notify(random.choice(roast_messages))
         return
 
-    async def update_battle_logs(self) -> None:
-        for name, battle_map in self.player_battle_map.items():
-            game_log = self.brawl_client.get_player_battle_logs(self.player_map[name])
-            if isinstance(game_log, int):
-                await self.send_message(f"Error {game_log} with brawl API for updating battle logs, try sending message again")
-                return
+    async def _gather_limited(self, get, tags: list[str], return_exceptions: bool = False) -> list:
+        """Call get(tag) for tags concurrently, at most max_concurrent_requests at a time"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
 
-            for game_info in game_log:
-                if datetime.datetime.strptime(
-                    game_info["battleTime"], "%Y%m%dT%H%M%S.000Z"
-                ).replace(tzinfo=datetime.timezone.utc) < self.start_time:
-                    continue
-                if game_info["battleTime"] in battle_map["battle_start_times"]:
+        async def fetch(tag: str):
+            async with semaphore:
+                return await get(tag)
+
+        return await asyncio.gather(*(fetch(tag) for tag in tags), return_exceptions=return_exceptions)
+
+    async def _fetch_concurrently(self, get, names: list[str], return_exceptions: bool = False) -> list:
+        """Call get(player tag) for registered players concurrently"""
+        return await self._gather_limited(get, [self.player_map[name] for name in names], return_exceptions)
+
+    async def _fetch_battle_logs(self, names: list[str]) -> list:
+        """Fetch battle logs for players concurrently, errors returned in place"""
+        return await self._fetch_concurrently(self.brawl_client.get_player_battle_logs, names, return_exceptions=True)
+
+    async def update_battle_logs(self, names: list[str] | None = None) -> dict[str, int]:
+        """
+        Ingest new battles for the given tracked players (default all), return new battle
+        count per player. Stats, streaks, trophy series and persistence catch up through
+        battle_events, await battle_events.drain() to read them.
+        """
+        try:
+            with POLL_CYCLE_SECONDS.time():
+                if self.profiler.cycles:  # Armed by !profile
+                    return await self._profiled("cycle", self._ingest_battle_logs(names))
+                return await self._ingest_battle_logs(names)
+        finally:
+            # API errors queued by notify() this cycle, even when the cycle raised
+            self.outbox.flush()
+
+    async def _ingest_battle_logs(self, names: list[str] | None) -> dict[str, int]:
+        if names is None:
+            names = list(self.player_battle_map)
+        names = [name for name in names if name in self.player_battle_map]
+        if self.start_time is None:
+            return {}
+        # Teammates not due yet still get their battles from a leader's log, so squads
+        # whose schedules drifted apart are fetched once
+        outside = self._squadmates_outside(names)
+        leaders, followers = self._split_squads(names, outside)
+        match_index = MatchIndex()
+        polled = await self._index_battle_logs(match_index, list(leaders), leaders)
+        # A follower's teammate's log may already hold all of their new battles
+        covered, uncovered = [], []
+        for name in followers:
+            battle_map = self.player_battle_map.get(name)
+            if battle_map is not None and match_index.covers(self.player_map[name], battle_map["last_battle_time"]):
+                covered.append(name)
+            elif name not in outside:
+                uncovered.append(name)
+        BATTLE_LOGS_SKIPPED.inc(amount=len(covered))
+        polled += covered
+        polled += await self._index_battle_logs(match_index, uncovered)
+        if self.start_time is None:
+            return {}  # Tracking was reset while fetching
+
+        polled = set(polled)
+        polled = [name for name in names + outside if name in polled and name in self.player_battle_map]
+        return await self._apply_matches(match_index, polled)
+
+    def _squadmates_outside(self, names: list[str]) -> list[str]:
+        """Tracked teammates of the given players that are not among them"""
+        outside = {
+            teammate for name in names for teammate in self.squads.get(name, ())
+            if teammate not in names and teammate in self.player_battle_map
+        }
+        return sorted(outside)
+
+    async def _apply_matches(self, match_index: MatchIndex, polled: list[str]) -> dict[str, int]:
+        """
+        Publish each match once, oldest first, with a record for every polled player
+        in it that had not seen it yet. Return the new battle count per player.
+        """
+        order = {name: position for position, name in enumerate(polled)}
+        names_by_tag: dict[str, list[str]] = {}
+        for name in polled:
+            names_by_tag.setdefault(self.player_map[name], []).append(name)
+        start_epochs = {name: self._ingest_start(name) for name in polled}
+        new_battles = {}
+        for match in match_index.matches():
+            squad = sorted((name for tag in match.roster for name in names_by_tag.get(tag, ())), key=order.__getitem__)
+            players = []
+            for name in squad:
+                player_tag = self.player_map[name]
+                record = BattleRecord.from_api(match.game_info, player_tag, match.battle_time)
+                self.battle_archive.append(player_tag, record)
+                battle_map = self.player_battle_map[name]
+                if record.battle_time < start_epochs[name] or not self._advance_watermark(battle_map, record):
                     continue
-                battle_map["battle_start_times"].add(game_info["battleTime"])
-                if game_info["battle"].get("starPlayer", {}).get("tag") == self.player_map[name]:
-                    battle_map["star_players"] += 1
-                if game_info["battle"].get("trophyChange", 0) != 0:
-                    battle_map["game_durations_s"] += game_info["battle"]["duration"]
-                if game_info["battle"]["result"] == "victory":
-                    battle_map["victories"] += 1
+                new_battles[name] = new_battles.get(name, 0) + 1
+                players.append((name, record))
+            if len(players) > 1:
+                for name, _ in players:
+                    self.squads[name] = frozenset(name for name, _ in players)
+            elif players:
+                self.squads.pop(players[0][0], None)
+            if players:
+                await self.battle_events.publish(BattleEvent(match.battle_time, players))
+        return new_battles
+
+    def _ingest_start(self, name: str) -> int:
+        """Battles of a player from this epoch on are new to the session"""
+        return max(int(self.start_time.timestamp()), self.player_battle_map[name]["last_battle_time"])
+
+    def _split_squads(self, names: list[str], outside: list[str] = ()) -> tuple[dict[str, int], list[str]]:
+        """
+        Split players into ones to fetch first and followers whose last battle was
+        with one of those. Leaders map to the last battle time of their followers,
+        as their log has to be indexed back to it. Players outside the batch are
+        only ever followers, and are left out without a teammate among the leaders.
+        """
+        leaders: dict[str, int] = {}
+        followers = []
+        for name in [*names, *outside]:
+            teammates = [teammate for teammate in self.squads.get(name, ()) if teammate in leaders]
+            if not teammates:
+                if name not in outside:
+                    leaders[name] = self._ingest_start(name)
+                continue
+            followers.append(name)
+            for teammate in teammates:
+                leaders[teammate] = min(leaders[teammate], self.player_battle_map[name]["last_battle_time"])
+        return leaders, followers
+
+    async def _index_battle_logs(self, match_index: MatchIndex, names: list[str],
+                                 reach_back: dict[str, int] | None = None) -> list[str]:
+        """
+        Fetch battle logs into the index, from reach_back per player if it is earlier
+        than their new battles. Return the players whose log was fetched.
+        """
+        reach_back = reach_back or {}
+        game_logs = await self._fetch_battle_logs(names)
+        fetched = []
+        for name, game_log in zip(names, game_logs):
+            if name not in self.player_battle_map or self.start_time is None:
+                continue  # Tracking was reset while fetching
+            if isinstance(game_log, Exception):
+                self.notify(f"Error {game_log!r} with brawl API for updating {name}'s battle log")
+                continue
+            if game_log == THROTTLED:
+                print(f"Skipped {name}'s battle log, every brawl API key is benched or out of budget")
+                continue
+            if not isinstance(game_log, list):
+                self.notify(f"Error {game_log} with brawl API for updating {name}'s battle log")
+                continue
+            player_tag = self.player_map[name]
+            # Also archive battles from before the session that the archive is missing
+            since = min(self.battle_archive.last_battle_time(player_tag) + 1, self._ingest_start(name))
+            since = min(since, reach_back.get(name, since))
+            match_index.add_log(game_log, player_tag, since)
+            fetched.append(name)
+        return fetched
+
+    def _subscribe_stages(self, battle_events: EventBus) -> EventBus:
+        """Consumers of new battles, each keeping up at its own pace"""
+        battle_events.subscribe("streaks", self._detect_streaks)
+        battle_events.subscribe("trophy_series", self._extend_trophy_series)
+        battle_events.subscribe("persistence", self._persist_battles)
+        return battle_events
+
+    def _tracked_records(self, events: list[BattleEvent]):
+        """(name, battle map, record) of every player still tracked"""
+        for event in events:
+            for name, record in event.players:
+                battle_map = self.player_battle_map.get(name)
+                if battle_map is not None:
+                    yield name, battle_map, record
+
+    def _detect_streaks(self, events: list[BattleEvent]) -> None:
+        """Update win and loss streaks, with one message for everyone on a streak in the same match"""
+        for event in events:
+            squad = []
+            for name, battle_map, record in self._tracked_records([event]):
+                if record.result == "victory":
                     battle_map["consecutive_victories"] += 1
                     battle_map["consecutive_losses"] = 0
-                elif game_info["battle"]["result"] == "defeat":
-                    battle_map["defeats"] += 1
+                elif record.result == "defeat":
                     battle_map["consecutive_victories"] = 0
                     battle_map["consecutive_losses"] += 1
-                await self.berate_player(
-                    name,
-                    battle_map["consecutive_victories"],
-                    battle_map["consecutive_losses"],
-                )
+                squad.append(name)
+            self._berate_squad(squad)
+        # The stage runs on the bus's own pace, so its streaks can't wait for the cycle's flush
+        self.outbox.flush()
+
+    def _extend_trophy_series(self, events: list[BattleEvent]) -> None:
+        for name, _, record in self._tracked_records(events):
+            if name in self.trophy_series:
+                self.trophy_series[name].append(record)
+
+    def _persist_battles(self, events: list[BattleEvent]) -> None:
+        """Store the session state of the players who had new battles, the archive holds the battles"""
+        names = {name for name, _, _ in self._tracked_records(events)}
+        for name in names:
+            self.state_store.update_session_stats(name, self.player_battle_map[name])
+        self.save_state()
 
-    async def _send_progress_graph(self) -> None:
-        """Send progress graph for trophies over time
-        """
-        plt.figure()
-        plt.title("Total Trophies Over Time")
-        plt.xlabel("Time")
-        plt.ylabel("Trophies")
+    def _berate_squad(self, names: list[str]) -> None:
+        """One streak message for everyone in a match who is on a streak"""
+        winners = [name for name in names if self.player_battle_map[name]["consecutive_victories"] >= 5]
+        losers = [name for name in names if self.player_battle_map[name]["consecutive_losses"] >= 3]
+        if winners:
+            streak = min(self.player_battle_map[name]["consecutive_victories"] for name in winners)
+            self.berate_player(" & ".join(winners), streak, 0)
+        if losers:
+            streak = min(self.player_battle_map[name]["consecutive_losses"] for name in losers)
+            self.berate_player(" & ".join(losers), 0, streak)
+
+    def _session_summaries(self) -> dict[str, dict]:
+        """Battle stats per tracked player since start_time, read from the archive"""
+        return {
+            name: self.battle_archive.summarize(self.player_map[name], self.start_time)
+            for name in self.player_battle_map
+        }
 
+    def _trophy_series(self, name: str) -> TrophySeries:
+        """
+        Trophy series of a tracked player. Polling keeps it up to date, it is only
+        rebuilt from the archive when missing, e.g. after resuming a session.
+        """
+        series = self.trophy_series.get(name)
+        if series is None:
+            battles = self.battle_archive.scan(self.player_map[name], self.start_time)
+            series = TrophySeries.from_columns(self.players_to_track[name].trophies, battles)
+            self.trophy_series[name] = series
+        return series
+
+    def _collect_trophy_series(self, cumulative: bool) -> list[tuple]:
+        """
+        Build (name, times, trophies, star_players) per tracked player since start_time,
+        times in epoch seconds. Trophies are absolute when cumulative, otherwise
+        relative to the start. Players with no battles are skipped for absolute trophies.
+        """
+        start_epoch = int(self.start_time.timestamp())
+        now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+        series = []
         for name in self.players_to_track:
-            game_log = self.brawl_client.get_player_battle_logs(self.player_map[name])
-            times = [self.start_time]
-            trophies = [self.players_to_track[name]["trophies"]]
-            star_players = [False]
-            if isinstance(game_log, int):
-                await self.send_message(f"Error {game_log} with brawl API for updating battle logs, try sending message again")
-                return
-
-            for game_info in sorted(game_log, key=lambda x: x["battleTime"]):
-                battle_time = datetime.datetime.strptime(
-                    game_info["battleTime"], "%Y%m%dT%H%M%S.000Z"
-                ).replace(tzinfo=datetime.timezone.utc)
-                if battle_time < self.start_time:
-                    continue
-                times.append(battle_time)
-                trophies.append(trophies[-1] + game_info["battle"].get("trophyChange", 0))
-                star_players.append(game_info["battle"].get("starPlayer", {}).get("tag") == self.player_map[name])
-
-            if len(times) == 1:
+            trophy_series = self._trophy_series(name)
+            if cumulative and not trophy_series:
                 continue
-            times.append(datetime.datetime.now(datetime.timezone.utc))
-            trophies.append(trophies[-1])
-            star_players.append(False)
-            plt.plot(times, trophies, marker="*", markevery=star_players, label=name)
-        plt.xticks(rotation=45, ha='right')
-        plt.legend()
-        plt.subplots_adjust(bottom=0.2)
-        filename = "trophy_plot.png"
-        plt.savefig(filename)
-        await self.send_file(filename)
+            series.append((name, *trophy_series.points(start_epoch, now, cumulative)))
+        return series
 
-    async def _send_trophy_delta_graph(self) -> None:
+    async def _send_progress_graph(self) -> None:
         """Send progress graph for trophies over time
         """
-        plt.figure()
-        plt.title("Trophies Delta Over Time")
-        plt.xlabel("Time")
-        plt.ylabel("Trophies")
-
-        for name in self.players_to_track:
-            game_log = self.brawl_client.get_player_battle_logs(self.player_map[name])
-            times = [self.start_time]
-            trophies = [0]
-            star_players = [False]
-            if isinstance(game_log, int):
-                await self.send_message(f"Error {game_log} with brawl API for updating battle logs, try sending message again")
-                return
+        series = self._collect_trophy_series(cumulative=True)
+        image = await self.chart_renderer.render_trophy_chart("Total Trophies Over Time", series)
+        await self.send_file(image, "trophy_plot.png")
 
-            for game_info in sorted(game_log, key=lambda x: x["battleTime"]):
-                battle_time = datetime.datetime.strptime(
-                    game_info["battleTime"], "%Y%m%dT%H%M%S.000Z"
-                ).replace(tzinfo=datetime.timezone.utc)
-                if battle_time < self.start_time:
-                    continue
-                times.append(battle_time)
-                trophies.append(trophies[-1] + game_info["battle"].get("trophyChange", 0))
-                star_players.append(game_info["battle"].get("starPlayer", {}).get("tag") == self.player_map[name])
-
-            times.append(datetime.datetime.now(datetime.timezone.utc))
-            trophies.append(trophies[-1])
-            star_players.append(False)
-            plt.plot(times, trophies, marker="*", markevery=star_players, label=name)
-        plt.xticks(rotation=45, ha='right')
-        plt.legend()
-        plt.subplots_adjust(bottom=0.2)
-        filename = "trophy_delta_plot.png"
-        plt.savefig(filename)
-        await self.send_file(filename)
+    async def _send_trophy_delta_graph(self) -> None:
+        """Send progress graph for trophies over time
+        """
+        series = self._collect_trophy_series(cumulative=False)
+        image = await self.chart_renderer.render_trophy_chart("Trophies Delta Over Time", series)
+        await self.send_file(image, "trophy_delta_plot.png")
+
+    def _series_gains(self) -> dict[str, tuple[int, list[tuple[int, int]]]]:
+        """(total trophy change, per brawler trophy changes) per player from the polled battles"""
+        return {
+            name: (series.current_trophies - series.start_trophies, series.brawler_gains())
+            for name, series in ((name, self._trophy_series(name)) for name in self.players_to_track)
+        }
 
-    async def _show_progress(self):
-        """Show intermediate progresss"""
-        msg = "Progress\n"
-        msg += "===== Battle Stats =====\n"
-        await self.update_battle_logs()
-        for player, battle_map in self.player_battle_map.items():
-            msg += f"**{player}**:\n"
-            if battle_map["game_durations_s"] == 0:
+    async def _profile_gains(self) -> dict[str, tuple[int, list[tuple[int, int]]] | None]:
+        """(total trophy change, per brawler trophy changes) per player from fresh profiles"""
+        names = list(self.players_to_track)
+        end_profiles = await self._fetch_concurrently(self.brawl_client.get_player_info, names, return_exceptions=True)
+        gains = {}
+        for name, end_profile in zip(names, end_profiles):
+            if end_profile is None or isinstance(end_profile, Exception):
+                gains[name] = None  # Reported as a failed fetch
                 continue
-            msg += f"\tGames: {len(battle_map['battle_start_times'])}\n"
-            msg += f"\tVictories: {battle_map['victories']}\n"
-            msg += f"\tDefeats: {battle_map['defeats']}\n"
-            msg += f"\tStar Players: {battle_map['star_players']}\n"
-            msg += f"\tGame Time: {battle_map['game_durations_s']}\n"
-
-        msg += "===== Trophy Gains =====\n"
-        for player, start_player_info in self.players_to_track.items():
-            end_player_info = self.brawl_client.get_player_info(self.player_map[player])
-            trophy_gain = end_player_info["trophies"] - start_player_info["trophies"]
+            start_snapshot = self.players_to_track[name]
+            gains[name] = (end_profile.trophies - start_snapshot.trophies, start_snapshot.diff(end_profile.snapshot))
+        return gains
+
+    def _trophy_gains_msg(self, summaries: dict[str, dict], gains: dict[str, tuple | None]) -> str:
+        """Trophy gains per player and brawler since the start snapshots"""
+        msg = "===== Trophy Gains =====\n"
+        for player, player_gains in gains.items():
+            if player_gains is None:
+                msg += f"**{player}**: Error connecting to brawl API\n"
+                continue
+            trophy_gain, brawler_gains = player_gains
             trophy_per_hour = round(
-                trophy_gain * 3600 / (self.player_battle_map[player]['game_durations_s'] or 1),
+                trophy_gain * 3600 / (summaries[player]['game_durations_s'] or 1),
                 2,
             )
             msg += (
                 f"**{player}**: Total: {trophy_gain}, "
                 f"TPH: {trophy_per_hour}\n"
             )
-            for brawler_num in range(len(end_player_info["brawlers"])):
-                try:
-                    start_trophies = start_player_info["brawlers"][brawler_num]["trophies"]
-                    end_trophies = end_player_info["brawlers"][brawler_num]["trophies"]
-                    if end_trophies != start_trophies:
-                        brawler_name = end_player_info["brawlers"][brawler_num]["name"]
-                        msg += f"\t{brawler_name}: {end_trophies - start_trophies}\n"
-                except IndexError:
-                    continue
+            for brawler_id, trophy_change in brawler_gains:
+                msg += f"\t{brawler_name(brawler_id)}: {trophy_change}\n"
+        return msg
+
+    def _club_stats_msg(self, summaries: dict[str, dict], gains: dict[str, tuple | None]) -> str:
+        """Battle stats and trophy gains added up per club, empty if no tracked player is in a club"""
+        clubs: dict[str, dict] = {}
+        for player, summary in summaries.items():
+            club = self.player_clubs.get(player)
+            if club is None:
+                continue
+            totals = clubs.setdefault(club, {"players": 0, "trophies": 0, **dict.fromkeys(CLUB_STATS, 0)})
+            totals["players"] += 1
+            for key in CLUB_STATS:
+                totals[key] += summary[key]
+            if gains.get(player) is not None:
+                totals["trophies"] += gains[player][0]
+        if not clubs:
+            return ""
+        msg = "===== Clubs =====\n"
+        for club, totals in clubs.items():
+            msg += (
+                f"**{club}** ({totals['players']} players): Games: {totals['games']}, "
+                f"Victories: {totals['victories']}, Defeats: {totals['defeats']}, "
+                f"Star Players: {totals['star_players']}, Trophies: {totals['trophies']}\n"
+            )
+        return msg
+
+    async def _show_progress(self):
+        """
+        Show intermediate progresss from what polling has already collected,
+        without calling the brawl api
+        """
+        msg = "Progress\n"
+        msg += "===== Battle Stats =====\n"
+        await self.battle_events.drain()
+        summaries = self._session_summaries()
+        for player, summary in summaries.items():
+            msg += f"**{player}**:\n"
+            if summary["game_durations_s"] == 0:
+                continue
+            msg += f"\tGames: {summary['games']}\n"
+            msg += f"\tVictories: {summary['victories']}\n"
+            msg += f"\tDefeats: {summary['defeats']}\n"
+            msg += f"\tStar Players: {summary['star_players']}\n"
+            msg += f"\tGame Time: {summary['game_durations_s']}\n"
+
+        gains = self._series_gains()
+        msg += self._trophy_gains_msg(summaries, gains)
+        msg += self._club_stats_msg(summaries, gains)
         await self.send_message(msg)
         await self._send_trophy_delta_graph()
 
@@ -401,39 +741,23 @@ class MessageController:
         msg += "===== Battle Stats =====\n"
         most_star_players = ("nobody", 0)
         await self.update_battle_logs()
-        for player, battle_map in self.player_battle_map.items():
+        await self.battle_events.drain()
+        summaries = self._session_summaries()
+        for player, summary in summaries.items():
             msg += f"**{player}**:\n"
-            if battle_map["game_durations_s"] == 0:
+            if summary["game_durations_s"] == 0:
                 continue
-            msg += f"\tGames: {len(battle_map['battle_start_times'])}\n"
-            msg += f"\tVictories: {battle_map['victories']}\n"
-            msg += f"\tDefeats: {battle_map['defeats']}\n"
-            msg += f"\tStar Players: {battle_map['star_players']}\n"
-            msg += f"\tGame Time: {battle_map['game_durations_s']}\n"
-            if battle_map["star_players"] > most_star_players[1]:
-                most_star_players = (player, battle_map["star_players"])
-
-        msg += "===== Trophy Gains =====\n"
-        for player, start_player_info in self.players_to_track.items():
-            end_player_info = self.brawl_client.get_player_info(self.player_map[player])
-            trophy_gain = end_player_info["trophies"] - start_player_info["trophies"]
-            trophy_per_hour = round(
-                trophy_gain * 3600 / (self.player_battle_map[player]['game_durations_s'] or 1),
-                2,
-            )
-            msg += (
-                f"**{player}**: Total: {trophy_gain}, "
-                f"TPH: {trophy_per_hour}\n"
-            )
-            for brawler_num in range(len(end_player_info["brawlers"])):
-                try:
-                    start_trophies = start_player_info["brawlers"][brawler_num]["trophies"]
-                    end_trophies = end_player_info["brawlers"][brawler_num]["trophies"]
-                    if end_trophies != start_trophies:
-                        brawler_name = end_player_info["brawlers"][brawler_num]["name"]
-                        msg += f"\t{brawler_name}: {end_trophies - start_trophies}\n"
-                except IndexError:
-                    continue
+            msg += f"\tGames: {summary['games']}\n"
+            msg += f"\tVictories: {summary['victories']}\n"
+            msg += f"\tDefeats: {summary['defeats']}\n"
+            msg += f"\tStar Players: {summary['star_players']}\n"
+            msg += f"\tGame Time: {summary['game_durations_s']}\n"
+            if summary["star_players"] > most_star_players[1]:
+                most_star_players = (player, summary["star_players"])
+
+        gains = await self._profile_gains()
+        msg += self._trophy_gains_msg(summaries, gains)
+        msg += self._club_stats_msg(summaries, gains)
         await self.send_message(msg)
         await self._send_trophy_delta_graph()
         await self._send_progress_graph()
@@ -443,107 +767,223 @@ class MessageController:
         self.players_to_track = {}
         self.start_time = None
         self.player_battle_map = {}
+        self.trophy_series = {}
+        self.squads = {}
+        self.state_store.end_session()
+
+    def _register_commands(self) -> CommandRegistry:
+        """Build the lookup table of every chat command"""
+        registry = CommandRegistry(reply=self.send_message)
+        registry.register(
+            "!help", lambda command: self._send_help_message(),
+            "!help", "print out all commands", aliases=("help",), exclusive=False,
+        )
+        registry.register(
+            "!setname", lambda command: self._change_name(command.argument),
+            "!setname <bot_name>", "set activation <bot_name> of bot", min_args=1,
+        )
+        registry.register(
+            "!status", lambda command: self._send_status_message(),
+            "{prefix} status", "show status of bot", aliases=("status",), exclusive=False,
+        )
+        registry.register(
+            "add", lambda command: self._add_players(command.args),
+            "{prefix} add <player_name> <brawlstars_tag> [<player_name> <brawlstars_tag> ...]",
+            "add players to storage", min_args=2,
+        )
+        registry.register(
+            "remove", lambda command: self._remove_player(command.args[0]),
+            "{prefix} remove <player_name>", "remove a player from storage", min_args=1,
+        )
+        registry.register(
+            "club", lambda command: self._add_club(command.args[0], command.args[1]),
+            "{prefix} club <club_name> <club_tag>", "add every member of a club to storage", min_args=2,
+        )
+        registry.register(
+            "removeclub", lambda command: self._remove_club(command.args[0]),
+            "{prefix} removeclub <club_name>", "stop syncing a club, its members stay added", min_args=1,
+        )
+        registry.register(
+            "grind", self._grind_command,
+            "{prefix} grind [club_name]", "start tracking all added players, or every member of a club",
+        )
+        registry.register(
+            "start", lambda command: self._start_command(command.argument),
+            "{prefix} start <player names separated by spaces>", "start tracking all added players", min_args=1,
+        )
+        registry.register(
+            "progress", self._progress_command,
+            "{prefix} progress / edge", "show temporary progress of players", aliases=("edge",),
+        )
+        registry.register(
+            "end", self._end_command,
+            "{prefix} end / cum", "end tracking and show stats", aliases=("cum",),
+        )
+        registry.register(
+            "reset", self._reset_command,
+            "{prefix} reset", "empty all currently tracked players",
+        )
+        registry.register(
+            "!debug", lambda command: self.send_message(str(self)),
+            "!debug", "show full status of bot", exclusive=False,
+        )
+        registry.register(
+            "!metrics", lambda command: self.send_message(metrics.summary()),
+            "!metrics", "show API, poll, send and event loop metrics", aliases=("metrics",), exclusive=False,
+        )
+        registry.register(
+            "!profile", self._profile_command,
+            "!profile [<cycles> | report]", "admin: profile the next battle log updates or report and upload the results",
+            aliases=("profile",), exclusive=False, admin_only=True,
+        )
+        return registry
 
-    def _validate_message(self, msg: str) -> bool:
-        """Some basic validation on messages before analyzing"""
-        if 1 < len(msg) < self.message_char_len_limit:
-            return True
-        if msg.split(" ", 1)[0] in [self.name, "!setname", "!help", "!status", "!debug"]:
-            return True
-        if msg.split(" ", 2)[1] in self.available_commands:
-            return True
-        return False
+    @property
+    def available_commands(self) -> list[str]:
+        return self.command_registry.command_words
 
-    async def process_message(self, msg: str) -> None:  # noqa: C901 - allow complexity
-        """Process the message and perform action"""
-        if not self._validate_message(msg):
+    async def _start_command(self, names_to_track: str) -> None:
+        if len(self.players_to_track) != 0:
+            await self.send_message("Already tracking games")
             return
-        main_command = msg.split(" ", 1)[0]
-
-        # One word commands
-        if main_command == "!debug":
-            await self.send_message(str(self))
-        elif main_command == "!help":
-            await self._send_help_message()
-        elif main_command == "!status":
-            await self._send_status_message()
-
-        elif main_command == "!setname":
-            full_command = msg.split(" ", 1)
-            if len(full_command) != 2:
-                return
-            await self._change_name(full_command[-1])
-
-        elif f"!{self.name}" in msg:
-            action = msg.split(f"!{self.name} ")[-1]
-            if "reset" in action:
-                self.players_to_track = {}
-                self.player_battle_map = {}
-                self.start_time = None
-                await self.send_message("Cleared all tracked players")
-                return
-            elif "grind" in action:
-                if len(self.players_to_track) != 0:
-                    await self.send_message("Already tracking games")
-                    return
-                else:
-                    all_tracked_players = " ".join(self.player_map.keys())
-                    await self._start_tracking(all_tracked_players)
-                    return
-            elif "start" in action:
-                if len(self.players_to_track) != 0:
-                    await self.send_message("Already tracking games")
-                    return
-                else:
-                    await self._start_tracking(action.split("start ")[-1])
-            elif "progress" in action or "edge" in action:
-                if len(self.players_to_track) == 0:
-                    await self.send_message("Currently not tracking any players")
-                    return
-                await self._show_progress()
-                return
-            elif "end" in action or "cum" in action:
-                if len(self.players_to_track) == 0:
-                    await self.send_message("Currently not tracking any players")
-                    return
-                await self._end_tracking()
+        await self._start_tracking(names_to_track)
 
-            elif "add" in action:
-                name = action.split(" ", 2)[1]
-                tag = action.split(" ", 2)[-1]
-                await self._add_player(name, tag)
+    async def _grind_command(self, command: ParsedCommand) -> None:
+        if not command.args:
+            await self._start_command(" ".join(self.player_map))
+            return
+        club_name = command.args[0]
+        if club_name not in self.clubs:
+            await self.send_message(f"Club {club_name} is not registered")
+            return
+        await self._start_command(" ".join(self._club_members(club_name)))
 
-            elif "remove" in action:
-                name = action.split(" ", 2)[1]
-                await self._remove_player(name)
+    async def _progress_command(self, command: ParsedCommand) -> None:
+        if len(self.players_to_track) == 0:
+            await self.send_message("Currently not tracking any players")
+            return
+        if self.profiler.report:  # Armed by !profile
+            await self._profiled("report", self._show_progress())
+            return
+        await self._show_progress()
 
-        else:
+    async def _end_command(self, command: ParsedCommand) -> None:
+        if len(self.players_to_track) == 0:
+            await self.send_message("Currently not tracking any players")
+            return
+        if self.profiler.report:  # Armed by !profile
+            await self._profiled("report", self._end_tracking())
+            return
+        await self._end_tracking()
+
+    async def _profile_command(self, command: ParsedCommand) -> None:
+        """Arm the profiler for the next N poll cycles (default 1) or the next report"""
+        if command.args and command.args[0] == "report":
+            self.profiler.arm(report=True)
+            await self.send_message("Profiling the next progress or end report")
+            return
+        if command.args and not command.args[0].isdigit():
+            await self.send_message("Usage: !profile [<cycles> | report]")
             return
+        cycles = max(int(command.args[0]) if command.args else 1, 1)
+        self.profiler.arm(cycles=cycles)
+        await self.send_message(f"Profiling the next {cycles} battle log update{'s' if cycles > 1 else ''}")
+
+    async def _profiled(self, kind: str, coroutine):
+        """Run a poll cycle or report under the profiler, uploading the report once it is done"""
+        try:
+            return await self.profiler.capture(kind, coroutine)
+        finally:
+            if self.profiler.finished:
+                report = self.profiler.finish()
+                await self.send_file(report.encode(), "profile.txt")
+
+    async def _reset_command(self, command: ParsedCommand) -> None:
+        await self.battle_events.drain()
+        self.players_to_track = {}
+        self.player_battle_map = {}
+        self.trophy_series = {}
+        self.squads = {}
+        self.start_time = None
+        self.state_store.end_session()
+        await self.send_message("Cleared all tracked players")
+
+    def _validate_message(self, msg: str) -> bool:
+        """Some basic validation on messages before analyzing"""
+        return self.command_registry.parse(msg, self.name) is not None
+
+    async def process_message(self, msg: str, is_admin: bool = False) -> None:
+        """Process the message and perform action, is_admin if the author can manage the server"""
+        command = self.command_registry.parse(msg, self.name)
+        if command is None:
+            return
+        await self.command_registry.dispatch(command, self.name, is_admin)
         self.save_state()
 
-    def save_state(self, filename="message_controller_state.pkl") -> None:
-        """Save the state of the controller to a file."""
-        with open(filename, "wb") as file:
-            pickle.dump({
-                "player_map": self.player_map,
-                "name": self.name,
-            }, file)
-        print(f"State saved to {filename}")
-
-    def load_state(self, filename="message_controller_state.pkl") -> None:
-        """Load the state of the controller from a file."""
-        if os.path.exists(filename):
-            with open(filename, "rb") as file:
-                state = pickle.load(file)
-                self.player_map = state.get("player_map", {})
-                self.name = state.get("name", "brawlbot")
-            print(f"State loaded from {filename}")
-        else:
-            print(f"No saved state found at {filename}")
+    @staticmethod
+    def _new_battle_map() -> dict:
+        """
+        Session state of one player, battle stats are read from the archive.
+        last_battle_time and last_battle_keys are a high-watermark: the newest
+        ingested battle time and the keys of the battles at exactly that time, so
+        dedup needs constant memory per player.
+        """
+        return {
+            "consecutive_victories": 0,
+            "consecutive_losses": 0,
+            "last_battle_time": 0,
+            "last_battle_keys": [],
+        }
+
+    @staticmethod
+    def _advance_watermark(battle_map: dict, record: BattleRecord) -> bool:
+        """Move a player's high-watermark past a battle, False if it was already ingested"""
+        if record.battle_time < battle_map["last_battle_time"]:
+            return False
+        if record.battle_time > battle_map["last_battle_time"]:
+            battle_map["last_battle_time"] = record.battle_time
+            battle_map["last_battle_keys"] = [record.key]
+            return True
+        if record.key in battle_map["last_battle_keys"]:
+            return False
+        battle_map["last_battle_keys"].append(record.key)
+        return True
+
+    def save_state(self) -> None:
+        """Commit queued state changes to the store and archive."""
+        self.battle_archive.flush()
+        written = self.state_store.flush()
+        if written:
+            print(f"State saved to {self.state_store.path} ({written} writes)")
+
+    def load_state(self, legacy_pickle: str | None = None) -> None:
+        """
+        Load the state of the controller from the store, resuming any running session.
+        legacy_pickle is the old pickle state to import first, only for the channel it belonged to.
+        """
+        if legacy_pickle is not None and self.state_store.import_pickle(legacy_pickle):
+            print(f"Imported state from {legacy_pickle}")
+        state = self.state_store.load()
+        self.player_map = state["player_map"]
+        self.clubs = state["clubs"]
+        self.player_clubs = state["player_clubs"]
+        self.name = state["settings"].get("name", "brawlbot")
+        self.start_time = state["start_time"]
+        self.players_to_track = {
+            name: BrawlerSnapshot.from_json(start_info) for name, start_info in state["start_infos"].items()
+        }
+        # Sessions saved before stats moved to the archive also hold battle counters
+        self.player_battle_map = {
+            name: {key: stats.get(key, default) for key, default in self._new_battle_map().items()}
+            for name, stats in state["stats"].items()
+        }
+        self.trophy_series = {}  # Rebuilt from the archive on first use
+        self.squads = {}
+        print(f"State loaded from {self.state_store.path}")
 
     def __str__(self) -> str:
         """Print all attributes of self except for players to track"""
         attributes = vars(self)
         return '\n'.join(f"{key}: {value}"
                          for key, value in attributes.items()
-                         if key not in {"players_to_track", "player_battle_map", "message_char_len_limit"})
+                         if key not in {"players_to_track", "player_battle_map", "trophy_series", "squads"})
@@ -0,0 +1,103 @@
+"""Queue outbound Discord messages"""
+import asyncio
+import time
+from poll_scheduler import TokenBucket
+
+DISCORD_MAX_LENGTH = 2000
+
+
+def split_message(msg: str, max_length: int = DISCORD_MAX_LENGTH) -> list[str]:
+    """Split on line boundaries so every chunk fits, hard-splitting lines too long on their own"""
+    chunks = []
+    current = ""
+    for line in msg.splitlines(keepends=True):
+        while len(line) > max_length:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_length])
+            line = line[max_length:]
+        if len(current) + len(line) > max_length:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+class MessageQueue:
+    """
+    Outbound messages of one channel:
+    - post() queues without waiting, everything queued is merged into one message on flush()
+    - send() posts right away, after anything already queued
+    - Messages are split on line boundaries at Discord's length limit
+    - A per-channel token bucket keeps posts under Discord's rate limit (5 per 5 seconds)
+    """
+    def __init__(self, send, rate: float = 1.0, burst: float = 5,
+                 max_length: int = DISCORD_MAX_LENGTH, clock=time.monotonic):
+        self._send = send  # Coroutine function posting one message
+        self.bucket = TokenBucket(rate, burst, clock=clock)
+        self.max_length = max_length
+        self._pending: list[str] = []
+        self._lock = asyncio.Lock()  # One post at a time, in order
+        self._sender: asyncio.Task | None = None
+        self.posts = 0
+        self.merged = 0  # Queued messages folded into another post
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def post(self, msg: str) -> None:
+        """Queue a message for the next flush"""
+        self._pending.append(msg)
+
+    def flush(self) -> None:
+        """Post everything queued so far from a background task"""
+        if self._pending and (self._sender is None or self._sender.done()):
+            self._sender = asyncio.ensure_future(self._send_pending_in_background())
+
+    async def _send_pending_in_background(self) -> None:
+        try:
+            async with self._lock:
+                await self._send_pending()
+        except Exception as e:
+            print(f"Error sending queued messages: {e}")
+
+    async def _send_pending(self) -> None:
+        while self._pending:
+            pending, self._pending = self._pending, []
+            self.merged += len(pending) - 1
+            await self._post("\n".join(pending))
+
+    async def _wait_for_token(self) -> None:
+        while self.bucket.take(1) == 0:
+            await asyncio.sleep(self.bucket.seconds_until_available())
+
+    async def _post(self, msg: str) -> None:
+        for chunk in split_message(msg, self.max_length):
+            await self._wait_for_token()
+            await self._send(chunk)
+            self.posts += 1
+
+    async def send(self, msg: str) -> None:
+        """Post a message now, after anything queued before it"""
+        async with self._lock:
+            await self._send_pending()
+            await self._post(msg)
+
+    async def send_with(self, post) -> None:
+        """Run post(), e.g. a file upload, in order and within the rate limit"""
+        async with self._lock:
+            await self._send_pending()
+            await self._wait_for_token()
+            await post()
+            self.posts += 1
+
+    async def drain(self) -> None:
+        """Wait until everything queued has been posted"""
+        async with self._lock:
+            await self._send_pending()
+
+    def __str__(self) -> str:
+        return f"MessageQueue(pending={len(self._pending)}, posts={self.posts}, merged={self.merged})"
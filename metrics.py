@@ -0,0 +1,261 @@
+"""In-process metrics with a Prometheus text endpoint"""
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _label_text(label_names: tuple[str, ...], label_values: tuple[str, ...]) -> str:
+    if not label_names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value)}"'.replace("\n", " ")
+        for name, value in zip(label_names, label_values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield self.name, _label_text(self.label_names, label_values), value
+
+
+class Gauge:
+    """Current value per label set, set directly or read from a function when collected"""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values: dict[tuple, float] = {}
+        self.functions: dict[tuple, object] = {}
+
+    def set(self, *label_values, value: float) -> None:
+        self.values[label_values] = value
+
+    def set_function(self, *label_values, function) -> None:
+        self.functions[label_values] = function
+
+    def get(self, *label_values) -> float:
+        function = self.functions.get(label_values)
+        return function() if function is not None else self.values.get(label_values, 0)
+
+    def samples(self):
+        for label_values in {**self.values, **self.functions}:
+            yield self.name, _label_text(self.label_names, label_values), self.get(*label_values)
+
+
+class Histogram:
+    """Observation counts per bucket, plus sum and count, per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self.values: dict[tuple, list] = {}  # label values -> [bucket counts, sum, count]
+
+    def observe(self, *label_values, value: float) -> None:
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+        for i, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def time(self, *label_values) -> "_Timer":
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, label_values)
+
+    def count(self, *label_values) -> int:
+        entry = self.values.get(label_values)
+        return entry[2] if entry else 0
+
+    def mean(self, *label_values) -> float:
+        entry = self.values.get(label_values)
+        return entry[1] / entry[2] if entry and entry[2] else 0.0
+
+    def quantile(self, q: float, *label_values) -> float:
+        """Upper bound of the bucket holding quantile q, inf if it is past the last bucket"""
+        entry = self.values.get(label_values)
+        if not entry or not entry[2]:
+            return 0.0
+        target = q * entry[2]
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.buckets, entry[0]):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return upper_bound
+        return float("inf")
+
+    def samples(self):
+        for label_values, (bucket_counts, total, count) in self.values.items():
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _label_text(self.label_names + ("le",), label_values + (upper_bound,))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _label_text(self.label_names + ("le",), label_values + ("+Inf",))
+            yield f"{self.name}_bucket", labels, count
+            yield f"{self.name}_sum", _label_text(self.label_names, label_values), total
+            yield f"{self.name}_count", _label_text(self.label_names, label_values), count
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(*self.label_values, value=time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Every metric of the bot, rendered in Prometheus text format"""
+    def __init__(self):
+        self.metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def _add(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, description, label_names))
+
+    def gauge(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, description, label_names))
+
+    def histogram(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, description, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+API_REQUEST_SECONDS = METRICS.histogram(
+    "brawl_api_request_seconds", "Brawl API request latency", ("endpoint", "status")
+)
+API_RETRIES = METRICS.counter(
+    "brawl_api_retries_total", "Brawl API requests retried, by failed status", ("endpoint", "status")
+)
+API_KEYS_BENCHED = METRICS.gauge("brawl_api_keys_benched", "API keys benched or waiting on Retry-After")
+POLL_CYCLE_SECONDS = METRICS.histogram(
+    "battle_log_cycle_seconds", "Duration of one update_battle_logs cycle", buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+BATTLE_LOGS_SKIPPED = METRICS.counter(
+    "battle_logs_skipped_total", "Battle log fetches skipped because a teammate's log held the new battles"
+)
+BATTLE_EVENTS = METRICS.counter("battle_events_total", "Battle events published and handled per stage", ("stage",))
+BATTLE_EVENT_ERRORS = METRICS.counter("battle_event_errors_total", "Battle event batches that raised", ("stage",))
+DISCORD_SEND_SECONDS = METRICS.histogram("discord_send_seconds", "Discord message send latency", ("kind",))
+COMMAND_SECONDS = METRICS.histogram("command_seconds", "Chat command latency", ("command",))
+COMMAND_ERRORS = METRICS.counter("command_errors_total", "Chat commands that raised", ("command",))
+CACHE_REQUESTS = METRICS.counter("brawl_cache_requests_total", "Cached client calls by outcome", ("endpoint", "outcome"))
+CACHE_HIT_RATE = METRICS.gauge("brawl_cache_hit_rate", "Fraction of calls served without a new API request")
+QUEUE_DEPTH = METRICS.gauge("queue_depth", "Items waiting in internal queues", ("queue",))
+EVENT_LOOP_LAG_SECONDS = METRICS.histogram(
+    "event_loop_lag_seconds", "How late the event loop woke up a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+STARTUP_SECONDS = METRICS.gauge("startup_seconds", "Time spent in each startup phase", ("phase",))
+
+
+async def monitor_event_loop_lag(interval: float = 1.0) -> None:
+    """Measure how much later than requested asyncio.sleep returns"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(value=max(time.perf_counter() - start - interval, 0.0))
+
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9108,
+                               registry: MetricsRegistry = METRICS) -> "web.AppRunner":
+    """Serve GET /metrics in Prometheus text format"""
+    from aiohttp import web  # Server half of aiohttp, only loaded when metrics are served
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def _format_latency(histogram: Histogram, *label_values) -> str:
+    return (
+        f"n={histogram.count(*label_values)} mean={histogram.mean(*label_values) * 1000:.0f}ms "
+        f"p95<={histogram.quantile(0.95, *label_values) * 1000:.0f}ms"
+    )
+
+
+def startup_text() -> str:
+    """Startup phases in the order they were recorded, like import=0.41s connect=1.20s"""
+    return " ".join(f"{phase}={seconds:.2f}s" for (phase,), seconds in STARTUP_SECONDS.values.items())
+
+
+def summary() -> str:
+    """Short human readable summary for the !metrics command"""
+    msg = "===== Metrics =====\n"
+    if STARTUP_SECONDS.values:
+        msg += f"Startup: {startup_text()}\n"
+    msg += "Brawl API:\n"
+    for label_values in sorted(API_REQUEST_SECONDS.values):
+        msg += f"\t{'/'.join(map(str, label_values))}: {_format_latency(API_REQUEST_SECONDS, *label_values)}\n"
+    msg += f"Poll cycles: {_format_latency(POLL_CYCLE_SECONDS)}\n"
+    if BATTLE_EVENTS.values:
+        stages = ", ".join(f"{stage}={count:.0f}" for (stage,), count in sorted(BATTLE_EVENTS.values.items()))
+        errors = ", ".join(f"{stage}={count:.0f}" for (stage,), count in sorted(BATTLE_EVENT_ERRORS.values.items()))
+        msg += f"Battle events: {stages}" + (f" errors: {errors}" if errors else "") + "\n"
+    for label_values in sorted(DISCORD_SEND_SECONDS.values):
+        msg += f"Discord {label_values[0]} sends: {_format_latency(DISCORD_SEND_SECONDS, *label_values)}\n"
+    msg += f"Cache hit rate: {CACHE_HIT_RATE.get() * 100:.0f}%\n"
+    for label_values in sorted({**QUEUE_DEPTH.values, **QUEUE_DEPTH.functions}):
+        msg += f"Queue {label_values[0]}: {QUEUE_DEPTH.get(*label_values):.0f}\n"
+    msg += f"Event loop lag: {_format_latency(EVENT_LOOP_LAG_SECONDS)}\n"
+    for label_values in sorted(COMMAND_SECONDS.values):
+        errors = COMMAND_ERRORS.values.get(label_values, 0)
+        msg += f"Command {label_values[0]}: {_format_latency(COMMAND_SECONDS, *label_values)} errors={errors:.0f}\n"
+    return msg
@@ -0,0 +1,162 @@
+"""Schedule battle log polling per player"""
+import asyncio
+import random
+import time
+from metrics import QUEUE_DEPTH
+
+
+class TokenBucket:
+    """Allow up to `rate` requests per second on average, with bursts up to `capacity`"""
+    def __init__(self, rate: float, capacity: float | None = None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self, count: int) -> int:
+        """Take up to `count` whole tokens, return how many were granted"""
+        self._refill()
+        granted = min(count, int(self.tokens))
+        self.tokens -= granted
+        return granted
+
+    def seconds_until_available(self) -> float:
+        """Time until at least one token is available"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class PollScheduler:
+    """
+    Keep a next-poll time per player:
+    - Poll at min_interval right after a new battle shows up
+    - Back off exponentially up to max_interval while the log is unchanged
+    - Jitter every interval so polls spread out instead of bursting
+    - Never exceed requests_per_second across all players, stretching min_interval
+      when there are too many players to poll them all that often
+    """
+    def __init__(
+        self,
+        min_interval: float = 30,
+        max_interval: float = 600,
+        backoff: float = 2.0,
+        jitter: float = 0.2,
+        requests_per_second: float = 2.0,
+        idle_check_interval: float = 5,
+        clock=time.monotonic,
+        rng: random.Random | None = None,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.idle_check_interval = idle_check_interval
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.budget = TokenBucket(requests_per_second, clock=clock)
+        self._intervals: dict[str, float] = {}
+        self._next_poll: dict[str, float] = {}
+        QUEUE_DEPTH.set_function("poll_due", function=lambda: len(self.due()))
+
+    def _min_interval(self) -> float:
+        """min_interval, or as long as it takes to poll every player once within the budget"""
+        return max(self.min_interval, len(self._next_poll) / self.budget.rate)
+
+    def _jittered(self, interval: float) -> float:
+        return interval * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def sync(self, names) -> None:
+        """Start scheduling new players and forget ones no longer tracked"""
+        now = self.clock()
+        names = set(names)
+        for name in self._next_poll.keys() - names:
+            del self._next_poll[name]
+            del self._intervals[name]
+        new_names = names - self._next_poll.keys()
+        for name in new_names:
+            self._next_poll[name] = now
+        # Spread first polls across the interval instead of bursting
+        min_interval = self._min_interval()
+        for name in new_names:
+            self._intervals[name] = min_interval
+            self._next_poll[name] = now + self.rng.uniform(0, min_interval * self.jitter)
+
+    def due(self) -> list[str]:
+        """Players whose next poll time has passed, most overdue first"""
+        now = self.clock()
+        return sorted(
+            (name for name, next_poll in self._next_poll.items() if next_poll <= now),
+            key=self._next_poll.__getitem__,
+        )
+
+    def record(self, name: str, had_new_battles: bool) -> None:
+        """Reschedule a player after polling them"""
+        if name not in self._next_poll:
+            return
+        min_interval = self._min_interval()
+        if had_new_battles:
+            interval = min_interval
+        else:
+            interval = max(min(self._intervals[name] * self.backoff, self.max_interval), min_interval)
+        self._intervals[name] = interval
+        self._next_poll[name] = self.clock() + self._jittered(interval)
+
+    def defer(self, name: str) -> None:
+        """Reschedule a player max_interval from now, after a failed poll"""
+        if name not in self._next_poll:
+            return
+        self._intervals[name] = self.max_interval
+        self._next_poll[name] = self.clock() + self.max_interval
+
+    def seconds_until_next_poll(self) -> float:
+        """How long the poll loop can sleep"""
+        if not self._next_poll:
+            return self.idle_check_interval
+        wait = min(self._next_poll.values()) - self.clock()
+        return min(max(wait, 0.0), self.idle_check_interval)
+
+    async def run_once(self, get_names, poll) -> None:
+        """
+        Poll every due player that fits in the request budget.
+        get_names returns the currently tracked players, poll takes a list of
+        names and returns the number of new battles found per name. Players
+        outside the batch in that result had their battles found in a teammate's
+        log, and are rescheduled as if polled.
+        """
+        self.sync(get_names())
+        due = self.due()
+        if not due:
+            return
+        granted = self.budget.take(len(due))
+        if granted == 0:
+            return
+        names = due[:granted]
+        new_battles = None
+        try:
+            new_battles = await poll(names)
+        finally:
+            for name in names:
+                if new_battles is None:
+                    self.defer(name)  # poll raised, retry later instead of on every loop
+                else:
+                    self.record(name, new_battles.get(name, 0) > 0)
+        for name in new_battles.keys() - set(names):
+            if new_battles[name] > 0:
+                self.record(name, True)
+
+    async def run(self, get_names, poll) -> None:
+        """Poll forever, sleeping until the next player is due"""
+        while True:
+            try:
+                await self.run_once(get_names, poll)
+            except Exception as e:
+                print(f"Error updating battle logs: {e}")
+            await asyncio.sleep(max(self.seconds_until_next_poll(), self.budget.seconds_until_available()))
@@ -0,0 +1,103 @@
+"""Profile live poll cycles and reports on demand"""
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+
+class Profiler:
+    """
+    Capture cProfile and tracemalloc for the next `cycles` poll cycles or the next
+    report, then build a text report of the top functions and allocations.
+    Nothing is traced until armed. cProfile and tracemalloc are process wide, so only
+    one capture runs at a time and it also sees whatever else the event loop runs
+    meanwhile.
+    """
+    _capturing = False  # Shared by every controller's profiler
+
+    def __init__(self, top: int = 25, frames: int = 1):
+        self.top = top
+        self.frames = frames
+        self.cycles = 0  # Poll cycles left to capture
+        self.report = False  # Capture the next progress or end report
+        self._profile: cProfile.Profile | None = None
+        self._before: tracemalloc.Snapshot | None = None
+        self._started_tracemalloc = False
+        self._captured: list[str] = []
+        self._elapsed_s = 0.0
+
+    def arm(self, cycles: int = 0, report: bool = False) -> None:
+        self.cycles = cycles
+        self.report = report
+
+    @property
+    def finished(self) -> bool:
+        """Everything armed was captured and the report is ready"""
+        return self._profile is not None and not self.cycles and not self.report
+
+    def _start(self) -> None:
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(self.frames)
+        self._before = tracemalloc.take_snapshot()
+
+    async def capture(self, kind: str, coroutine):
+        """Await the coroutine under the profilers, unprofiled if another capture is running"""
+        if Profiler._capturing:
+            return await coroutine
+        Profiler._capturing = True
+        if self._profile is None:
+            self._start()
+        start = time.perf_counter()
+        self._profile.enable()
+        try:
+            return await coroutine
+        finally:
+            self._profile.disable()
+            self._elapsed_s += time.perf_counter() - start
+            Profiler._capturing = False
+            self._captured.append(kind)
+            if kind == "cycle":
+                self.cycles = max(self.cycles - 1, 0)
+            else:
+                self.report = False
+
+    def _allocations_text(self) -> str:
+        after = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )
+        lines = []
+        for stat in after.filter_traces(ignore).compare_to(self._before.filter_traces(ignore), "lineno")[:self.top]:
+            lines.append(str(stat))
+        return "\n".join(lines)
+
+    def _functions_text(self, sort: str) -> str:
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).strip_dirs().sort_stats(sort).print_stats(self.top)
+        return stream.getvalue().strip()
+
+    def finish(self) -> str:
+        """Build the report and disarm"""
+        counts = {kind: self._captured.count(kind) for kind in dict.fromkeys(self._captured)}
+        captured = ", ".join(f"{count} {kind}{'s' if count > 1 else ''}" for kind, count in counts.items())
+        msg = f"Profile of {captured} ({self._elapsed_s:.3f}s)\n"
+        msg += "===== Top functions by cumulative time =====\n"
+        msg += self._functions_text("cumulative") + "\n"
+        msg += "===== Top functions by own time =====\n"
+        msg += self._functions_text("tottime") + "\n"
+        msg += "===== Top allocations (size since the first capture) =====\n"
+        msg += self._allocations_text() + "\n"
+        self._profile = None
+        self._before = None
+        self._captured = []
+        self._elapsed_s = 0.0
+        return msg
+
+    def __str__(self) -> str:
+        return f"Profiler(cycles={self.cycles}, report={self.report}, captured={len(self._captured)})"
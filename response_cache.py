@@ -0,0 +1,181 @@
+"""Cache brawl api responses shared across commands"""
+import asyncio
+import time
+import weakref
+from collections import OrderedDict, defaultdict
+from brawl_client import BrawlClient
+from metrics import CACHE_HIT_RATE, CACHE_REQUESTS, QUEUE_DEPTH
+
+_CACHES: "weakref.WeakSet[CachedBrawlClient]" = weakref.WeakSet()
+
+
+def _hit_rate() -> float:
+    """Fraction of calls served without a new API request, across open caches"""
+    served = sum(sum(cache.hits.values()) + sum(cache.coalesced.values()) for cache in _CACHES)
+    total = served + sum(sum(cache.misses.values()) for cache in _CACHES)
+    return served / total if total else 0.0
+
+
+CACHE_HIT_RATE.set_function(function=_hit_rate)
+QUEUE_DEPTH.set_function("brawl_api_in_flight", function=lambda: sum(len(cache._in_flight) for cache in _CACHES))
+
+
+class CachedBrawlClient:
+    """
+    Drop-in replacement for BrawlClient that caches successful responses.
+    - Per-endpoint TTLs
+    - lookup_player remembers found and missing (404) tags for ttls["player_lookup"]
+    - Concurrent callers for the same tag share one in-flight request
+    - LRU eviction once max_entries is reached
+    - Hit/miss counters per endpoint
+    """
+    DEFAULT_TTLS = {
+        "player_info": 30,
+        "battle_logs": 20,
+        "club_members": 300,
+        "player_lookup": 600,
+    }
+
+    def __init__(
+        self,
+        brawl_client: BrawlClient | None = None,
+        ttls: dict[str, float] | None = None,
+        max_entries: int = 1024,
+        clock=time.monotonic,
+    ):
+        self.brawl_client = brawl_client or BrawlClient()
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[tuple[str, str], tuple[float, object]] = OrderedDict()
+        self._in_flight: dict[tuple[str, str], asyncio.Task] = {}
+        self.hits: dict[str, int] = defaultdict(int)
+        self.misses: dict[str, int] = defaultdict(int)
+        self.coalesced: dict[str, int] = defaultdict(int)
+        _CACHES.add(self)
+
+    def _count(self, outcome: str, endpoint: str) -> None:
+        """Count a call as a "hit", "miss" or "coalesced" one"""
+        counts = {"hit": self.hits, "miss": self.misses, "coalesced": self.coalesced}[outcome]
+        counts[endpoint] += 1
+        CACHE_REQUESTS.inc(endpoint, outcome)
+
+    async def _get(self, endpoint: str, player_tag: str, fetch, is_success):
+        """Serve from cache, join an in-flight request, or fetch and store on success"""
+        key = (endpoint, player_tag)
+        value = self._cached(key)
+        if value is not None:
+            self._count("hit", endpoint)
+            return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._count("coalesced", endpoint)
+        else:
+            self._count("miss", endpoint)
+            task = asyncio.ensure_future(fetch(player_tag))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._store(endpoint, key, done, is_success))
+        # Shield so one caller being cancelled does not cancel the shared request
+        return await asyncio.shield(task)
+
+    def _cached(self, key: tuple[str, str]):
+        """Unexpired cached value for a key, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, endpoint: str, key: tuple[str, str], value) -> None:
+        self._entries[key] = (self.clock() + self.ttls[endpoint], value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _store(self, endpoint: str, key: tuple[str, str], task: asyncio.Task, is_success) -> None:
+        """Record a finished request, caching only successful responses"""
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if not is_success(value):
+            return
+        self._put(endpoint, key, value)
+
+    async def get_player_info(self, player_tag: str):
+        """Get player info, cached for ttls["player_info"] seconds"""
+        return await self._get(
+            "player_info",
+            player_tag,
+            self.brawl_client.get_player_info,
+            lambda value: value is not None,
+        )
+
+    async def _fetch_lookup(self, player_tag: str):
+        """Look a player up, also caching a found player as player info"""
+        status, profile = await self.brawl_client.lookup_player(player_tag)
+        if status == 200:
+            self._put("player_info", ("player_info", player_tag), profile)
+        return status, profile
+
+    async def lookup_player(self, player_tag: str):
+        """
+        Get the status code and player info. Found (200) and missing (404) tags are
+        cached for ttls["player_lookup"] seconds, errors are not. A fetched player is
+        also cached as player info, so a following get_player_info is a hit.
+        """
+        profile = self._cached(("player_info", player_tag))
+        if profile is not None:
+            self._count("hit", "player_info")
+            return 200, profile
+        return await self._get(
+            "player_lookup",
+            player_tag,
+            self._fetch_lookup,
+            lambda lookup: lookup[0] in (200, 404),
+        )
+
+    async def get_player_battle_logs(self, player_tag: str):
+        """Get battle log for player, cached for ttls["battle_logs"] seconds"""
+        return await self._get(
+            "battle_logs",
+            player_tag,
+            self.brawl_client.get_player_battle_logs,
+            lambda value: isinstance(value, list),
+        )
+
+    async def get_club_members(self, club_tag: str):
+        """Get the members of a club, cached for ttls["club_members"] seconds"""
+        return await self._get(
+            "club_members",
+            club_tag,
+            self.brawl_client.get_club_members,
+            lambda value: value is not None,
+        )
+
+    def invalidate(self, player_tag: str) -> None:
+        """Drop every cached response for a player"""
+        for endpoint in self.ttls:
+            self._entries.pop((endpoint, player_tag), None)
+
+    def hit_rate(self) -> float:
+        """Fraction of calls served without a new API request"""
+        served = sum(self.hits.values()) + sum(self.coalesced.values())
+        total = served + sum(self.misses.values())
+        return served / total if total else 0.0
+
+    async def close(self) -> None:
+        """Close the underlying client, and stop reporting this cache in the gauges"""
+        _CACHES.discard(self)
+        await self.brawl_client.close()
+
+    def __str__(self) -> str:
+        return (
+            f"CachedBrawlClient(entries={len(self._entries)}, hits={dict(self.hits)}, "
+            f"misses={dict(self.misses)}, coalesced={dict(self.coalesced)})"
+        )
@@ -0,0 +1,163 @@
+"""Persist bot state in SQLite"""
+import datetime
+import json
+import os
+import pickle
+import sqlite3
+from brawler_snapshot import BrawlerSnapshot
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    tag TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clubs (
+    name TEXT PRIMARY KEY,
+    tag TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS club_members (
+    name TEXT PRIMARY KEY,
+    club TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_players (
+    name TEXT PRIMARY KEY,
+    start_info TEXT NOT NULL,
+    stats TEXT NOT NULL
+);
+-- Battles live in the battle archive, older databases also stored them here
+DROP TABLE IF EXISTS battles;
+"""
+
+
+class StateStore:
+    """
+    SQLite (WAL mode) storage for registered players and the active session.
+    Writes are queued and committed together in one transaction on flush().
+    """
+    def __init__(self, path: str = "message_controller_state.db"):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._pending: list[tuple[str, tuple]] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _queue(self, sql: str, params: tuple = ()) -> None:
+        self._pending.append((sql, params))
+
+    def set_setting(self, key: str, value: str) -> None:
+        self._queue("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    def put_player(self, name: str, tag: str) -> None:
+        self._queue("INSERT OR REPLACE INTO players (name, tag) VALUES (?, ?)", (name, tag))
+
+    def delete_player(self, name: str) -> None:
+        self._queue("DELETE FROM players WHERE name = ?", (name,))
+        self.delete_club_member(name)
+        self.delete_session_player(name)
+
+    def put_club(self, name: str, tag: str) -> None:
+        self._queue("INSERT OR REPLACE INTO clubs (name, tag) VALUES (?, ?)", (name, tag))
+
+    def delete_club(self, name: str) -> None:
+        self._queue("DELETE FROM clubs WHERE name = ?", (name,))
+        self._queue("DELETE FROM club_members WHERE club = ?", (name,))
+
+    def put_club_member(self, name: str, club: str) -> None:
+        self._queue("INSERT OR REPLACE INTO club_members (name, club) VALUES (?, ?)", (name, club))
+
+    def delete_club_member(self, name: str) -> None:
+        self._queue("DELETE FROM club_members WHERE name = ?", (name,))
+
+    def start_session(self, start_time: datetime.datetime, start_infos: dict[str, BrawlerSnapshot],
+                      stats: dict[str, dict]) -> None:
+        """Replace any previous session with a new one"""
+        self.end_session()
+        self.set_setting("session_start_time", start_time.isoformat())
+        for name, start_info in start_infos.items():
+            self._queue(
+                "INSERT INTO session_players (name, start_info, stats) VALUES (?, ?, ?)",
+                (name, json.dumps(start_info.to_json()), json.dumps(stats[name])),
+            )
+
+    def update_session_stats(self, name: str, stats: dict) -> None:
+        self._queue("UPDATE session_players SET stats = ? WHERE name = ?", (json.dumps(stats), name))
+
+    def delete_session_player(self, name: str) -> None:
+        self._queue("DELETE FROM session_players WHERE name = ?", (name,))
+
+    def end_session(self) -> None:
+        self._queue("DELETE FROM settings WHERE key = 'session_start_time'")
+        self._queue("DELETE FROM session_players")
+
+    def flush(self) -> int:
+        """Commit all queued writes in one transaction, return how many were written"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+        connection = self._connect()
+        with connection:
+            for sql, params in pending:
+                connection.execute(sql, params)
+        return len(pending)
+
+    def load(self) -> dict:
+        """Read back everything stored, in the shape MessageController keeps in memory"""
+        connection = self._connect()
+        settings = dict(connection.execute("SELECT key, value FROM settings"))
+        start_time = settings.pop("session_start_time", None)
+        settings.pop("pickle_imported", None)
+        state = {
+            "settings": settings,
+            "player_map": dict(connection.execute("SELECT name, tag FROM players ORDER BY rowid")),
+            "clubs": dict(connection.execute("SELECT name, tag FROM clubs ORDER BY rowid")),
+            "player_clubs": dict(connection.execute("SELECT name, club FROM club_members ORDER BY rowid")),
+            "start_time": datetime.datetime.fromisoformat(start_time) if start_time else None,
+            "start_infos": {},
+            "stats": {},
+        }
+        for name, start_info, stats in connection.execute(
+            "SELECT name, start_info, stats FROM session_players ORDER BY rowid"
+        ):
+            state["start_infos"][name] = json.loads(start_info)
+            state["stats"][name] = json.loads(stats)
+        return state
+
+    def import_pickle(self, filename: str = "message_controller_state.pkl") -> bool:
+        """
+        One-time import of the old pickle state, if the database has no players yet.
+        Recorded in settings so players removed later are not imported again.
+        """
+        if not os.path.exists(filename):
+            return False
+        connection = self._connect()
+        if connection.execute("SELECT 1 FROM settings WHERE key = 'pickle_imported'").fetchone():
+            return False
+        if not connection.execute("SELECT 1 FROM players LIMIT 1").fetchone():
+            with open(filename, "rb") as file:
+                state = pickle.load(file)
+            for name, tag in state.get("player_map", {}).items():
+                self.put_player(name, tag)
+            if "name" in state:
+                self.set_setting("name", state["name"])
+            imported = True
+        else:
+            imported = False  # Database in use from before the flag existed
+        self.set_setting("pickle_imported", filename)
+        self.flush()
+        return imported
+
+    def close(self) -> None:
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,27 @@
+"""Shared test doubles"""
+from battle_record import BattleRecord
+
+
+class FakeClock:
+    """Clock for code that takes a clock callable, advanced by hand through now"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def game(battle_time: str, result: str, trophy_change: int, star_tag: str | None = None) -> BattleRecord:
+    """A solo brawl ball game of #111"""
+    return BattleRecord.from_api({
+        "battleTime": battle_time,
+        "event": {"id": 15000144, "mode": "brawlBall", "map": "Sunny Soccer"},
+        "battle": {
+            "mode": "brawlBall",
+            "result": result,
+            "duration": 120,
+            "trophyChange": trophy_change,
+            "starPlayer": {"tag": star_tag} if star_tag else None,
+            "teams": [[{"tag": "#111", "brawler": {"id": 16000037, "name": "SPROUT"}}]],
+        },
+    }, "#111")
@@ -0,0 +1,53 @@
+import unittest
+from api_key_pool import ApiKeyPool
+from tests.helpers import FakeClock
+
+
+class TestApiKeyPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.pool = ApiKeyPool(["a", "b"], requests_per_second=2, bench_after=2, bench_seconds=60, clock=self.clock)
+
+    async def test_picks_least_loaded_key(self):
+        first = await self.pool.acquire(max_wait=0)
+        second = await self.pool.acquire(max_wait=0)
+        self.assertNotEqual(first.token, second.token)
+        self.pool.release(first, 200)
+        self.assertIs(await self.pool.acquire(max_wait=0), first)
+
+    async def test_respects_per_key_budget(self):
+        keys = [await self.pool.acquire(max_wait=0) for _ in range(4)]
+        self.assertEqual(sorted(key.token for key in keys), ["a", "a", "b", "b"])
+        self.assertIsNone(await self.pool.acquire(max_wait=0))
+        self.clock.now = 0.5
+        self.assertIsNotNone(await self.pool.acquire(max_wait=0))
+
+    async def test_retry_after_blocks_key(self):
+        key = await self.pool.acquire(max_wait=0)
+        self.pool.release(key, 429, retry_after=5)
+        self.assertEqual(self.pool.benched(), 1)
+        self.clock.now = 5
+        self.assertEqual(self.pool.benched(), 0)
+
+    async def test_concurrent_429s_count_once(self):
+        keys = [await self.pool.acquire(max_wait=0) for _ in range(4)]
+        for key in keys:
+            self.pool.release(key, 429, retry_after=1)
+        self.assertEqual([key.failures for key in self.pool.keys], [1, 1])
+
+    async def test_benches_after_repeated_failures(self):
+        key = self.pool.keys[0]
+        for _ in range(2):
+            key.in_flight += 1
+            self.pool.release(key, 403)
+        self.assertEqual(key.available_at, 60)
+        key.in_flight += 1
+        self.pool.release(key, 403)
+        self.assertEqual(key.available_at, 120)  # Doubles while it keeps failing
+        key.in_flight += 1
+        self.pool.release(key, 200)
+        self.assertEqual(key.failures, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import datetime
+import tempfile
+import unittest
+from battle_archive import BattleArchive
+from tests.helpers import game
+
+
+class TestBattleArchive(unittest.TestCase):
+    def test_append_is_idempotent_and_ordered(self):
+        archive = BattleArchive(path=None)
+        self.assertTrue(archive.append("#111", game("20250330T161201.000Z", "victory", 10, "#111")))
+        self.assertTrue(archive.append("#111", game("20250330T161628.000Z", "defeat", -6)))
+        self.assertFalse(archive.append("#111", game("20250330T161628.000Z", "defeat", -6)))
+        self.assertFalse(archive.append("#111", game("20250330T161201.000Z", "victory", 10)))
+
+        battles = archive.scan("#111")
+        self.assertEqual(len(battles), 2)
+        self.assertEqual(list(battles["trophy_change"]), [10, -6])
+        self.assertEqual(list(battles["star_player"]), [1, 0])
+        self.assertEqual(list(battles["brawler_id"]), [16000037, 16000037])
+        self.assertEqual(archive.string(battles["map"][0]), "Sunny Soccer")
+
+    def test_append_keeps_distinct_battles_in_the_last_second(self):
+        archive = BattleArchive(path=None)
+        self.assertTrue(archive.append("#111", game("20250330T161628.000Z", "defeat", -6)))
+        self.assertTrue(archive.append("#111", game("20250330T161628.000Z", "victory", 8)))
+        self.assertFalse(archive.append("#111", game("20250330T161628.000Z", "defeat", -6)))
+
+        self.assertEqual(archive.summarize("#111")["games"], 2)
+        self.assertEqual(archive.summarize("#111")["victories"], 1)
+
+    def test_scan_range_and_summary(self):
+        archive = BattleArchive(path=None)
+        archive.append("#111", game("20250330T150000.000Z", "victory", 10))
+        archive.append("#111", game("20250330T161201.000Z", "victory", 10, "#111"))
+        archive.append("#111", game("20250330T161628.000Z", "defeat", -6))
+        start = datetime.datetime(2025, 3, 30, 16, tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(archive.summarize("#111", start), {
+            "games": 2,
+            "victories": 1,
+            "defeats": 1,
+            "star_players": 1,
+            "game_durations_s": 240,
+        })
+
+    def test_flush_and_reload(self):
+        with tempfile.TemporaryDirectory() as directory:
+            archive = BattleArchive(path=directory)
+            archive.append("#111", game("20250330T161201.000Z", "victory", 10))
+            archive.flush()
+            archive.append("#111", game("20250330T161628.000Z", "defeat", -6))
+            archive.flush()
+
+            reloaded = BattleArchive(path=directory)
+            battles = reloaded.scan("#111")
+            self.assertEqual(list(battles["trophy_change"]), [10, -6])
+            self.assertEqual(reloaded.string(battles["mode"][1]), "brawlBall")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from battle_events import BattleEvent, EventBus
+from metrics import BATTLE_EVENT_ERRORS
+
+
+def event(battle_time: int) -> BattleEvent:
+    return BattleEvent(battle_time, [])
+
+
+class TestEventBus(unittest.IsolatedAsyncioTestCase):
+    async def test_every_stage_gets_every_event_in_order(self):
+        bus = EventBus()
+        seen = {"stats": [], "streaks": []}
+        bus.subscribe("stats", lambda events: seen["stats"].extend(e.battle_time for e in events))
+
+        async def streaks(events):
+            await asyncio.sleep(0)
+            seen["streaks"].extend(e.battle_time for e in events)
+        bus.subscribe("streaks", streaks)
+
+        for battle_time in range(5):
+            await bus.publish(event(battle_time))
+        await bus.drain()
+
+        self.assertEqual(seen, {"stats": [0, 1, 2, 3, 4], "streaks": [0, 1, 2, 3, 4]})
+
+    async def test_failing_batch_does_not_stop_the_stage(self):
+        bus = EventBus()
+        handled = []
+
+        def flaky(events):
+            if events[0].battle_time == 0:
+                raise ValueError("boom")
+            handled.extend(events)
+        bus.subscribe("flaky", flaky)
+        errors = BATTLE_EVENT_ERRORS.values.get(("flaky",), 0)
+
+        await bus.publish(event(0))
+        await bus.drain()
+        await bus.publish(event(1))
+        await bus.drain()
+
+        self.assertEqual([e.battle_time for e in handled], [1])
+        self.assertEqual(BATTLE_EVENT_ERRORS.values[("flaky",)], errors + 1)
+
+    async def test_full_queue_applies_backpressure(self):
+        bus = EventBus()
+        release = asyncio.Event()
+        fast = []
+
+        async def slow(events):
+            await release.wait()
+        bus.subscribe("fast", fast.extend)
+        bus.subscribe("slow", slow, max_queue=1)
+
+        await bus.publish(event(0))
+        await asyncio.sleep(0)  # The slow stage takes event 0 and blocks
+        await bus.publish(event(1))
+        publishing = asyncio.ensure_future(bus.publish(event(2)))
+        await asyncio.sleep(0.01)
+        self.assertFalse(publishing.done())  # Waits for room in the slow stage's queue
+        self.assertEqual(bus.depth("slow"), 1)
+
+        release.set()
+        await publishing
+        await bus.drain()
+        self.assertEqual([e.battle_time for e in fast], [0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
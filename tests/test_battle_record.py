@@ -0,0 +1,58 @@
+import datetime
+import unittest
+from battle_record import BattleRecord, battle_time_to_epoch
+
+GAME = {
+    "battleTime": "20250330T161628.000Z",
+    "event": {"id": 15000144, "mode": "brawlBall", "map": "Sunny Soccer"},
+    "battle": {
+        "mode": "brawlBall",
+        "type": "ranked",
+        "result": "defeat",
+        "duration": 150,
+        "trophyChange": -6,
+        "starPlayer": {"tag": "#2GCYG2GRJ", "name": "Im inya"},
+        "teams": [
+            [{"tag": "#80CQC8V8J", "name": "pabloski", "brawler": {"id": 16000005, "name": "SPIKE"}}],
+            [{"tag": "#2GCYG2GRJ", "name": "Im inya", "brawler": {"id": 16000037, "name": "SPROUT"}}],
+        ],
+    },
+}
+
+
+class TestBattleRecord(unittest.TestCase):
+    def test_battle_time_to_epoch(self):
+        self.assertEqual(
+            battle_time_to_epoch("20250330T161628.000Z"),
+            int(datetime.datetime(2025, 3, 30, 16, 16, 28, tzinfo=datetime.timezone.utc).timestamp()),
+        )
+
+    def test_from_api(self):
+        record = BattleRecord.from_api(GAME, "#2GCYG2GRJ")
+        self.assertEqual(record.battle_time, battle_time_to_epoch("20250330T161628.000Z"))
+        self.assertEqual(record.result, "defeat")
+        self.assertEqual(record.trophy_change, -6)
+        self.assertEqual(record.duration, 150)
+        self.assertTrue(record.star_player)
+        self.assertEqual(record.mode, "brawlBall")
+        self.assertEqual(record.map, "Sunny Soccer")
+        self.assertEqual(record.brawler_id, 16000037)
+        self.assertEqual(record.brawler_name, "SPROUT")
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_from_api_without_star_player_or_trophies(self):
+        game = {"battleTime": "20250330T161628.000Z", "battle": {"result": "victory", "starPlayer": None}}
+        record = BattleRecord.from_api(game, "#80CQC8V8J")
+        self.assertFalse(record.star_player)
+        self.assertEqual(record.trophy_change, 0)
+        self.assertEqual(record.brawler_id, 0)
+
+    def test_from_api_interns_strings(self):
+        older = {**GAME, "battleTime": "20250330T161201.000Z"}
+        records = [BattleRecord.from_api(game, "#80CQC8V8J") for game in (GAME, older)]
+        self.assertEqual(records[1].battle_time, battle_time_to_epoch("20250330T161201.000Z"))
+        self.assertIs(records[0].mode, records[1].mode)
+
+
+if __name__ == "__main__":
+    unittest.main()
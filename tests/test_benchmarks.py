@@ -0,0 +1,34 @@
+import unittest
+from benchmarks.run_benchmarks import compare
+from benchmarks.synthetic import FakeBrawlClient, SyntheticWorld
+from match_index import MatchIndex
+
+
+class TestSynthetic(unittest.IsolatedAsyncioTestCase):
+    async def test_battle_logs_parse_like_the_api(self):
+        world = SyntheticWorld(3, seed=1)
+        world.advance(30)
+        client = FakeBrawlClient(world)
+        player = world.players[0]
+
+        game_log = await client.get_player_battle_logs(player.tag)
+        self.assertEqual(len(game_log), 25)
+        index = MatchIndex()
+        self.assertEqual(index.add_log(game_log, player.tag), 25)
+        matches = index.matches()
+        self.assertTrue(all(a.battle_time < b.battle_time for a, b in zip(matches, matches[1:])))
+
+        profile = await client.get_player_info(player.tag)
+        self.assertEqual(profile.trophies, player.trophies)
+        self.assertEqual(await client.get_player_battle_logs("#MISSING"), 404)
+        self.assertIsNone(await client.get_player_info("#MISSING"))
+
+    def test_compare_flags_slowdowns(self):
+        baseline = {"scales": {"10": {"update_battle_logs": {"mean_s": 0.010}}}}
+        current = {"scales": {"10": {"update_battle_logs": {"mean_s": 0.015}, "new": {"mean_s": 1}}}}
+        self.assertEqual(len(compare(current, baseline, threshold=0.2)), 1)
+        self.assertEqual(compare(current, baseline, threshold=0.6), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
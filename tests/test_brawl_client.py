@@ -1,48 +1,161 @@
 import unittest
-from unittest.mock import patch, Mock
-from brawl_client import BrawlClient
+from unittest.mock import ANY, AsyncMock, MagicMock
+from brawl_client import THROTTLED, BrawlClient
 
 
-class TestBrawlClient(unittest.TestCase):
+def mock_response(status: int, json_data=None, headers=None) -> MagicMock:
+    """Build a fake aiohttp response usable as `async with session.get(...)`"""
+    response = MagicMock()
+    response.status = status
+    response.headers = headers or {}
+    response.json = AsyncMock(return_value=json_data)
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=response)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return context
+
+
+def mock_session(status: int, json_data=None) -> MagicMock:
+    """Build a fake aiohttp session whose get() always yields the same response"""
+    session = MagicMock()
+    session.get.return_value = mock_response(status, json_data)
+    return session
+
+
+class TestBrawlClient(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.brawl_client = BrawlClient()
+        self.brawl_client = BrawlClient(api_tokens=["key0"], backoff_base=0)
 
-    @patch('brawl_client.requests.get')
-    def test_get_player_info_success(self, mock_get):
+    async def test_get_player_info_success(self):
         player_tag = "#PLAYER123"
         encoded_tag = "%23PLAYER123"
 
-        mock_response = Mock()
         expected_json = {
             "tag": "#PLAYER123",
             "name": "PlayerName",
-            "trophies": 5000
+            "trophies": 5000,
+            "brawlers": [{
+                "id": 16000000, "name": "SHELLY", "trophies": 600,
+                "gadgets": [{"id": 23000255, "name": "FAST FORWARD"}],
+                "starPowers": [{"id": 23000076, "name": "SHELL SHOCK"}],
+                "gears": [{"id": 62000000, "name": "SPEED", "level": 3}],
+            }],
         }
-        mock_response.status_code = 200
-        mock_response.json.return_value = expected_json
-        mock_get.return_value = mock_response
+        session = mock_session(200, expected_json)
+        self.brawl_client._get_session = MagicMock(return_value=session)
 
-        result = self.brawl_client.get_player_info(player_tag)
+        result = await self.brawl_client.get_player_info(player_tag)
 
         self.assertIsNotNone(result)
-        self.assertEqual(result["tag"], "#PLAYER123")
-        self.assertEqual(result["name"], "PlayerName")
-        self.assertEqual(result["trophies"], 5000)
-        mock_get.assert_called_once_with(
-            url=f"https://api.brawlstars.com/v1/players/{encoded_tag}",
-            headers={"Authorization": f"Bearer {self.brawl_client.API_TOKEN}"},
-            timeout=10
+        self.assertEqual(result.tag, "#PLAYER123")
+        self.assertEqual(result.name, "PlayerName")
+        self.assertEqual(result.trophies, 5000)
+        self.assertEqual(result.snapshot.brawler_trophies.tolist(), [600])
+        session.get.assert_called_once_with(
+            f"https://api.brawlstars.com/v1/players/{encoded_tag}",
+            headers={"Authorization": "Bearer key0"},
         )
 
-    @patch('brawl_client.requests.get')
-    def test_get_player_info_not_found(self, mock_get):
+    async def test_get_player_info_not_found(self):
         player_tag = "#UNKNOWN123"
 
-        mock_response = Mock()
-        mock_response.status_code = 404
-        mock_get.return_value = mock_response
+        session = mock_session(404)
+        self.brawl_client._get_session = MagicMock(return_value=session)
 
-        result = self.brawl_client.get_player_info(player_tag)
+        result = await self.brawl_client.get_player_info(player_tag)
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with
+        session.get.assert_called_once()
+        self.assertEqual(await self.brawl_client.lookup_player(player_tag), (404, None))
+
+    async def test_get_player_battle_logs(self):
+        session = mock_session(200, {"items": [{"battleTime": "20250330T161628.000Z"}]})
+        self.brawl_client._get_session = MagicMock(return_value=session)
+
+        result = await self.brawl_client.get_player_battle_logs("#PLAYER123")
+
+        self.assertEqual(result, [{"battleTime": "20250330T161628.000Z"}])
+        session.get.assert_called_once_with(
+            "https://api.brawlstars.com/v1/players/%23PLAYER123/battlelog",
+            headers={"Authorization": "Bearer key0"},
+        )
+
+    async def test_get_player_battle_logs_error(self):
+        session = mock_session(503)
+        self.brawl_client._get_session = MagicMock(return_value=session)
+
+        result = await self.brawl_client.get_player_battle_logs("#PLAYER123")
+
+        self.assertEqual(result, 503)
+        self.assertEqual(session.get.call_count, self.brawl_client.max_retries + 1)
+
+    async def test_get_club_members(self):
+        items = [{"tag": "#AAA", "name": "Sprout Main", "role": "member", "trophies": 30000, "icon": {"id": 1}}]
+        session = mock_session(200, {"items": items, "paging": {"cursors": {}}})
+        self.brawl_client._get_session = MagicMock(return_value=session)
+
+        result = await self.brawl_client.get_club_members("#CLUB1")
+
+        self.assertEqual(result, [{"tag": "#AAA", "name": "Sprout Main"}])
+        session.get.assert_called_once_with(
+            "https://api.brawlstars.com/v1/clubs/%23CLUB1/members",
+            headers={"Authorization": "Bearer key0"},
+        )
+
+    async def test_no_key_available_is_not_reported_as_429(self):
+        session = mock_session(200, {"items": []})
+        self.brawl_client._get_session = MagicMock(return_value=session)
+        self.brawl_client.api_keys.acquire = AsyncMock(return_value=None)
+
+        self.assertEqual(await self.brawl_client.get_player_battle_logs("#PLAYER123"), THROTTLED)
+        session.get.assert_not_called()
+
+    async def test_last_server_status_is_kept_when_keys_run_out(self):
+        session = mock_session(403)
+        self.brawl_client._get_session = MagicMock(return_value=session)
+        key = self.brawl_client.api_keys.keys[0]
+        key.in_flight += 1
+        self.brawl_client.api_keys.acquire = AsyncMock(side_effect=[key, None])
+
+        self.assertEqual(await self.brawl_client.get_player_battle_logs("#PLAYER123"), 403)
+
+    async def test_retries_after_server_error(self):
+        session = MagicMock()
+        session.get.side_effect = [mock_response(502), mock_response(200, {"items": []})]
+        self.brawl_client._get_session = MagicMock(return_value=session)
+
+        self.assertEqual(await self.brawl_client.get_player_battle_logs("#PLAYER123"), [])
+        self.assertEqual(session.get.call_count, 2)
+
+    async def test_throttled_request_moves_to_another_key(self):
+        brawl_client = BrawlClient(api_tokens=["key0", "key1"], backoff_base=0)
+        session = MagicMock()
+        session.get.side_effect = [
+            mock_response(429, headers={"Retry-After": "30"}),
+            mock_response(200, {"trophies": 5000}),
+        ]
+        brawl_client._get_session = MagicMock(return_value=session)
+
+        self.assertEqual((await brawl_client.get_player_info("#PLAYER123")).trophies, 5000)
+        first, second = (call.kwargs["headers"]["Authorization"] for call in session.get.call_args_list)
+        self.assertNotEqual(first, second)
+        self.assertEqual(brawl_client.api_keys.benched(), 1)
+
+    async def test_session_is_shared(self):
+        first = self.brawl_client._get_session()
+        second = self.brawl_client._get_session()
+        self.assertIs(first, second)
+        self.assertEqual(first.connector.limit_per_host, self.brawl_client.limit_per_host)
+        await self.brawl_client.close()
+        self.assertTrue(first.closed)
+
+    async def test_base_url_is_configurable(self):
+        brawl_client = BrawlClient(base_url="http://127.0.0.1:8765/v1/")
+        session = mock_session(200, {"items": []})
+        brawl_client._get_session = MagicMock(return_value=session)
+
+        await brawl_client.get_player_battle_logs("#PLAYER123")
+
+        session.get.assert_called_once_with(
+            "http://127.0.0.1:8765/v1/players/%23PLAYER123/battlelog", headers=ANY,
+        )
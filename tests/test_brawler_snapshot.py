@@ -0,0 +1,41 @@
+import unittest
+from brawler_snapshot import BrawlerSnapshot, brawler_name
+
+
+def player_info(trophies: int, brawlers: list[tuple[int, str, int]]) -> dict:
+    return {
+        "trophies": trophies,
+        "brawlers": [
+            {"id": brawler_id, "name": name, "trophies": brawler_trophies, "gadgets": [], "starPowers": []}
+            for brawler_id, name, brawler_trophies in brawlers
+        ],
+    }
+
+
+class TestBrawlerSnapshot(unittest.TestCase):
+    def test_diff_by_brawler_id(self):
+        start = BrawlerSnapshot.from_player_info(player_info(1500, [
+            (16000000, "SHELLY", 500),
+            (16000037, "SPROUT", 800),
+        ]))
+        # SPIKE unlocked mid-session shifts list positions
+        end = BrawlerSnapshot.from_player_info(player_info(1530, [
+            (16000000, "SHELLY", 510),
+            (16000005, "SPIKE", 8),
+            (16000037, "SPROUT", 812),
+        ]))
+
+        self.assertEqual(end.trophies - start.trophies, 30)
+        self.assertEqual(start.diff(end), [(16000000, 10), (16000005, 8), (16000037, 12)])
+        self.assertEqual(brawler_name(16000005), "SPIKE")
+
+    def test_json_round_trip(self):
+        snapshot = BrawlerSnapshot.from_brawlers(900, [(16000001, 300), (16000003, 600)])
+        restored = BrawlerSnapshot.from_json(snapshot.to_json())
+        self.assertEqual(restored.trophies, 900)
+        self.assertEqual(snapshot.diff(restored), [])
+        self.assertEqual(restored.brawler_trophies.tolist(), [0, 300, 0, 600])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import asyncio
+import datetime
+import unittest
+from chart_renderer import ChartRenderer, render_trophy_chart
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def sample_series():
+    start = int(datetime.datetime(2025, 3, 30, 16, tzinfo=datetime.timezone.utc).timestamp())
+    times = [start + 180 * i for i in range(4)]
+    return [("player1", times, [0, 8, 2, 2], [False, True, False, False])]
+
+
+class TestRenderTrophyChart(unittest.TestCase):
+    def test_renders_png_bytes(self):
+        image = render_trophy_chart("Trophies Delta Over Time", sample_series())
+        self.assertTrue(image.startswith(PNG_SIGNATURE))
+
+    def test_renders_without_series(self):
+        image = render_trophy_chart("Total Trophies Over Time", [])
+        self.assertTrue(image.startswith(PNG_SIGNATURE))
+
+
+class TestChartRenderer(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_renders_in_pool(self):
+        renderer = ChartRenderer(max_workers=2)
+        try:
+            images = await asyncio.gather(
+                renderer.render_trophy_chart("Total Trophies Over Time", sample_series()),
+                renderer.render_trophy_chart("Trophies Delta Over Time", sample_series()),
+            )
+        finally:
+            renderer.close()
+        self.assertEqual(len(images), 2)
+        for image in images:
+            self.assertTrue(image.startswith(PNG_SIGNATURE))
+
+    async def test_prewarm_starts_workers(self):
+        renderer = ChartRenderer(max_workers=2)
+        try:
+            await renderer.prewarm()
+            self.assertIsNotNone(renderer._executor)
+            image = await renderer.render_trophy_chart("Total Trophies Over Time", sample_series())
+        finally:
+            renderer.close()
+        self.assertTrue(image.startswith(PNG_SIGNATURE))
+
+
+if __name__ == "__main__":
+    unittest.main()
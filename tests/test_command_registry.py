@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+from command_registry import CommandRegistry
+
+
+class TestCommandRegistry(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.reply = AsyncMock()
+        self.registry = CommandRegistry(reply=self.reply)
+
+    def test_parse(self):
+        self.registry.register("!setname", AsyncMock(), "!setname <bot_name>", "set name", min_args=1)
+        self.registry.register("end", AsyncMock(), "{prefix} end", "end tracking", aliases=("cum",))
+
+        command = self.registry.parse("!setname my bot", "brawlbot")
+        self.assertEqual(command.name, "!setname")
+        self.assertEqual(command.argument, "my bot")
+        self.assertEqual(self.registry.parse("!brawlbot cum", "brawlbot").name, "end")
+        self.assertIsNone(self.registry.parse("!brawlbot add friend", "brawlbot"))
+        self.assertIsNone(self.registry.parse("!brawlbot !setname x", "brawlbot"))
+        self.assertIsNone(self.registry.parse("!otherbot end", "brawlbot"))
+        self.assertIsNone(self.registry.parse("end", "brawlbot"))
+
+    def test_duplicate_registration(self):
+        self.registry.register("end", AsyncMock(), "{prefix} end", "end tracking")
+        with self.assertRaises(ValueError):
+            self.registry.register("finish", AsyncMock(), "{prefix} finish", "end tracking", aliases=("end",))
+
+    async def test_admin_only_commands(self):
+        handler = AsyncMock()
+        self.registry.register("!profile", handler, "!profile [<cycles>]", "profile", admin_only=True)
+        command = self.registry.parse("!profile 3", "bot")
+
+        await self.registry.dispatch(command, "bot")
+        handler.assert_not_called()
+        self.reply.assert_called_once_with("Only server admins can use !profile [<cycles>]")
+
+        await self.registry.dispatch(command, "bot", is_admin=True)
+        handler.assert_called_once_with(command)
+
+    async def test_non_exclusive_commands_run_alongside_exclusive_ones(self):
+        release = asyncio.Event()
+
+        async def slow_handler(command):
+            await release.wait()
+
+        status = AsyncMock()
+        self.registry.register("end", slow_handler, "{prefix} end", "end tracking")
+        self.registry.register("status", status, "{prefix} status", "show status", exclusive=False)
+
+        slow = asyncio.ensure_future(self.registry.dispatch(self.registry.parse("!bot end", "bot"), "bot"))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(self.registry.dispatch(self.registry.parse("!bot status", "bot"), "bot"), 1)
+        status.assert_awaited_once()
+        self.assertFalse(slow.done())
+        release.set()
+        await slow
+
+    async def test_records_latency_and_errors(self):
+        self.registry.register("end", AsyncMock(side_effect=RuntimeError("boom")), "{prefix} end", "end tracking")
+        with self.assertRaises(RuntimeError):
+            await self.registry.dispatch(self.registry.parse("!bot end", "bot"), "bot")
+        self.assertEqual(self.registry.stats["end"].calls, 1)
+        self.assertEqual(self.registry.stats["end"].errors, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
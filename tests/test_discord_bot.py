@@ -0,0 +1,117 @@
+import asyncio
+import os
+import pickle
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from discord import TextChannel
+from brawl_client import BrawlClient
+from brawler_snapshot import PlayerProfile
+from discord_bot import DiscordBot
+from metrics import STARTUP_SECONDS
+from response_cache import CachedBrawlClient
+
+BATTLE = {
+    "battleTime": "20990101T000000.000Z",
+    "battle": {"result": "victory", "duration": 120, "trophyChange": 8},
+}
+
+
+def text_channel(channel_id: int) -> AsyncMock:
+    channel = AsyncMock(spec=TextChannel)
+    channel.id = channel_id
+    return channel
+
+
+class TestDiscordBot(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.bot = DiscordBot(token="token", channel_id=1)
+        self.raw_client = MagicMock(spec=BrawlClient)
+        self.raw_client.get_player_info.return_value = PlayerProfile.from_api({"trophies": 100, "brawlers": []})
+        self.raw_client.lookup_player.return_value = (200, self.raw_client.get_player_info.return_value)
+        self.raw_client.get_player_battle_logs.return_value = [BATTLE]
+        self.bot.brawl_client = CachedBrawlClient(self.raw_client)
+
+    def tearDown(self):
+        for message_controller in self.bot.message_controllers.values():
+            message_controller.state_store.close()
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    async def test_controllers_are_isolated_per_channel(self):
+        first = self.bot.get_message_controller(text_channel(1))
+        second = self.bot.get_message_controller(text_channel(2))
+
+        self.assertIs(self.bot.get_message_controller(text_channel(1)), first)
+        self.assertIsNot(first, second)
+        self.assertIs(first.brawl_client, second.brawl_client)
+        self.assertEqual(first.state_store.path, "message_controller_state.db")
+        self.assertEqual(second.state_store.path, "message_controller_state_2.db")
+
+    def test_legacy_pickle_is_imported_into_announcement_channel_only(self):
+        with open(DiscordBot.LEGACY_PICKLE_PATH, "wb") as file:
+            pickle.dump({"player_map": {"alice": "#AAA"}, "name": "oldbot"}, file)
+
+        first = self.bot.get_message_controller(text_channel(1))
+        second = self.bot.get_message_controller(text_channel(2))
+
+        self.assertEqual(first.player_map, {"alice": "#AAA"})
+        self.assertEqual(first.name, "oldbot")
+        self.assertEqual(second.player_map, {})
+        self.assertEqual(second.name, "brawlbot")
+
+    async def test_only_commands_create_a_channel_controller(self):
+        message = MagicMock()
+        message.channel = text_channel(5)
+        message.content = "!lol"
+
+        await self.bot.on_message(message)
+        self.assertNotIn(5, self.bot.message_controllers)
+        self.assertFalse(os.path.exists(self.bot._state_path(5)))
+
+        message.content = "!status"
+        await self.bot.on_message(message)
+        self.assertIn(5, self.bot.message_controllers)
+        self.assertTrue(os.path.exists(self.bot._state_path(5)))
+        message.channel.send.assert_called_once()
+
+    async def test_shared_player_is_fetched_once_per_cycle(self):
+        for channel_id, name in ((1, "alice"), (2, "bob")):
+            message_controller = self.bot.get_message_controller(text_channel(channel_id))
+            await message_controller._add_player(name, "#SAME")
+            await message_controller._start_tracking(name)
+
+        self.assertEqual(self.bot._tracked_tags(), {"#SAME"})
+        new_battles = await self.bot.poll_players(["#SAME"])
+
+        self.assertEqual(new_battles, {"#SAME": 1})
+        self.raw_client.get_player_battle_logs.assert_called_once_with("#SAME")
+        self.assertEqual(self.bot.message_controllers[1]._session_summaries()["alice"]["victories"], 1)
+        self.assertEqual(self.bot.message_controllers[2]._session_summaries()["bob"]["victories"], 1)
+
+    async def test_on_ready_records_startup_and_prewarms(self):
+        self.bot.client = MagicMock()
+        self.bot.client.loop = asyncio.get_running_loop()
+        self.bot.client.get_channel.return_value = text_channel(1)
+        self.bot.chart_renderer = MagicMock()
+        self.bot.chart_renderer.prewarm = AsyncMock()
+        self.bot.metrics_port = None
+        self.bot._run_started_at = time.perf_counter()
+
+        await self.bot.on_ready()
+        await asyncio.sleep(0)
+        self.bot._poll_task.cancel()
+        self.bot._club_sync_task.cancel()
+
+        self.bot.chart_renderer.prewarm.assert_awaited_once()
+        for phase in ("connect", "state_load", "prewarm"):
+            self.assertIn((phase,), STARTUP_SECONDS.values)
+        self.assertIn(1, self.bot.message_controllers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from brawl_client import BrawlClient
+from benchmarks.fake_api import FakeBrawlApi, LatencyModel, load_fixture
+from tests.helpers import FakeClock
+
+
+class TestFakeBrawlApi(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.clock = FakeClock()
+        self.api = FakeBrawlApi(players=3, battle_interval_s=60, clock=self.clock)
+        self.runner = await self.api.start(port=0)
+        self.brawl_client = BrawlClient(base_url=self.api.base_url, api_tokens=["key0"], backoff_base=0)
+
+    async def asyncTearDown(self):
+        await self.brawl_client.close()
+        await self.runner.cleanup()
+
+    async def test_serves_recorded_battle_log(self):
+        recorded = load_fixture("battlelog.yaml")
+        recorded_tag = next(iter(self.api.players))
+
+        game_log = await self.brawl_client.get_player_battle_logs(recorded_tag)
+
+        self.assertEqual(game_log, recorded)
+        player_info = await self.brawl_client.get_player_info(recorded_tag)
+        self.assertEqual(player_info.tag, recorded_tag)
+
+    async def test_battles_advance_with_simulated_time(self):
+        tag = "#SYN000001"
+        self.assertEqual(await self.brawl_client.get_player_battle_logs(tag), [])
+        self.clock.now = 600
+        game_log = await self.brawl_client.get_player_battle_logs(tag)
+        self.assertGreaterEqual(len(game_log), 5)
+        self.assertGreater(game_log[0]["battleTime"], game_log[-1]["battleTime"])
+
+    async def test_club_members(self):
+        members = await self.brawl_client.get_club_members("#CLUB0000")
+        self.assertEqual([member["tag"] for member in members], list(self.api.players))
+        self.assertIsNone(await self.brawl_client.get_club_members("#NOCLUB"))
+
+    async def test_unknown_player(self):
+        self.assertIsNone(await self.brawl_client.get_player_info("#NOBODY"))
+        self.assertEqual(await self.brawl_client.get_player_battle_logs("#NOBODY"), 404)
+
+    async def test_rate_limit_returns_retry_after(self):
+        self.api.requests_per_second = 1
+        self.assertIsNotNone(await self.brawl_client.get_player_info("#SYN000001"))
+        session = self.brawl_client._get_session()
+        headers = self.brawl_client.api_keys.keys[0].headers
+        async with session.get(f"{self.api.base_url}/players/%23SYN000001", headers=headers) as response:
+            self.assertEqual(response.status, 429)
+            self.assertEqual(response.headers["Retry-After"], "1")
+
+    async def test_injected_errors(self):
+        self.api.error_rate = 1.0
+        self.assertIn(await self.brawl_client.get_player_battle_logs("#SYN000001"), (500, 502, 503))
+
+
+class TestLatencyModel(unittest.TestCase):
+    def test_distributions(self):
+        self.assertEqual(LatencyModel("fixed:0.05").sample(), 0.05)
+        self.assertTrue(0.01 <= LatencyModel("uniform:0.01,0.2").sample() <= 0.2)
+        self.assertGreater(LatencyModel("lognormal:0.1,0.5").sample(), 0)
+        with self.assertRaises(ValueError):
+            LatencyModel("pareto:1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from match_index import MatchIndex
+
+
+def squad_battle(battle_time: str, tags: list[str], duration: int = 120) -> dict:
+    return {
+        "battleTime": battle_time,
+        "battle": {
+            "result": "victory",
+            "duration": duration,
+            "trophyChange": 8,
+            "teams": [[{"tag": tag} for tag in tags], [{"tag": "#999"}]],
+        },
+    }
+
+
+class TestMatchIndex(unittest.TestCase):
+    def test_shared_match_is_indexed_once(self):
+        index = MatchIndex()
+        shared = squad_battle("20250330T160000.000Z", ["#111", "#222"])
+        solo = {"battleTime": "20250330T160000.000Z", "battle": {"result": "defeat"}}
+
+        self.assertEqual(index.add_log([shared], "#111"), 1)
+        self.assertEqual(index.add_log([shared, solo], "#222"), 1)
+        self.assertEqual(index.add_log([solo], "#333"), 1)  # No roster, keyed by log owner
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual([sorted(match.roster) for match in index.matches()][0], ["#111", "#222", "#999"])
+
+    def test_battles_without_roster_in_the_same_second_stay_apart(self):
+        index = MatchIndex()
+        defeat = {"battleTime": "20250330T160000.000Z", "battle": {"result": "defeat", "trophyChange": -5}}
+        victory = {"battleTime": "20250330T160000.000Z", "battle": {"result": "victory", "trophyChange": 8}}
+
+        self.assertEqual(index.add_log([defeat, victory], "#111"), 2)
+        self.assertEqual(index.add_log([victory], "#111"), 0)
+        self.assertEqual(len(index), 2)
+
+    def test_covers_contiguous_squad_matches(self):
+        index = MatchIndex()
+        index.add_log([
+            squad_battle("20250330T160900.000Z", ["#111", "#222"]),
+            squad_battle("20250330T160600.000Z", ["#111", "#222"]),
+            squad_battle("20250330T160300.000Z", ["#111", "#222"]),
+        ], "#111")
+        last_battle_time = index.matches()[0].battle_time
+
+        self.assertTrue(index.covers("#222", last_battle_time))
+        self.assertFalse(index.covers("#222", last_battle_time - 1))  # Last ingested battle is not in the log
+        self.assertFalse(index.covers("#222", 0))
+        self.assertFalse(index.covers("#333", last_battle_time))
+
+    def test_gap_between_squad_matches_is_not_covered(self):
+        index = MatchIndex()
+        index.add_log([
+            squad_battle("20250330T163000.000Z", ["#111", "#222"]),
+            squad_battle("20250330T160000.000Z", ["#111", "#222"]),
+        ], "#111")
+
+        self.assertFalse(index.covers("#222", index.matches()[0].battle_time))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,29 @@
+import asyncio
+import datetime
+import os
+import pickle
+import tempfile
 import unittest
-from unittest.mock import AsyncMock, MagicMock, patch, mock_open
+from unittest.mock import AsyncMock, MagicMock, patch
 from discord import TextChannel
+from battle_record import BattleRecord, battle_time_to_epoch
 from brawl_client import BrawlClient
+from brawler_snapshot import BrawlerSnapshot, PlayerProfile
 from message_controller import MessageController
-import pickle
+from poll_scheduler import PollScheduler
+from tests.helpers import FakeClock
 
 
-class TestMessageController(unittest.TestCase):
+class TestMessageController(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.target_channel = AsyncMock(spec=TextChannel)
-        self.controller = MessageController(self.target_channel)
+        self.controller = MessageController(self.target_channel, state_path=":memory:", archive_path=None)
         self.controller.brawl_client = MagicMock(spec=BrawlClient)
 
     def test_initialization(self):
-        self.assertEqual(self.controller.message_char_len_limit, 100)
         self.assertEqual(self.controller.name, "brawlbot")
-        self.assertEqual(self.controller.available_commands, [
-            "!help", "!setname", "!status", "!debug", "start", "add", "end"
-        ])
+        for command in ["!help", "!setname", "!status", "!debug", "start", "add", "end"]:
+            self.assertIn(command, self.controller.available_commands)
         self.assertEqual(self.controller.players_to_track, {})
         self.assertEqual(self.controller.player_map, {})
         self.assertEqual(self.controller.target_channel, self.target_channel)
@@ -32,7 +38,7 @@ class TestMessageController(unittest.TestCase):
         self.target_channel.send.assert_called_once()  # Assuming there's only one call to send in the method
 
     async def test_send_status_message(self):
-        self.controller.players_to_track = {"player1": {}}
+        self.controller.players_to_track = {"player1": BrawlerSnapshot.from_brawlers(100, [])}
         await self.controller._send_status_message()
         self.target_channel.send.assert_called_once()  # Assuming there's only one call to send in the method
 
@@ -45,49 +51,396 @@ class TestMessageController(unittest.TestCase):
     async def test_add_player(self):
         player_name = "player1"
         player_tag = "#12345"
-        self.controller.brawl_client.get_player_info.return_value = {"trophies": 100}
+        self.controller.brawl_client.lookup_player.return_value = (200, PlayerProfile.from_api({"trophies": 100}))
         await self.controller._add_player(player_name, player_tag)
         self.assertIn(player_name, self.controller.player_map)
         self.target_channel.send.assert_called_once_with(f"Added player {player_name} with player tag {player_tag}")
 
     async def test_start_tracking(self):
         self.controller.player_map = {"player1": "#12345"}
-        self.controller.brawl_client.get_player_info.return_value = {"trophies": 100, "brawlers": []}
+        self.controller.brawl_client.get_player_info.return_value = PlayerProfile.from_api({"trophies": 100, "brawlers": []})
         await self.controller._start_tracking("player1")
         self.assertIn("player1", self.controller.players_to_track)
         self.target_channel.send.assert_called_once()  # Assuming there's only one call to send in the method
 
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("pickle.dump")
-    def test_save_state(self, mock_pickle_dump, mock_open_file):
+    async def test_process_message_dispatches_exact_command(self):
+        self.controller.brawl_client.lookup_player.return_value = (200, PlayerProfile.from_api({"trophies": 100}))
+        self.controller._end_tracking = AsyncMock()
+
+        await self.controller.process_message("!brawlbot add friend #12345")
+
+        self.assertEqual(self.controller.player_map, {"friend": "#12345"})
+        self.controller._end_tracking.assert_not_called()
+        self.assertEqual(self.controller.command_registry.stats["add"].calls, 1)
+
+    async def test_process_message_ignores_unknown_commands(self):
+        self.assertFalse(self.controller._validate_message("!brawlbot dance"))
+        self.assertTrue(self.controller._validate_message("!brawlbot edge"))
+        await self.controller.process_message("!brawlbot dance")
+        self.target_channel.send.assert_not_called()
+
+    async def test_process_message_reports_usage(self):
+        await self.controller.process_message("!brawlbot add friend")
+        self.target_channel.send.assert_called_once_with(
+            "Usage: !brawlbot add <player_name> <brawlstars_tag> [<player_name> <brawlstars_tag> ...]"
+        )
+
+    async def test_add_players_looks_up_tags_concurrently(self):
+        profile = PlayerProfile.from_api({"trophies": 100, "brawlers": []})
+        lookups = {"#AAA": (200, profile), "#BAD": (404, None), "#CCC": (503, None)}
+        self.controller.brawl_client.lookup_player.side_effect = lambda tag: lookups[tag]
+
+        await self.controller.process_message("!brawlbot add alice #AAA typo #BAD carl #CCC")
+
+        self.assertEqual(self.controller.player_map, {"alice": "#AAA"})
+        self.target_channel.send.assert_called_once_with(
+            "Added player alice with player tag #AAA\n"
+            "Unable to find player tag #BAD\n"
+            "Error looking up player tag #CCC, try again later"
+        )
+
+    async def test_update_battle_logs_continues_after_error(self):
+        self.controller.player_map = {"player1": "#111", "player2": "#222"}
+        self.controller.start_time = datetime.datetime(2025, 3, 30, tzinfo=datetime.timezone.utc)
+        for name in self.controller.player_map:
+            self.controller.player_battle_map[name] = self.controller._new_battle_map()
+        battle = {
+            "battleTime": "20250330T161628.000Z",
+            "battle": {"result": "victory", "duration": 150, "trophyChange": 8},
+        }
+        logs = {"#111": 503, "#222": [battle]}
+        self.controller.brawl_client.get_player_battle_logs.side_effect = lambda tag: logs[tag]
+
+        await self.controller.update_battle_logs()
+        await self.controller.battle_events.drain()
+        await self.controller.outbox.drain()
+
+        summaries = self.controller._session_summaries()
+        self.assertEqual(summaries["player1"]["victories"], 0)
+        self.assertEqual(summaries["player2"]["victories"], 1)
+        self.assertEqual(summaries["player2"]["game_durations_s"], 150)
+        self.target_channel.send.assert_called_once_with(
+            "Error 503 with brawl API for updating player1's battle log"
+        )
+
+    async def test_update_battle_logs_merges_notifications(self):
+        self.controller.player_map = {"player1": "#111", "player2": "#222"}
+        self.controller.start_time = datetime.datetime(2025, 3, 30, tzinfo=datetime.timezone.utc)
+        for name in self.controller.player_map:
+            self.controller.player_battle_map[name] = self.controller._new_battle_map()
+        losses = [
+            {
+                "battleTime": f"20250330T16{minute:02d}00.000Z",
+                "battle": {"result": "defeat", "duration": 90, "trophyChange": -5},
+            }
+            for minute in range(5, 0, -1)
+        ]
+        self.controller.brawl_client.get_player_battle_logs.return_value = losses
+        sent = []
+
+        async def slow_send(msg):
+            await asyncio.sleep(0.01)
+            sent.append(msg)
+        self.target_channel.send.side_effect = slow_send
+
+        await self.controller.update_battle_logs()
+        self.assertEqual(sent, [])  # Polling does not wait on Discord
+        await self.controller.battle_events.drain()
+        await self.controller.outbox.drain()
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(len(sent[0].splitlines()), 6)  # Three streak messages for each player
+
+    async def test_update_battle_logs_shares_squad_matches(self):
+        self.controller.player_map = {"player1": "#111", "player2": "#222"}
+        self.controller.start_time = datetime.datetime(2025, 3, 30, tzinfo=datetime.timezone.utc)
+        for name in self.controller.player_map:
+            self.controller.player_battle_map[name] = self.controller._new_battle_map()
+
+        def squad_defeat(minute: int) -> dict:
+            return {
+                "battleTime": f"20250330T16{minute:02d}00.000Z",
+                "battle": {
+                    "result": "defeat", "duration": 120, "trophyChange": -5,
+                    "teams": [[{"tag": "#111"}, {"tag": "#222"}], [{"tag": "#999"}]],
+                },
+            }
+        game_log = [squad_defeat(minute) for minute in (6, 3, 0)]
+        self.controller.brawl_client.get_player_battle_logs.side_effect = lambda tag: game_log
+
+        self.assertEqual(await self.controller.update_battle_logs(), {"player1": 3, "player2": 3})
+        await self.controller.battle_events.drain()
+        await self.controller.outbox.drain()
+        self.target_channel.send.assert_called_once()
+        self.assertIn("player1 & player2", self.target_channel.send.call_args.args[0])  # One message for the squad
+
+        # player1's log holds every new battle of player2, so player2 is not fetched
+        game_log[:0] = [squad_defeat(minute) for minute in (12, 9)]
+        self.controller.brawl_client.get_player_battle_logs.reset_mock()
+        self.assertEqual(await self.controller.update_battle_logs(), {"player1": 2, "player2": 2})
+        self.controller.brawl_client.get_player_battle_logs.assert_called_once_with("#111")
+        await self.controller.battle_events.drain()
+        self.assertEqual(self.controller._session_summaries()["player2"]["defeats"], 5)
+
+    async def test_squad_with_staggered_schedules_is_fetched_once(self):
+        self.controller.player_map = {"player1": "#111", "player2": "#222"}
+        self.controller.start_time = datetime.datetime(2025, 3, 30, tzinfo=datetime.timezone.utc)
+        for name in self.controller.player_map:
+            self.controller.player_battle_map[name] = self.controller._new_battle_map()
+
+        def squad_victory(minute: int) -> dict:
+            return {
+                "battleTime": f"20250330T16{minute:02d}00.000Z",
+                "battle": {
+                    "result": "victory", "duration": 120, "trophyChange": 8,
+                    "teams": [[{"tag": "#111"}, {"tag": "#222"}], [{"tag": "#999"}]],
+                },
+            }
+        game_log = [squad_victory(minute) for minute in (3, 0)]
+        self.controller.brawl_client.get_player_battle_logs.side_effect = lambda tag: game_log
+        await self.controller.update_battle_logs()
+
+        clock = FakeClock()
+        scheduler = PollScheduler(min_interval=30, jitter=0, requests_per_second=10, clock=clock)
+        scheduler.sync(self.controller.player_battle_map)
+        scheduler._next_poll.update({"player1": 0, "player2": 20})  # Only player1 is due
+        game_log[:0] = [squad_victory(minute) for minute in (9, 6)]
+        self.controller.brawl_client.get_player_battle_logs.reset_mock()
+        await scheduler.run_once(get_names=lambda: list(self.controller.player_battle_map),
+                                 poll=self.controller.update_battle_logs)
+
+        self.controller.brawl_client.get_player_battle_logs.assert_called_once_with("#111")
+        await self.controller.battle_events.drain()
+        self.assertEqual(self.controller._session_summaries()["player2"]["victories"], 4)
+        self.assertEqual(scheduler._next_poll["player2"], 30)  # Rescheduled as if polled with player1
+
+    async def test_profile_command_uploads_report_after_armed_cycles(self):
+        self.controller.brawl_client.get_player_battle_logs.return_value = []
+
+        await self.controller.process_message("!profile 2")
+        self.assertEqual(self.controller.profiler.cycles, 0)  # Not an admin
+
+        await self.controller.process_message("!profile 2", is_admin=True)
+        await self.controller.update_battle_logs()
+        self.assertNotIn("file", self.target_channel.send.call_args.kwargs)
+        await self.controller.update_battle_logs()
+
+        sent_file = self.target_channel.send.call_args.kwargs["file"]
+        self.assertEqual(sent_file.filename, "profile.txt")
+        self.assertTrue(sent_file.fp.read().startswith(b"Profile of 2 cycles"))
+
+    async def test_send_message_splits_long_messages(self):
+        lines = [f"line {i:04d} " + "x" * 90 for i in range(50)]
+
+        await self.controller.send_message("\n".join(lines))
+
+        chunks = [call.args[0] for call in self.target_channel.send.call_args_list]
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 2000 for chunk in chunks))
+        self.assertEqual("".join(chunks), "\n".join(lines))
+
+    async def test_update_battle_logs_dedups_with_watermark(self):
+        self.controller.player_map = {"player1": "#111"}
+        self.controller.player_battle_map = {"player1": self.controller._new_battle_map()}
+        self.controller.start_time = datetime.datetime(2025, 3, 30, tzinfo=datetime.timezone.utc)
+        first = {"battleTime": "20250330T161201.000Z", "battle": {"result": "victory", "duration": 90, "trophyChange": 8}}
+        second = {"battleTime": "20250330T161628.000Z", "battle": {"result": "defeat", "duration": 120, "trophyChange": -5}}
+        same_time = {"battleTime": "20250330T161628.000Z", "battle": {"result": "victory", "duration": 60, "trophyChange": 9}}
+        self.controller.brawl_client.get_player_battle_logs.return_value = [second, first]
+
+        self.assertEqual(await self.controller.update_battle_logs(), {"player1": 2})
+        self.assertEqual(await self.controller.update_battle_logs(), {})
+
+        self.controller.brawl_client.get_player_battle_logs.return_value = [same_time, second, first]
+        self.assertEqual(await self.controller.update_battle_logs(), {"player1": 1})
+        await self.controller.battle_events.drain()
+        battle_map = self.controller.player_battle_map["player1"]
+        self.assertEqual(len(battle_map["last_battle_keys"]), 2)
+        summary = self.controller._session_summaries()["player1"]
+        self.assertEqual(summary["games"], 3)
+        self.assertEqual(summary["victories"], 2)
+
+    async def test_send_trophy_delta_graph(self):
+        self.controller.player_map = {"player1": "#111"}
+        self.controller.players_to_track = {"player1": BrawlerSnapshot.from_brawlers(100, [])}
+        self.controller.start_time = datetime.datetime(2025, 3, 30, tzinfo=datetime.timezone.utc)
+        self.controller.battle_archive.append("#111", BattleRecord.from_api({
+            "battleTime": "20250330T161628.000Z",
+            "battle": {"result": "victory", "duration": 150, "trophyChange": 8, "starPlayer": {"tag": "#111"}},
+        }, "#111"))
+        self.controller.chart_renderer = MagicMock()
+        self.controller.chart_renderer.render_trophy_chart = AsyncMock(return_value=b"png")
+
+        await self.controller._send_trophy_delta_graph()
+
+        title, series = self.controller.chart_renderer.render_trophy_chart.call_args.args
+        self.assertEqual(title, "Trophies Delta Over Time")
+        name, _, trophies, star_players = series[0]
+        self.assertEqual(name, "player1")
+        self.assertEqual(trophies, [0, 8, 8])
+        self.assertEqual(star_players, [False, True, False])
+        sent_file = self.target_channel.send.call_args.kwargs["file"]
+        self.assertEqual(sent_file.filename, "trophy_delta_plot.png")
+
+    async def test_progress_uses_polled_battles_without_api_calls(self):
+        self.controller.player_map = {"player1": "#111"}
+        self.controller.brawl_client.get_player_info.return_value = PlayerProfile.from_api({"trophies": 100, "brawlers": []})
+        await self.controller._start_tracking("player1")
+        self.controller.start_time = datetime.datetime(2025, 3, 30, tzinfo=datetime.timezone.utc)
+        self.controller.brawl_client.get_player_battle_logs.return_value = [{
+            "battleTime": "20250330T161628.000Z",
+            "battle": {"result": "victory", "duration": 150, "trophyChange": 8, "starPlayer": {"tag": "#111"}},
+        }]
+        await self.controller.update_battle_logs()
+        self.controller.brawl_client.reset_mock()
+        self.controller.chart_renderer = MagicMock()
+        self.controller.chart_renderer.render_trophy_chart = AsyncMock(return_value=b"png")
+
+        await self.controller._show_progress()
+
+        self.controller.brawl_client.get_player_info.assert_not_called()
+        self.controller.brawl_client.get_player_battle_logs.assert_not_called()
+        self.assertEqual(self.controller.trophy_series["player1"].current_trophies, 108)
+        _, series = self.controller.chart_renderer.render_trophy_chart.call_args.args
+        self.assertEqual(series[0][2], [0, 8, 8])
+
+    async def test_fetch_errors_are_reported_per_player(self):
+        self.controller.player_map = {"player1": "#111", "player2": "#222"}
+        profile = PlayerProfile.from_api({"trophies": 100, "brawlers": []})
+
+        def get_player_info(tag):
+            if tag == "#222":
+                raise asyncio.TimeoutError()
+            return profile
+
+        self.controller.brawl_client.get_player_info.side_effect = get_player_info
+        await self.controller._start_tracking("player1 player2")
+        self.assertEqual(self.controller.players_to_track, {})
+        self.target_channel.send.assert_called_once_with(
+            "Error connecting to brawl API for player2, might need to reset IP address"
+        )
+
+        self.controller.brawl_client.get_player_info.side_effect = None
+        self.controller.brawl_client.get_player_info.return_value = profile
+        await self.controller._start_tracking("player1 player2")
+        self.controller.brawl_client.get_player_battle_logs.return_value = []
+        self.controller.brawl_client.get_player_info.side_effect = get_player_info
+        self.controller.chart_renderer = MagicMock()
+        self.controller.chart_renderer.render_trophy_chart = AsyncMock(return_value=b"png")
+        self.target_channel.send.reset_mock()
+
+        await self.controller._end_tracking()
+
+        report = self.target_channel.send.call_args_list[0].args[0]
+        self.assertIn("**player1**: Total: 0", report)
+        self.assertIn("**player2**: Error connecting to brawl API", report)
+        self.assertIsNone(self.controller.start_time)
+
+    async def test_club_registers_and_syncs_members(self):
+        self.controller.player_map = {"Sprout_Main": "#OTHER"}
+        self.controller.brawl_client.get_club_members.return_value = [
+            {"tag": "#AAA", "name": "Sprout Main"},
+            {"tag": "#BBB", "name": "Mortis"},
+        ]
+        await self.controller.process_message("!brawlbot club Sprouts #CLUB1")
+
+        self.assertEqual(self.controller.clubs, {"Sprouts": "#CLUB1"})
+        self.assertEqual(self.controller.player_map["Sprout_Main_AAA"], "#AAA")
+        self.assertEqual(self.controller._club_members("Sprouts"), ["Sprout_Main_AAA", "Mortis"])
+        self.controller.brawl_client.get_club_members.assert_called_once_with("#CLUB1")
+
+        self.controller.brawl_client.get_club_members.return_value = [
+            {"tag": "#BBB", "name": "Mortis"},
+            {"tag": "#CCC", "name": "Leon"},
+        ]
+        await self.controller.sync_clubs()
+        await self.controller.outbox.drain()
+
+        self.assertEqual(self.controller._club_members("Sprouts"), ["Mortis", "Leon"])
+        self.assertIn("Sprout_Main_AAA", self.controller.player_map)
+        state = self.controller.state_store.load()
+        self.assertEqual(state["clubs"], {"Sprouts": "#CLUB1"})
+        self.assertEqual(state["player_clubs"], {"Mortis": "Sprouts", "Leon": "Sprouts"})
+
+        self.controller.brawl_client.get_player_info.return_value = PlayerProfile.from_api({"trophies": 100, "brawlers": []})
+        await self.controller.process_message("!brawlbot grind Sprouts")
+        self.assertEqual(set(self.controller.players_to_track), {"Mortis", "Leon"})
+
+    def test_save_state(self):
         self.controller.player_map = {"player1": "#12345"}
+        self.controller.state_store.put_player("player1", "#12345")
         self.controller.save_state()
 
-        mock_open_file.assert_called_once_with("message_controller_state.pkl", "wb")
-        mock_pickle_dump.assert_called_once()
-        _, args, _ = mock_pickle_dump.mock_calls[0]
-        saved_state = args[0]
-        self.assertEqual(saved_state["player_map"], {"player1": "#12345"})
-        self.assertEqual(saved_state["name"], "brawlbot")
-
-    @patch("builtins.open", new_callable=mock_open, read_data=pickle.dumps({
-        "player_map": {"player1": "#12345"},
-        "name": "brawlbot"
-    }))
-    @patch("os.path.exists", return_value=True)
-    @patch("pickle.load")
-    def test_load_state(self, mock_pickle_load, mock_os_path_exists, mock_open_file):
-        mock_pickle_load.return_value = {
-            "player_map": {"player1": "#12345"},
-            "name": "brawlbot"
-        }
+        state = self.controller.state_store.load()
+        self.assertEqual(state["player_map"], {"player1": "#12345"})
+        self.assertIsNone(state["start_time"])
+        tables = {row[0] for row in self.controller.state_store._connect().execute("SELECT name FROM sqlite_master")}
+        self.assertNotIn("battles", tables)  # Battles are only kept in the archive
 
-        self.controller.load_state()
+    async def test_legacy_pickle_is_imported_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_path = os.path.join(directory, "state.db")
+            legacy_pickle = os.path.join(directory, "state.pkl")
+            with open(legacy_pickle, "wb") as file:
+                pickle.dump({"player_map": {"alice": "#AAA"}}, file)
+            controller = MessageController(self.target_channel, state_path=state_path, archive_path=None)
+            controller.load_state(legacy_pickle)
+            self.assertEqual(controller.player_map, {"alice": "#AAA"})
+            await controller._remove_player("alice")
+            controller.state_store.close()
 
-        mock_open_file.assert_called_once_with("message_controller_state.pkl", "rb")
-        mock_pickle_load.assert_called_once()
-        self.assertEqual(self.controller.player_map, {"player1": "#12345"})
-        self.assertEqual(self.controller.name, "brawlbot")
+            restored = MessageController(self.target_channel, state_path=state_path, archive_path=None)
+            restored.load_state(legacy_pickle)
+            restored.state_store.close()
+
+        self.assertEqual(restored.player_map, {})
+
+    async def test_load_state_resumes_session(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_path = os.path.join(directory, "state.db")
+            archive_path = os.path.join(directory, "battle_archive")
+            controller = MessageController(self.target_channel, state_path=state_path, archive_path=archive_path)
+            controller.brawl_client = MagicMock(spec=BrawlClient)
+            controller.brawl_client.get_player_info.return_value = PlayerProfile.from_api({"trophies": 100, "brawlers": []})
+            controller.brawl_client.lookup_player.return_value = (200, controller.brawl_client.get_player_info.return_value)
+            await controller._add_player("player1", "#12345")
+            await controller._change_name("bot2")
+            start_time = datetime.datetime(2025, 3, 30, 16, tzinfo=datetime.timezone.utc)
+            with patch("message_controller.datetime") as mock_datetime:
+                mock_datetime.datetime.now.return_value = start_time
+                await controller._start_tracking("player1")
+            controller.brawl_client.get_player_battle_logs.return_value = [
+                {
+                    "battleTime": "20250330T161628.000Z",
+                    "battle": {"result": "defeat", "duration": 120, "trophyChange": -6},
+                },
+                {
+                    "battleTime": "20250330T150000.000Z",  # Before the session, archived but not counted
+                    "battle": {"result": "victory", "duration": 120, "trophyChange": 8},
+                },
+            ]
+            await controller.update_battle_logs()
+            await controller.battle_events.drain()
+            controller.state_store.close()
+
+            restored = MessageController(self.target_channel, state_path=state_path, archive_path=archive_path)
+            restored.brawl_client = MagicMock(spec=BrawlClient)
+            restored.load_state()
+            restored.state_store.close()
+            summary = restored._session_summaries()["player1"]
+
+        self.assertEqual(restored.name, "bot2")
+        self.assertEqual(restored.player_map, {"player1": "#12345"})
+        self.assertEqual(restored.start_time, start_time)
+        self.assertEqual(restored.players_to_track["player1"].trophies, 100)
+        battle_map = restored.player_battle_map["player1"]
+        self.assertEqual(battle_map["last_battle_time"], battle_time_to_epoch("20250330T161628.000Z"))
+        self.assertEqual(battle_map["consecutive_losses"], 1)
+        self.assertEqual(summary["games"], 1)
+        self.assertEqual(summary["defeats"], 1)
+        self.assertEqual(summary["victories"], 0)
+        restored.brawl_client.get_player_info.assert_not_called()
+        restored.brawl_client.get_player_battle_logs.assert_not_called()
 
 
 if __name__ == "__main__":
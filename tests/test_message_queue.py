@@ -0,0 +1,53 @@
+import unittest
+from message_queue import MessageQueue, split_message
+from tests.helpers import FakeClock
+
+
+class TestSplitMessage(unittest.TestCase):
+    def test_short_message_is_untouched(self):
+        self.assertEqual(split_message("hello\nworld"), ["hello\nworld"])
+        self.assertEqual(split_message(""), [""])
+
+    def test_splits_on_line_boundaries(self):
+        self.assertEqual(split_message("aaa\nbbb\nccc", max_length=8), ["aaa\nbbb\n", "ccc"])
+
+    def test_hard_splits_long_lines(self):
+        self.assertEqual(split_message("ab\ncdefghij\nk", max_length=4), ["ab\n", "cdef", "ghij", "\nk"])
+
+
+class TestMessageQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sent = []
+        self.clock = FakeClock()
+
+        async def send(msg):
+            self.sent.append(msg)
+        self.queue = MessageQueue(send, rate=1, burst=2, clock=self.clock)
+
+    async def test_flush_merges_pending_messages(self):
+        for i in range(5):
+            self.queue.post(f"message {i}")
+        self.assertEqual(self.sent, [])
+
+        self.queue.flush()
+        await self.queue.drain()
+
+        self.assertEqual(self.sent, ["\n".join(f"message {i}" for i in range(5))])
+        self.assertEqual(self.queue.merged, 4)
+
+    async def test_send_goes_after_queued_messages(self):
+        self.queue.post("streak")
+        await self.queue.send("report")
+        self.assertEqual(self.sent, ["streak", "report"])
+
+    async def test_rate_limit_delays_posts(self):
+        await self.queue.send("one")
+        await self.queue.send("two")
+        self.assertEqual(self.queue.bucket.seconds_until_available(), 1)
+        self.clock.now = 1
+        await self.queue.send("three")
+        self.assertEqual(self.sent, ["one", "two", "three"])
+
+
+if __name__ == "__main__":
+    unittest.main()
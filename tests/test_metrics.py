@@ -0,0 +1,51 @@
+import unittest
+import aiohttp
+from metrics import MetricsRegistry, start_metrics_server
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_histogram(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency", ("endpoint",), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 2):
+            histogram.observe("battle_logs", value=value)
+
+        self.assertEqual(histogram.count("battle_logs"), 4)
+        self.assertAlmostEqual(histogram.mean("battle_logs"), 0.7625)
+        self.assertEqual(histogram.quantile(0.5, "battle_logs"), 1)
+        self.assertEqual(histogram.quantile(0.95, "battle_logs"), float("inf"))
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{endpoint="battle_logs",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{endpoint="battle_logs",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{endpoint="battle_logs",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{endpoint="battle_logs"} 4', text)
+
+    def test_counter_and_gauge(self):
+        counter = self.registry.counter("errors_total", "Errors", ("command",))
+        counter.inc("end")
+        counter.inc("end")
+        gauge = self.registry.gauge("queue_depth", "Depth", ("queue",))
+        gauge.set_function("poll_due", function=lambda: 3)
+
+        text = self.registry.render()
+        self.assertIn("# TYPE errors_total counter", text)
+        self.assertIn('errors_total{command="end"} 2', text)
+        self.assertIn('queue_depth{queue="poll_due"} 3', text)
+
+    async def test_metrics_endpoint(self):
+        self.registry.counter("polls_total", "Polls").inc()
+        runner = await start_metrics_server(port=0, registry=self.registry)
+        try:
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    self.assertEqual(response.status, 200)
+                    self.assertIn("polls_total 1", await response.text())
+        finally:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import random
+import unittest
+from unittest.mock import AsyncMock
+from poll_scheduler import PollScheduler, TokenBucket
+from tests.helpers import FakeClock
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_take_and_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        self.assertEqual(bucket.take(5), 2)
+        self.assertEqual(bucket.take(1), 0)
+        self.assertAlmostEqual(bucket.seconds_until_available(), 0.5)
+        clock.now += 1
+        self.assertEqual(bucket.take(5), 2)
+
+
+class TestPollScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = PollScheduler(
+            min_interval=30,
+            max_interval=240,
+            jitter=0,
+            requests_per_second=100,
+            clock=self.clock,
+            rng=random.Random(0),
+        )
+
+    def test_backoff_and_reset(self):
+        self.scheduler.sync(["player1"])
+        self.assertEqual(self.scheduler.due(), ["player1"])
+
+        for expected_interval in (60, 120, 240, 240):
+            self.scheduler.record("player1", had_new_battles=False)
+            self.assertEqual(self.scheduler._intervals["player1"], expected_interval)
+
+        self.scheduler.record("player1", had_new_battles=True)
+        self.assertEqual(self.scheduler._intervals["player1"], 30)
+        self.assertEqual(self.scheduler.due(), [])
+        self.clock.now += 30
+        self.assertEqual(self.scheduler.due(), ["player1"])
+
+    def test_sync_drops_untracked_players(self):
+        self.scheduler.sync(["player1", "player2"])
+        self.scheduler.sync(["player2"])
+        self.assertEqual(self.scheduler.due(), ["player2"])
+
+    def test_interval_stretches_with_player_count(self):
+        self.scheduler.budget = TokenBucket(rate=10, capacity=10, clock=self.clock)
+        names = [f"player{i}" for i in range(600)]
+        self.scheduler.sync(names)
+
+        self.scheduler.record("player0", had_new_battles=True)
+        self.assertEqual(self.scheduler._intervals["player0"], 60)
+        self.scheduler.record("player1", had_new_battles=False)
+        self.assertEqual(self.scheduler._intervals["player1"], 120)
+
+        self.scheduler.sync(names[:10])
+        self.scheduler.record("player0", had_new_battles=True)
+        self.assertEqual(self.scheduler._intervals["player0"], 30)
+
+    async def test_run_once_respects_budget(self):
+        self.scheduler.budget = TokenBucket(rate=1, capacity=2, clock=self.clock)
+        poll = AsyncMock(side_effect=lambda names: {names[0]: 1})
+
+        await self.scheduler.run_once(lambda: ["player1", "player2", "player3"], poll)
+
+        polled = poll.call_args.args[0]
+        self.assertEqual(len(polled), 2)
+        self.assertEqual(len(self.scheduler.due()), 1)
+
+    async def test_run_once_defers_players_when_poll_raises(self):
+        poll = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with self.assertRaises(RuntimeError):
+            await self.scheduler.run_once(lambda: ["player1", "player2"], poll)
+
+        self.assertEqual(self.scheduler.due(), [])
+        self.clock.now += 240
+        self.assertEqual(sorted(self.scheduler.due()), ["player1", "player2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import unittest
+from profiler import Profiler
+
+
+async def parse_cycle() -> int:
+    await asyncio.sleep(0)
+    return len(json.loads(json.dumps([{"battleTime": "20250330T161628.000Z"}] * 200)))
+
+
+class TestProfiler(unittest.IsolatedAsyncioTestCase):
+    async def test_captures_armed_cycles_then_reports(self):
+        profiler = Profiler(top=10)
+        self.assertEqual(profiler.cycles, 0)
+        profiler.arm(cycles=2)
+
+        self.assertEqual(await profiler.capture("cycle", parse_cycle()), 200)
+        self.assertFalse(profiler.finished)
+        await profiler.capture("cycle", parse_cycle())
+        self.assertTrue(profiler.finished)
+
+        report = profiler.finish()
+        self.assertTrue(report.startswith("Profile of 2 cycles"))
+        self.assertIn("parse_cycle", report)
+        self.assertIn("===== Top allocations", report)
+        self.assertFalse(profiler.finished)
+
+    async def test_one_capture_at_a_time(self):
+        first, second = Profiler(), Profiler()
+        first.arm(report=True)
+        second.arm(report=True)
+
+        await asyncio.gather(first.capture("report", parse_cycle()), second.capture("report", parse_cycle()))
+
+        self.assertTrue(first.finished)
+        self.assertTrue(second.report)  # Ran unprofiled, still armed
+        first.finish()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import unittest
+import weakref
+from unittest.mock import AsyncMock, MagicMock
+from brawl_client import BrawlClient
+from metrics import CACHE_REQUESTS, QUEUE_DEPTH
+from response_cache import CachedBrawlClient
+from tests.helpers import FakeClock
+
+
+class TestCachedBrawlClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.brawl_client = MagicMock(spec=BrawlClient)
+        self.cache = CachedBrawlClient(self.brawl_client, max_entries=2, clock=self.clock)
+
+    async def test_hit_within_ttl(self):
+        self.brawl_client.get_player_info.return_value = {"trophies": 100}
+        hits_before = CACHE_REQUESTS.values.get(("player_info", "hit"), 0)
+        await self.cache.get_player_info("#1")
+        result = await self.cache.get_player_info("#1")
+
+        self.assertEqual(result, {"trophies": 100})
+        self.brawl_client.get_player_info.assert_called_once_with("#1")
+        self.assertEqual(self.cache.hits["player_info"], 1)
+        self.assertEqual(self.cache.misses["player_info"], 1)
+        self.assertEqual(CACHE_REQUESTS.values[("player_info", "hit")], hits_before + 1)
+
+    async def test_expires_after_ttl(self):
+        self.brawl_client.get_player_battle_logs.return_value = []
+        await self.cache.get_player_battle_logs("#1")
+        self.clock.now += self.cache.ttls["battle_logs"] + 1
+        await self.cache.get_player_battle_logs("#1")
+
+        self.assertEqual(self.brawl_client.get_player_battle_logs.call_count, 2)
+
+    async def test_errors_are_not_cached(self):
+        self.brawl_client.get_player_battle_logs.return_value = 503
+        self.assertEqual(await self.cache.get_player_battle_logs("#1"), 503)
+        await self.cache.get_player_battle_logs("#1")
+
+        self.assertEqual(self.brawl_client.get_player_battle_logs.call_count, 2)
+
+    async def test_concurrent_requests_are_coalesced(self):
+        release = asyncio.Event()
+
+        async def slow_fetch(player_tag):
+            await release.wait()
+            return {"tag": player_tag}
+
+        self.brawl_client.get_player_info = AsyncMock(side_effect=slow_fetch)
+        waiters = [asyncio.ensure_future(self.cache.get_player_info("#1")) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        self.assertEqual(results, [{"tag": "#1"}] * 3)
+        self.brawl_client.get_player_info.assert_called_once_with("#1")
+        self.assertEqual(self.cache.coalesced["player_info"], 2)
+
+    async def test_lookup_player_remembers_missing_tags(self):
+        self.brawl_client.lookup_player.return_value = (404, None)
+        self.assertEqual(await self.cache.lookup_player("#BAD"), (404, None))
+        self.assertEqual(await self.cache.lookup_player("#BAD"), (404, None))
+
+        self.brawl_client.lookup_player.assert_called_once_with("#BAD")
+        self.assertEqual(self.cache.hits["player_lookup"], 1)
+        self.clock.now += self.cache.ttls["player_lookup"] + 1
+        await self.cache.lookup_player("#BAD")
+        self.assertEqual(self.brawl_client.lookup_player.call_count, 2)
+
+    async def test_lookup_player_fills_player_info(self):
+        self.brawl_client.lookup_player.return_value = (200, {"trophies": 100})
+        await self.cache.lookup_player("#1")
+
+        self.assertEqual(await self.cache.get_player_info("#1"), {"trophies": 100})
+        self.brawl_client.get_player_info.assert_not_called()
+
+        self.brawl_client.lookup_player.return_value = (503, None)
+        self.assertEqual(await self.cache.lookup_player("#2"), (503, None))
+        await self.cache.lookup_player("#2")
+        self.assertEqual(self.brawl_client.lookup_player.call_count, 3)
+
+    async def test_concurrent_lookups_share_one_request(self):
+        release = asyncio.Event()
+
+        async def slow_lookup(player_tag):
+            await release.wait()
+            return 200, {"tag": player_tag}
+
+        self.brawl_client.lookup_player = AsyncMock(side_effect=slow_lookup)
+        waiters = [asyncio.ensure_future(self.cache.lookup_player("#1")) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await asyncio.gather(*waiters), [(200, {"tag": "#1"})] * 3)
+        self.brawl_client.lookup_player.assert_called_once_with("#1")
+        self.assertEqual(self.cache.coalesced["player_lookup"], 2)
+
+        self.clock.now += self.cache.ttls["player_info"] + 1  # Found tags outlive the player info entry
+        self.assertEqual(await self.cache.lookup_player("#1"), (200, {"tag": "#1"}))
+        self.brawl_client.lookup_player.assert_called_once()
+
+    async def test_lru_eviction(self):
+        self.brawl_client.get_player_info.side_effect = lambda tag: {"tag": tag}
+        await self.cache.get_player_info("#1")
+        await self.cache.get_player_info("#2")
+        await self.cache.get_player_info("#1")  # #2 is now least recently used
+        await self.cache.get_player_info("#3")
+        await self.cache.get_player_info("#1")
+        await self.cache.get_player_info("#2")
+
+        self.assertEqual(self.brawl_client.get_player_info.call_count, 4)
+
+    async def test_gauges_follow_open_caches_without_keeping_them(self):
+        release = asyncio.Event()
+
+        async def slow_fetch(player_tag):
+            await release.wait()
+            return {"tag": player_tag}
+
+        in_flight_before = QUEUE_DEPTH.get("brawl_api_in_flight")
+        other = CachedBrawlClient(MagicMock(spec=BrawlClient))
+        other.brawl_client.get_player_info = AsyncMock(side_effect=slow_fetch)
+        waiter = asyncio.ensure_future(other.get_player_info("#1"))
+        await asyncio.sleep(0)
+        self.assertEqual(QUEUE_DEPTH.get("brawl_api_in_flight"), in_flight_before + 1)
+
+        release.set()
+        await waiter
+        await other.close()
+        other_ref = weakref.ref(other)
+        del other, waiter
+        self.assertIsNone(other_ref())  # The gauges do not hold on to a closed cache
+        self.assertEqual(QUEUE_DEPTH.get("brawl_api_in_flight"), in_flight_before)
+
+
+if __name__ == "__main__":
+    unittest.main()
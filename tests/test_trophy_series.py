@@ -0,0 +1,41 @@
+import unittest
+from battle_archive import BattleArchive
+from trophy_series import TrophySeries
+from tests.helpers import game
+
+
+class TestTrophySeries(unittest.TestCase):
+    def setUp(self):
+        self.battles = [
+            game("20250330T161201.000Z", "victory", 10, "#111"),
+            game("20250330T161628.000Z", "defeat", -6),
+        ]
+
+    def test_points(self):
+        series = TrophySeries(500)
+        for battle in self.battles:
+            series.append(battle)
+
+        start, end = self.battles[0].battle_time - 60, self.battles[-1].battle_time + 60
+        times, trophies, star_players = series.points(start, end, cumulative=True)
+        self.assertEqual(times, [start, *(battle.battle_time for battle in self.battles), end])
+        self.assertEqual(trophies, [500, 510, 504, 504])
+        self.assertEqual(star_players, [False, True, False, False])
+        self.assertEqual(series.points(start, end, cumulative=False)[1], [0, 10, 4, 4])
+        self.assertEqual(series.brawler_gains(), [(16000037, 4)])
+
+    def test_rebuilt_from_archive_matches_appended(self):
+        archive = BattleArchive(path=None)
+        appended = TrophySeries(500)
+        for battle in self.battles:
+            archive.append("#111", battle)
+            appended.append(battle)
+
+        rebuilt = TrophySeries.from_columns(500, archive.scan("#111"))
+
+        self.assertEqual(rebuilt.points(0, 1, cumulative=True), appended.points(0, 1, cumulative=True))
+        self.assertEqual(rebuilt.brawler_gains(), appended.brawler_gains())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Per-player trophy time series built up as battles arrive"""
+from array import array
+from battle_archive import BattleColumns
+from battle_record import BattleRecord
+
+
+class TrophySeries:
+    """
+    Append-only (battle time, cumulative trophies, star player) points of one player
+    since the session start, plus the trophy change per brawler.
+    Battles must be appended oldest first, as update_battle_logs ingests them.
+    """
+    __slots__ = ("start_trophies", "times", "trophies", "star_players", "brawler_deltas")
+
+    def __init__(self, start_trophies: int):
+        self.start_trophies = start_trophies
+        self.times = array("q")  # epoch seconds
+        self.trophies = array("q")  # absolute trophies after each battle
+        self.star_players = array("b")
+        self.brawler_deltas: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def current_trophies(self) -> int:
+        return self.trophies[-1] if self.trophies else self.start_trophies
+
+    def append(self, record: BattleRecord) -> None:
+        self.times.append(record.battle_time)
+        self.trophies.append(self.current_trophies + record.trophy_change)
+        self.star_players.append(int(record.star_player))
+        if record.trophy_change:
+            self.brawler_deltas[record.brawler_id] = self.brawler_deltas.get(record.brawler_id, 0) + record.trophy_change
+
+    @classmethod
+    def from_columns(cls, start_trophies: int, battles: BattleColumns) -> "TrophySeries":
+        """Rebuild from archived battles, e.g. when a session is resumed"""
+        series = cls(start_trophies)
+        for battle_time, trophy_change, star_player, brawler_id in zip(
+            battles["battle_time"], battles["trophy_change"], battles["star_player"], battles["brawler_id"]
+        ):
+            series.append(BattleRecord(battle_time, "", trophy_change, 0, bool(star_player), "", "", brawler_id, ""))
+        return series
+
+    def brawler_gains(self) -> list[tuple[int, int]]:
+        """(brawler id, trophy change) of every brawler whose trophies changed, by brawler id"""
+        return sorted((brawler_id, delta) for brawler_id, delta in self.brawler_deltas.items() if delta)
+
+    def points(self, start_time: int, end_time: int, cumulative: bool) -> tuple[list[int], list[int], list[bool]]:
+        """
+        Chart points from start_time to end_time (epoch seconds), trophies absolute
+        when cumulative, otherwise relative to the start
+        """
+        offset = 0 if cumulative else self.start_trophies
+        last = self.current_trophies - offset
+        times = [start_time, *self.times, end_time]
+        trophies = [self.start_trophies - offset, *(value - offset for value in self.trophies), last]
+        star_players = [False, *map(bool, self.star_players), False]
+        return times, trophies, star_players